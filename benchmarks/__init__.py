@@ -0,0 +1,8 @@
+"""Performance benchmarks for keyboard_simulator.
+
+Run from the project root::
+
+    python -m benchmarks run --output benchmarks/results/current.json
+    python -m benchmarks compare benchmarks/baselines/linux.json benchmarks/results/current.json
+    python -m benchmarks transfer --sizes 1K,1M
+"""
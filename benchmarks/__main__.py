@@ -0,0 +1,214 @@
+"""Command line entry point: ``python -m benchmarks {run,transfer,compare}``."""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = PROJECT_ROOT / "src"
+
+# 允许在未安装包的源码树中直接运行
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from .harness import (  # noqa: E402
+    DEFAULT_THRESHOLD,
+    compare,
+    format_comparisons,
+    format_results,
+    load,
+    parse_size,
+    save,
+)
+
+
+def _sizes(value: str) -> List[int]:
+    try:
+        return [parse_size(item) for item in value.split(",") if item.strip()]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from exc
+
+
+def _run(args: argparse.Namespace) -> int:
+    from .cases import Settings, iter_cases
+
+    with tempfile.TemporaryDirectory(prefix="ks-bench-") as workdir:
+        settings = Settings(
+            workdir=Path(workdir),
+            sizes=args.sizes,
+            fec_limit=args.fec_limit,
+            characters=args.characters,
+            keys=args.keys,
+            archive_size=args.archive_size,
+            repeat=args.repeat,
+        )
+        selected = [
+            (name, case)
+            for name, case in iter_cases(settings)
+            if not args.only or any(fnmatch.fnmatch(name, pattern) for pattern in args.only)
+        ]
+        if args.list:
+            for name, _ in selected:
+                print(name)
+            return 0
+
+        results = {}
+        for name, case in selected:
+            print(f"运行 {name} ...", file=sys.stderr, flush=True)
+            results[name] = case()
+
+    print(format_results(results))
+    if args.output is not None:
+        save(results, args.output)
+        print(f"结果已写入 {args.output}", file=sys.stderr)
+    if args.compare is not None:
+        return _report(load(args.compare), results, args.threshold)
+    return 0
+
+
+def _report(baseline, current, threshold: float) -> int:
+    comparisons = compare(baseline, current, threshold=threshold)
+    print(format_comparisons(comparisons))
+    regressions = [item.name for item in comparisons if item.regressed]
+    if regressions:
+        print(
+            f"{len(regressions)} 项基准吞吐量下降超过 {threshold:.0%}: {', '.join(regressions)}",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    return _report(load(args.baseline), load(args.current), args.threshold)
+
+
+def _transfer(args: argparse.Namespace) -> int:
+    import json
+
+    from .transfer import (
+        build_corpus,
+        format_transfers,
+        iter_transfers,
+        shell_available,
+        summarize,
+    )
+
+    if not shell_available(args.shell):
+        print(f"未找到 {args.shell}，无法执行端到端传输", file=sys.stderr)
+        return 2
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ks-corpus-") as workdir:
+        corpus = build_corpus(Path(workdir), args.sizes) + list(args.file or [])
+        for result in iter_transfers(corpus, args.pipelines, shell=args.shell):
+            print(f"完成 {result.name} / {result.pipeline}", file=sys.stderr, flush=True)
+            results.append(result)
+
+    print(format_transfers(results))
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(
+            json.dumps([item.to_dict() for item in results], ensure_ascii=False, indent=2) + "\n",
+            encoding="utf-8",
+        )
+    failure = summarize(results)
+    if failure is not None:
+        print(failure, file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="keyboard_simulator 性能基准"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="运行基准测试")
+    run.add_argument(
+        "--sizes",
+        type=_sizes,
+        default=None,
+        help="逗号分隔的文件大小，如 1K,1M,1G (默认: 1K,64K,1M)",
+    )
+    run.add_argument(
+        "--fec-limit",
+        type=parse_size,
+        default="16M",
+        help="超过该大小的文件跳过 FEC 基准 (默认: 16M)",
+    )
+    run.add_argument(
+        "--archive-size",
+        type=parse_size,
+        default="32M",
+        help="归档并行压缩基准的输入大小 (默认: 32M)",
+    )
+    run.add_argument("--characters", type=int, default=200_000, help="模拟器基准的字符数")
+    run.add_argument("--keys", type=int, default=50_000, help="SendInput 基准的按键数")
+    run.add_argument("--repeat", type=int, default=3, help="每项重复次数，取最快一次 (默认: 3)")
+    run.add_argument(
+        "--only", action="append", metavar="PATTERN", help="只运行名称匹配的基准 (可重复)"
+    )
+    run.add_argument("--list", action="store_true", help="只列出基准名称")
+    run.add_argument("--output", type=Path, help="将结果写入 JSON 文件")
+    run.add_argument("--compare", type=Path, metavar="BASELINE", help="运行后与基线比较")
+    run.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="吞吐量下降超过该比例视为回退 (默认: 0.2)",
+    )
+    run.set_defaults(handler=_run)
+
+    transfer = commands.add_parser(
+        "transfer", help="在本地 shell 中执行生成的 Linux 脚本并逐字节校验"
+    )
+    transfer.add_argument(
+        "--sizes",
+        type=_sizes,
+        default=None,
+        help="语料文件大小，每个大小生成文本/随机二进制/全零三个文件 (默认: 1K,64K)",
+    )
+    transfer.add_argument(
+        "--file", action="append", type=Path, metavar="PATH", help="额外加入语料的文件 (可重复)"
+    )
+    transfer.add_argument(
+        "--pipeline",
+        dest="pipelines",
+        action="append",
+        choices=["plain", "fec-8+1"],
+        help="要验证的编码管线 (可重复，默认全部)",
+    )
+    transfer.add_argument("--shell", choices=["bash", "busybox"], default="bash")
+    transfer.add_argument("--output", type=Path, help="将结果写入 JSON 文件")
+    transfer.set_defaults(handler=_transfer)
+
+    comparison = commands.add_parser("compare", help="比较两份基准结果")
+    comparison.add_argument("baseline", type=Path)
+    comparison.add_argument("current", type=Path)
+    comparison.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    comparison.set_defaults(handler=_compare)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "run" and args.sizes is None:
+        from .cases import DEFAULT_SIZES
+
+        args.sizes = list(DEFAULT_SIZES)
+    elif args.command == "transfer":
+        from .transfer import DEFAULT_SIZES, PIPELINES
+
+        args.sizes = list(DEFAULT_SIZES) if args.sizes is None else args.sizes
+        args.pipelines = args.pipelines or list(PIPELINES)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Benchmark cases.
+
+Every case is a ``(name, callable)`` pair; the callable returns a
+:class:`~benchmarks.harness.Result`. File sizes only change the input, so
+names such as ``plan.linux.1M`` stay comparable across runs.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import string
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, List, Sequence, Tuple
+
+from keyboard_simulator import config as cfg
+from keyboard_simulator.archive import collect_entries, default_workers, iter_archive
+from keyboard_simulator.backends.null import NullBackend
+from keyboard_simulator.backends.sendinput import SendInputBackend
+from keyboard_simulator.encoding import iter_reconstruction_script
+from keyboard_simulator.logging_config import disable_logging, setup_logging
+from keyboard_simulator.simulator import KeyboardSimulator
+from keyboard_simulator.streaming import TextStream
+from keyboard_simulator.tasks import SimulationPlan, TypingTask, build_plan
+
+from .harness import Result, format_size, measure
+
+DEFAULT_SIZES = (1 << 10, 64 << 10, 1 << 20)
+# FEC 脚本在内存中生成，更大的文件只测试普通编码
+DEFAULT_FEC_LIMIT = 16 << 20
+DEFAULT_CHARACTERS = 200_000
+DEFAULT_KEYS = 50_000
+# 归档压缩基准的输入大小，需为多个 gzip 成员才能体现并行
+DEFAULT_ARCHIVE_SIZE = 32 << 20
+ARCHIVE_WORKERS = (1, 2, 4)
+TARGETS = ("linux", "windows")
+
+Case = Tuple[str, Callable[[], Result]]
+
+
+@dataclass(slots=True)
+class Settings:
+    workdir: Path
+    sizes: Sequence[int] = DEFAULT_SIZES
+    fec_limit: int = DEFAULT_FEC_LIMIT
+    characters: int = DEFAULT_CHARACTERS
+    keys: int = DEFAULT_KEYS
+    archive_size: int = DEFAULT_ARCHIVE_SIZE
+    repeat: int = 3
+    _files: dict = field(default_factory=dict)
+
+    def data_file(self, size: int) -> Path:
+        """A file of ``size`` random bytes, created once per run."""
+
+        path = self._files.get(size)
+        if path is None:
+            path = self.workdir / f"input-{format_size(size)}.bin"
+            block = 1 << 20
+            with path.open("wb") as handle:
+                remaining = size
+                while remaining:
+                    chunk = min(block, remaining)
+                    handle.write(os.urandom(chunk))
+                    remaining -= chunk
+            self._files[size] = path
+        return path
+
+
+class FakeUser32:
+    """Stand-in for ``user32.dll`` whose ``SendInput`` accepts everything."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+        def send_input(count, inputs, size):
+            self.calls += 1
+            return count
+
+        self.SendInput = send_input
+
+
+def _consume(plan: SimulationPlan) -> int:
+    characters = 0
+    for task in plan.tasks:
+        if isinstance(task.payload, TextStream):
+            try:
+                for chunk in task.payload.chunks():
+                    characters += len(chunk)
+            finally:
+                task.payload.close()
+        else:
+            characters += len(task.payload)
+    return characters
+
+
+def _plan_case(settings: Settings, size: int, target: str, fec: bool) -> Result:
+    config = cfg.FileConfig(
+        delay_between_keystrokes=0.0,
+        countdown_before_start=0,
+        file_path=settings.data_file(size),
+        target_os=target,
+        output_filename="payload.bin",
+        fec_group_size=8 if fec else 0,
+    )
+
+    def run() -> int:
+        _consume(build_plan(config))
+        return size
+
+    return measure(run, unit="B", repeat=settings.repeat)
+
+
+def _script_case(settings: Settings, size: int, target: str) -> Result:
+    path = settings.data_file(size)
+
+    def run() -> int:
+        for _ in iter_reconstruction_script(path, "payload.bin", target):
+            pass
+        return size
+
+    return measure(run, unit="B", repeat=settings.repeat)
+
+
+def _archive_case(settings: Settings, workers: int) -> Result:
+    entries = collect_entries([settings.data_file(settings.archive_size)])
+
+    def run() -> int:
+        for _ in iter_archive(entries, workers=workers):
+            pass
+        return settings.archive_size
+
+    return measure(run, unit="B", repeat=settings.repeat)
+
+
+def _sample_text(characters: int) -> str:
+    rng = random.Random(0)
+    alphabet = string.ascii_letters + string.digits + string.punctuation + " " * 8 + "\n"
+    return "".join(rng.choice(alphabet) for _ in range(characters))
+
+
+def _simulator_case(settings: Settings) -> Result:
+    text = _sample_text(settings.characters)
+    simulator = KeyboardSimulator(NullBackend())
+
+    def run() -> int:
+        plan = SimulationPlan(
+            delay_between_keystrokes=0.0,
+            countdown_before_start=0,
+            tasks=[TypingTask(description="benchmark", payload=text)],
+        )
+        return simulator.run_plan(plan).characters
+
+    return measure(run, unit="char", repeat=settings.repeat)
+
+
+def _sendinput_case(settings: Settings) -> Result:
+    backend = SendInputBackend(user32=FakeUser32())
+    text = _sample_text(settings.keys).replace("\n", " ")
+
+    def run() -> int:
+        for char in text:
+            backend.type_character(char, 0.0)
+        return len(text)
+
+    return measure(run, unit="key", repeat=settings.repeat)
+
+
+def _logging_case(settings: Settings, logger_name: str) -> Result:
+    """Cost of one ``debug`` call on the typing thread with DEBUG logging configured."""
+
+    logger = logging.getLogger(logger_name)
+    setup_logging("DEBUG", settings.workdir / "logs", console=False)
+
+    def run() -> int:
+        for index in range(settings.keys):
+            logger.debug("按键 %d", index)
+        return settings.keys
+
+    try:
+        return measure(run, unit="call", repeat=settings.repeat)
+    finally:
+        disable_logging()
+
+
+def iter_cases(settings: Settings) -> Iterator[Case]:
+    for size in settings.sizes:
+        label = format_size(size)
+        for target in TARGETS:
+            yield (
+                f"script.{target}.{label}",
+                lambda size=size, target=target: _script_case(settings, size, target),
+            )
+            yield (
+                f"plan.{target}.{label}",
+                lambda size=size, target=target: _plan_case(settings, size, target, False),
+            )
+            if size <= settings.fec_limit:
+                yield (
+                    f"plan-fec.{target}.{label}",
+                    lambda size=size, target=target: _plan_case(settings, size, target, True),
+                )
+    label = format_size(settings.archive_size)
+    for workers in sorted({*ARCHIVE_WORKERS, default_workers()}):
+        yield (
+            f"archive.w{workers}.{label}",
+            lambda workers=workers: _archive_case(settings, workers),
+        )
+    yield "simulator.null", lambda: _simulator_case(settings)
+    yield "sendinput.inputs", lambda: _sendinput_case(settings)
+    # 输入循环所在模块被级别闸门拦截；其他模块的记录只入队，由监听线程写入
+    yield "logging.gated", lambda: _logging_case(settings, "keyboard_simulator.simulator")
+    yield "logging.queued", lambda: _logging_case(settings, "benchmarks.logging")
+
+
+def case_names(settings: Settings) -> List[str]:
+    return [name for name, _ in iter_cases(settings)]
+
+
+__all__ = ["DEFAULT_SIZES", "FakeUser32", "Settings", "iter_cases", "case_names"]
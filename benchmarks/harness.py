@@ -0,0 +1,212 @@
+"""Timing, JSON baselines and regression comparison."""
+
+from __future__ import annotations
+
+import gc
+import json
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+FORMAT_VERSION = 1
+DEFAULT_THRESHOLD = 0.2
+# 单次重复的最短计时 (秒)
+MIN_TIME = 0.05
+
+_SIZE_SUFFIXES = {"": 1, "B": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+@dataclass(slots=True)
+class Result:
+    """Best-of-``repeat`` timing of one benchmark."""
+
+    seconds: float
+    work: int
+    unit: str
+    repeat: int
+
+    @property
+    def throughput(self) -> float:
+        return self.work / self.seconds if self.seconds > 0 else 0.0
+
+
+def parse_size(text: str) -> int:
+    """Parse ``"64K"``, ``"1M"`` or ``"1G"`` into bytes."""
+
+    text = text.strip().upper()
+    suffix = text[-1] if text and text[-1] in _SIZE_SUFFIXES else ""
+    number = text[: len(text) - len(suffix)] if suffix else text
+    try:
+        value = int(number) * _SIZE_SUFFIXES[suffix]
+    except ValueError:
+        raise ValueError(f"无效的大小: {text!r}") from None
+    if value <= 0:
+        raise ValueError(f"大小必须为正数: {text!r}")
+    return value
+
+
+def format_size(size: int) -> str:
+    for suffix in ("G", "M", "K"):
+        factor = _SIZE_SUFFIXES[suffix]
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{suffix}"
+    return f"{size}B"
+
+
+def measure(
+    run: Callable[[], int],
+    *,
+    unit: str,
+    repeat: int = 3,
+    min_time: float = MIN_TIME,
+) -> Result:
+    """Time ``run`` ``repeat`` times and keep the fastest.
+
+    ``run`` returns the amount of work done (bytes, characters, keys) so the
+    throughput can be reported. Calls faster than ``min_time`` are looped
+    until a repetition lasts at least that long, which keeps tiny inputs
+    from being dominated by timer noise. The garbage collector is paused
+    while timing.
+    """
+
+    best = float("inf")
+    work = 0
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            calls = 0
+            started = time.perf_counter()
+            while True:
+                work = run()
+                calls += 1
+                elapsed = time.perf_counter() - started
+                if elapsed >= min_time:
+                    break
+        finally:
+            gc.enable()
+        best = min(best, elapsed / calls)
+    return Result(seconds=best, work=work, unit=unit, repeat=repeat)
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": sys.platform,
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def save(results: Dict[str, Result], path: Path) -> None:
+    document = {
+        "version": FORMAT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "results": {
+            name: dict(asdict(result), throughput=result.throughput)
+            for name, result in sorted(results.items())
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def load(path: Path) -> Dict[str, Result]:
+    document = json.loads(Path(path).read_text(encoding="utf-8"))
+    if document.get("version") != FORMAT_VERSION:
+        raise ValueError(f"不支持的基准文件版本: {document.get('version')!r}")
+    return {
+        name: Result(
+            seconds=float(entry["seconds"]),
+            work=int(entry["work"]),
+            unit=str(entry["unit"]),
+            repeat=int(entry.get("repeat", 1)),
+        )
+        for name, entry in document["results"].items()
+    }
+
+
+@dataclass(slots=True, frozen=True)
+class Comparison:
+    name: str
+    baseline: Optional[Result]
+    current: Optional[Result]
+    threshold: float
+
+    @property
+    def change(self) -> Optional[float]:
+        """Relative change in throughput; negative means slower."""
+
+        if self.baseline is None or self.current is None or not self.baseline.throughput:
+            return None
+        return self.current.throughput / self.baseline.throughput - 1
+
+    @property
+    def regressed(self) -> bool:
+        change = self.change
+        return change is not None and change < -self.threshold
+
+
+def compare(
+    baseline: Dict[str, Result], current: Dict[str, Result], *, threshold: float = DEFAULT_THRESHOLD
+) -> List[Comparison]:
+    """Pair up results by name; a benchmark regresses when its throughput
+    drops by more than ``threshold`` (0.2 = 20 %)."""
+
+    names = sorted(set(baseline) | set(current))
+    return [
+        Comparison(name, baseline.get(name), current.get(name), threshold) for name in names
+    ]
+
+
+def _rate(result: Optional[Result]) -> str:
+    if result is None:
+        return "-"
+    value = result.throughput
+    for factor, prefix in ((1e9, "G"), (1e6, "M"), (1e3, "K")):
+        if value >= factor:
+            return f"{value / factor:.2f} {prefix}{result.unit}/s"
+    return f"{value:.1f} {result.unit}/s"
+
+
+def format_results(results: Dict[str, Result]) -> str:
+    lines = [f"{'基准':<36}{'耗时(秒)':>12}{'吞吐量':>22}"]
+    for name, result in results.items():
+        lines.append(f"{name:<36}{result.seconds:>12.4f}{_rate(result):>22}")
+    return "\n".join(lines)
+
+
+def format_comparisons(comparisons: List[Comparison]) -> str:
+    lines = [f"{'基准':<36}{'基线':>20}{'当前':>20}{'变化':>10}"]
+    for item in comparisons:
+        change = item.change
+        if change is None:
+            verdict = "缺少" if item.current is None else "新增"
+            text = f"{verdict:>10}"
+        else:
+            text = f"{change:>+10.1%}"
+            if item.regressed:
+                text += "  回退"
+        lines.append(f"{item.name:<36}{_rate(item.baseline):>20}{_rate(item.current):>20}{text}")
+    return "\n".join(lines)
+
+
+__all__ = [
+    "DEFAULT_THRESHOLD",
+    "Result",
+    "Comparison",
+    "parse_size",
+    "format_size",
+    "measure",
+    "save",
+    "load",
+    "compare",
+    "format_results",
+    "format_comparisons",
+]
@@ -0,0 +1,266 @@
+"""End-to-end transfer check: type generated scripts into a local shell.
+
+Each corpus file is turned into a plan with :func:`build_plan`, typed at
+zero delay through :class:`PtyBackend` into ``bash --noediting`` (or
+``busybox sh``) running on the slave side of a pseudo-terminal, and the
+file the script reconstructs is compared byte for byte with the input.
+
+The shell runs in an empty temporary directory with a minimal environment
+(``HOME`` pointing at that directory, no profile or rc files, no history),
+so a broken script cannot touch anything outside it. Only the Linux
+variants can be executed here; Windows scripts need ``cmd`` / PowerShell.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from keyboard_simulator import config as cfg
+from keyboard_simulator.backends.pty import PtyBackend
+from keyboard_simulator.simulator import KeyboardSimulator
+from keyboard_simulator.tasks import build_plan
+
+from .harness import format_size
+
+DEFAULT_SIZES = (1 << 10, 64 << 10)
+OUTPUT_FILENAME = "received.bin"
+# 打完脚本后等待 shell 退出的最长时间 (秒)
+EXIT_TIMEOUT = 60.0
+
+PIPELINES: Dict[str, Tuple[int, int]] = {
+    # 名称: (fec_group_size, fec_parity)
+    "plain": (0, 1),
+    "fec-8+1": (8, 1),
+}
+
+SHELLS: Dict[str, List[str]] = {
+    "bash": ["bash", "--noprofile", "--norc", "--noediting", "-i"],
+    "busybox": ["busybox", "sh", "-i"],
+}
+
+
+@dataclass(slots=True)
+class TransferResult:
+    name: str
+    pipeline: str
+    size: int
+    keystrokes: int
+    elapsed: float
+    ok: bool
+    detail: str = ""
+
+    @property
+    def keystrokes_per_byte(self) -> float:
+        return self.keystrokes / self.size if self.size else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, object]:
+        return dict(
+            asdict(self),
+            keystrokes_per_byte=self.keystrokes_per_byte,
+            bytes_per_second=self.bytes_per_second,
+        )
+
+
+def _text(size: int, rng: random.Random) -> bytes:
+    words = ["keyboard", "simulator", "传输", "echo", "base64", "line", "$HOME", "'quote'", "\t"]
+    parts: List[str] = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word + ("\n" if rng.random() < 0.1 else " "))
+        length += len(parts[-1].encode("utf-8"))
+    return "".join(parts).encode("utf-8")[:size]
+
+
+def build_corpus(directory: Path, sizes: Sequence[int], *, seed: int = 0) -> List[Path]:
+    """Write text, random binary and all-zero files of every size.
+
+    Sizes are nudged off multiples of three so Base64 padding is exercised.
+    """
+
+    rng = random.Random(seed)
+    corpus: List[Path] = []
+    for size in sizes:
+        label = format_size(size)
+        odd = size + 1 if size % 3 == 0 else size
+        contents = {
+            f"text-{label}.txt": _text(size, rng),
+            f"binary-{label}.bin": rng.randbytes(odd),
+            f"zeros-{label}.bin": bytes(size),
+        }
+        for name, data in contents.items():
+            path = directory / name
+            path.write_bytes(data)
+            corpus.append(path)
+    return corpus
+
+
+class _Drain(threading.Thread):
+    """Read (and discard) the shell's echo so the pty never fills up."""
+
+    def __init__(self, fd: int):
+        super().__init__(name="transfer-drain", daemon=True)
+        self.fd = fd
+        self.received = 0
+        self.tail = b""
+
+    def run(self) -> None:
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError:
+                return
+            if not data:
+                return
+            self.received += len(data)
+            self.tail = (self.tail + data)[-2048:]
+
+
+def _shell_env(sandbox: Path) -> Dict[str, str]:
+    # python3 (FEC 解码器) 与当前解释器保持一致
+    path = os.pathsep.join([os.path.dirname(sys.executable), "/usr/local/bin", "/usr/bin", "/bin"])
+    return {
+        "PATH": path,
+        "HOME": str(sandbox),
+        "PS1": "",
+        "PS2": "",
+        "HISTFILE": "/dev/null",
+        "LANG": "C.UTF-8",
+        "TERM": "dumb",
+    }
+
+
+def run_transfer(
+    source: Path, pipeline: str, *, shell: str = "bash", timeout: float = EXIT_TIMEOUT
+) -> TransferResult:
+    """Type the plan for ``source`` into a fresh shell and verify the result."""
+
+    group_size, parity = PIPELINES[pipeline]
+    size = source.stat().st_size
+    with tempfile.TemporaryDirectory(prefix="ks-transfer-") as workdir:
+        sandbox = Path(workdir)
+        config = cfg.FileConfig(
+            delay_between_keystrokes=0.0,
+            countdown_before_start=0,
+            file_path=source,
+            target_os="linux",
+            output_filename=OUTPUT_FILENAME,
+            fec_group_size=group_size,
+            fec_parity=parity,
+        )
+        plan = build_plan(config)
+        keystrokes = plan.total_characters or 0
+
+        master, slave = os.openpty()
+        drain = _Drain(master)
+        started = time.perf_counter()
+        try:
+            process = subprocess.Popen(
+                SHELLS[shell],
+                stdin=slave,
+                stdout=slave,
+                stderr=slave,
+                cwd=sandbox,
+                env=_shell_env(sandbox),
+                start_new_session=True,
+            )
+        finally:
+            os.close(slave)
+        drain.start()
+        try:
+            backend = PtyBackend(master)
+            stats = KeyboardSimulator(backend).run_plan(plan)
+            for char in "exit\n":
+                backend.type_character(char, 0.0)
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            return TransferResult(
+                source.name, pipeline, size, keystrokes, time.perf_counter() - started, False,
+                f"shell 未在 {timeout:.0f} 秒内退出: {drain.tail[-200:]!r}",
+            )
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            os.close(master)
+            drain.join(timeout=1.0)
+        elapsed = time.perf_counter() - started
+        # 稀疏编码的计划在输入完成后才知道确切长度
+        keystrokes = plan.total_characters or 0
+
+        if stats.characters != keystrokes:
+            detail = f"只输入了 {stats.characters}/{keystrokes} 个字符"
+            return TransferResult(source.name, pipeline, size, keystrokes, elapsed, False, detail)
+        output = sandbox / OUTPUT_FILENAME
+        if not output.is_file():
+            detail = f"未生成输出文件: {drain.tail[-200:]!r}"
+            return TransferResult(source.name, pipeline, size, keystrokes, elapsed, False, detail)
+        ok = output.read_bytes() == source.read_bytes()
+        leftovers = sorted(p.name for p in sandbox.iterdir() if p.name != OUTPUT_FILENAME)
+        if ok and leftovers:
+            ok, detail = False, f"残留临时文件: {', '.join(leftovers)}"
+        else:
+            detail = "" if ok else "输出与输入不一致"
+        return TransferResult(source.name, pipeline, size, keystrokes, elapsed, ok, detail)
+
+
+def iter_transfers(
+    corpus: Sequence[Path], pipelines: Sequence[str], *, shell: str = "bash"
+) -> Iterator[TransferResult]:
+    for path in corpus:
+        for pipeline in pipelines:
+            yield run_transfer(path, pipeline, shell=shell)
+
+
+def shell_available(shell: str) -> bool:
+    return shutil.which(SHELLS[shell][0]) is not None
+
+
+def format_transfers(results: Sequence[TransferResult]) -> str:
+    lines = [
+        f"{'文件':<24}{'管线':<10}{'字节':>10}{'按键':>12}{'按键/字节':>12}"
+        f"{'吞吐量(KB/s)':>14}  结果"
+    ]
+    for item in results:
+        verdict = "通过" if item.ok else f"失败 ({item.detail})"
+        lines.append(
+            f"{item.name:<24}{item.pipeline:<10}{item.size:>10,}{item.keystrokes:>12,}"
+            f"{item.keystrokes_per_byte:>12.3f}{item.bytes_per_second / 1024:>14.1f}  {verdict}"
+        )
+    return "\n".join(lines)
+
+
+def summarize(results: Sequence[TransferResult]) -> Optional[str]:
+    failed = [f"{item.name}/{item.pipeline}" for item in results if not item.ok]
+    if not failed:
+        return None
+    return f"{len(failed)} 项传输未能逐字节还原: {', '.join(failed)}"
+
+
+__all__ = [
+    "PIPELINES",
+    "SHELLS",
+    "TransferResult",
+    "build_corpus",
+    "run_transfer",
+    "iter_transfers",
+    "shell_available",
+    "format_transfers",
+    "summarize",
+]
@@ -3,11 +3,12 @@
 from __future__ import annotations
 
 import logging
+import multiprocessing
 import sys
 import threading
 import time
 from pathlib import Path
-from typing import Optional, cast
+from typing import Optional, Union, cast
 
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
@@ -20,32 +21,65 @@ if SRC_DIR.exists() and str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
 try:
+    from keyboard_simulator.cache import open_cache
     from keyboard_simulator.config import ConfigError, FileConfig, TextConfig, TargetOS
-    from keyboard_simulator.tasks import build_plan
+    from keyboard_simulator.encoding import encoded_length, reconstruction_script_length
+    from keyboard_simulator.estimate import (
+        DEFAULT_CALIBRATION,
+        Calibration,
+        PayloadProfile,
+        estimate_profile,
+        format_duration,
+        record_run,
+    )
+    from keyboard_simulator.planner import PlanWorker, describe_progress
+    from keyboard_simulator.progress import format_progress
     from keyboard_simulator.simulator import KeyboardSimulator, SimulatorHooks
     from keyboard_simulator.backends.sendinput import SendInputBackend
+    from keyboard_simulator.backends.session import BackendSession
     from keyboard_simulator.logging_config import setup_logging, disable_logging
+    from keyboard_simulator.worker import SimulatorProcess
 except ModuleNotFoundError:  # pragma: no cover - fallback for direct execution without install
     if str(SRC_DIR) not in sys.path:
         sys.path.insert(0, str(SRC_DIR))
+    from keyboard_simulator.cache import open_cache
     from keyboard_simulator.config import ConfigError, FileConfig, TextConfig, TargetOS
-    from keyboard_simulator.tasks import build_plan
+    from keyboard_simulator.encoding import encoded_length, reconstruction_script_length
+    from keyboard_simulator.estimate import (
+        DEFAULT_CALIBRATION,
+        Calibration,
+        PayloadProfile,
+        estimate_profile,
+        format_duration,
+        record_run,
+    )
+    from keyboard_simulator.planner import PlanWorker, describe_progress
+    from keyboard_simulator.progress import format_progress
     from keyboard_simulator.simulator import KeyboardSimulator, SimulatorHooks
     from keyboard_simulator.backends.sendinput import SendInputBackend
+    from keyboard_simulator.backends.session import BackendSession
     from keyboard_simulator.logging_config import setup_logging, disable_logging
+    from keyboard_simulator.worker import SimulatorProcess
 
 # --- Conditional Logging ---
 # If running from source (e.g., pyproject.toml exists) or --log is passed, enable logging.
 # This prevents logging in the bundled executable by default.
-if Path("pyproject.toml").exists() or "--log" in sys.argv:
-    setup_logging()
-else:
-    disable_logging()
+# The worker process imports this file as its main module; its records go to this process.
+if multiprocessing.parent_process() is None:
+    if Path("pyproject.toml").exists() or "--log" in sys.argv:
+        setup_logging()
+    else:
+        disable_logging()
 
 logger = logging.getLogger(__name__)
 
+PLAN_POLL_INTERVAL_MS = 50
+PROGRESS_REFRESH_MS = 100
+ESTIMATE_DEBOUNCE_MS = 400
+
 STATUS_MAP = {
     "idle": "状态: 空闲",
+    "preparing": "状态: 正在准备任务...",
     "countdown": "状态: {seconds_left} 秒后开始...",
     "running": "状态: 运行中... 请勿操作键鼠！",
     "paused": "状态: 已暂停",
@@ -69,8 +103,21 @@ class App(TkinterDnD.Tk):
         self.target_os = tk.StringVar(value="linux")
         self.input_method = tk.StringVar(value="scancode")
         self.status_var = tk.StringVar(value=STATUS_MAP["idle"])
-        self.simulator: Optional[KeyboardSimulator] = None
+        self.use_process = tk.BooleanVar(value=False)
+        self.calibrate = tk.BooleanVar(value=True)
+        # 模拟器在本进程的线程中运行，或由独立的模拟进程代为运行
+        self.simulator: Optional[Union[KeyboardSimulator, SimulatorProcess]] = None
+        self.simulator_process: Optional[SimulatorProcess] = None
         self.simulation_thread: Optional[threading.Thread] = None
+        self.plan_worker: Optional[PlanWorker] = None
+        self.current_config = None
+        self.calibration = Calibration.load(DEFAULT_CALIBRATION)
+        self.estimate_var = tk.StringVar(value="")
+        self._estimate_job: Optional[str] = None
+        # The backend stays started between runs; each Start only revalidates it.
+        self.backend_session = BackendSession(SendInputBackend)
+        # Scripts of files sent before are reused instead of re-encoded.
+        self.payload_cache = open_cache()
 
         logger.info("Initializing GUI application.")
         self._create_widgets()
@@ -125,6 +172,9 @@ class App(TkinterDnD.Tk):
         ttk.Radiobutton(os_frame, text="Windows", variable=self.target_os, value="windows").pack(
             side=tk.LEFT, padx=10
         )
+        ttk.Label(file_frame, textvariable=self.estimate_var, anchor="w").pack(
+            fill=tk.X, pady=(5, 0)
+        )
 
         settings_frame = ttk.LabelFrame(main_frame, text="通用设置", padding="10")
         settings_frame.pack(fill=tk.X, pady=10)
@@ -137,6 +187,10 @@ class App(TkinterDnD.Tk):
         )
         self.delay_spinbox.set("0.01")
         self.delay_spinbox.grid(row=0, column=1, sticky="w", padx=5, pady=5)
+        self.delay_spinbox.config(command=self._schedule_estimate)
+        self.delay_spinbox.bind("<KeyRelease>", lambda _event: self._schedule_estimate())
+        self.file_path.trace_add("write", lambda *_: self._schedule_estimate())
+        self.target_os.trace_add("write", lambda *_: self._schedule_estimate())
 
         ttk.Label(settings_frame, text="启动倒计时(秒):").grid(
             row=0, column=2, sticky="w", padx=15, pady=5
@@ -163,6 +217,17 @@ class App(TkinterDnD.Tk):
             value="unicode",
         ).pack(side=tk.LEFT, padx=5)
 
+        ttk.Checkbutton(
+            settings_frame,
+            text="在独立进程中运行 (界面操作不影响按键节奏)",
+            variable=self.use_process,
+        ).grid(row=2, column=0, columnspan=4, sticky="w", padx=5, pady=5)
+        ttk.Checkbutton(
+            settings_frame,
+            text=f"完成后更新耗时校准 ({DEFAULT_CALIBRATION})",
+            variable=self.calibrate,
+        ).grid(row=3, column=0, columnspan=4, sticky="w", padx=5, pady=5)
+
         control_frame = ttk.Frame(main_frame)
         control_frame.pack(fill=tk.X, pady=5)
 
@@ -188,6 +253,15 @@ class App(TkinterDnD.Tk):
         )
         self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
+        progress_frame = ttk.Frame(main_frame)
+        progress_frame.pack(fill=tk.X, side=tk.BOTTOM, pady=(5, 0))
+        self.progress_bar = ttk.Progressbar(progress_frame, maximum=1.0, mode="determinate")
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.progress_var = tk.StringVar(value="")
+        ttk.Label(progress_frame, textvariable=self.progress_var, width=36, anchor="e").pack(
+            side=tk.LEFT, padx=(10, 0)
+        )
+
     # --- 热键 & 交互 ---
     def _setup_hotkeys(self) -> None:
         try:
@@ -232,6 +306,43 @@ class App(TkinterDnD.Tk):
             logger.error("Error processing dropped file path: %s", e, exc_info=True)
             messagebox.showerror("错误", f"处理路径时出错: {path_str}\n{e}")
 
+    # --- 预估 ---
+    def _schedule_estimate(self) -> None:
+        if self._estimate_job is not None:
+            self.after_cancel(self._estimate_job)
+        self._estimate_job = self.after(ESTIMATE_DEBOUNCE_MS, self._start_estimate)
+
+    def _start_estimate(self) -> None:
+        self._estimate_job = None
+        path = Path(self.file_path.get())
+        try:
+            delay = float(self.delay_spinbox.get())
+        except ValueError:
+            delay = -1.0
+        if not self.file_path.get() or not path.is_file() or delay < 0:
+            self.estimate_var.set("")
+            return
+
+        # The file tab only sends plain transfers, whose script length follows from the
+        # file size alone; the file is never read, so no background work can pile up.
+        try:
+            size = path.stat().st_size
+        except OSError as exc:
+            logger.warning("Estimate failed: %s", exc)
+            self.estimate_var.set(f"预计: 无法估算 ({exc})")
+            return
+        characters = reconstruction_script_length(
+            encoded_length(size), path.name, self.target_os.get()
+        )
+        estimate = estimate_profile(
+            PayloadProfile(characters=characters),
+            "sendinput",
+            delay,
+            calibration=self.calibration,
+        )
+        duration = format_duration(estimate.seconds)
+        self.estimate_var.set(f"预计: {estimate.keystrokes:,} 次按键，约 {duration}")
+
     # --- 模拟控制 ---
     def _start_simulation(self) -> None:
         if self.is_running:
@@ -242,17 +353,53 @@ class App(TkinterDnD.Tk):
             logger.info("Building configuration from UI.")
             config = self._build_config_from_ui()
             logger.debug("Built config: %s", config)
-            plan = build_plan(config)
-            logger.info("Built plan with %d tasks.", len(plan.tasks))
         except (ValueError, ConfigError) as exc:
             logger.error("Configuration error: %s", exc, exc_info=True)
             messagebox.showerror("配置错误", str(exc))
             return
-        except Exception as exc:  # pragma: no cover - unexpected
-            logger.critical("Failed to build plan: %s", exc, exc_info=True)
-            messagebox.showerror("错误", f"构建任务失败:\n{exc}")
+
+        # Reading and encoding large files happens on a worker so the UI stays responsive.
+        self.current_config = config
+        self.is_running = True
+        self.is_paused = False
+        self.simulator = None
+        self._update_controls(running=True)
+        self._on_status("preparing")
+        if self.use_process.get():
+            self._launch_in_process(config)
+            return
+        self.plan_worker = PlanWorker(config, cache=self.payload_cache)
+        self.plan_worker.start()
+        self.after(PLAN_POLL_INTERVAL_MS, self._poll_plan_worker)
+
+    def _poll_plan_worker(self) -> None:
+        worker = self.plan_worker
+        if worker is None:
             return
+        for kind, value in worker.poll():
+            if kind == "progress":
+                self.status_var.set(f"状态: {describe_progress(value)}")
+            elif kind == "done":
+                self.plan_worker = None
+                logger.info("Built plan with %d tasks.", len(value.tasks))
+                self._launch_plan(value)
+                return
+            elif kind == "cancelled":
+                self.plan_worker = None
+                logger.info("Plan building cancelled by user.")
+                self._on_status("stopped")
+                return
+            elif kind == "error":
+                self.plan_worker = None
+                self._on_status("error")
+                if isinstance(value, (ValueError, ConfigError)):
+                    messagebox.showerror("配置错误", str(value))
+                else:
+                    messagebox.showerror("错误", f"构建任务失败:\n{value}")
+                return
+        self.after(PLAN_POLL_INTERVAL_MS, self._poll_plan_worker)
 
+    def _launch_plan(self, plan) -> None:
         prefer_unicode = self.input_method.get() == "unicode"
         logger.info("Input method selected: %s", "unicode" if prefer_unicode else "scancode")
 
@@ -266,11 +413,16 @@ class App(TkinterDnD.Tk):
             on_countdown=on_countdown_wrapper,
             on_status=on_status_wrapper,
         )
-        self.simulator = KeyboardSimulator(SendInputBackend(), hooks)
+        try:
+            backend = self.backend_session.acquire()
+        except Exception as exc:
+            logger.critical("Failed to initialize backend: %s", exc, exc_info=True)
+            self._on_status("error")
+            messagebox.showerror("错误", f"初始化键盘后端失败:\n{exc}")
+            return
+        self.simulator = KeyboardSimulator(backend, hooks)
+        calibrate = self.calibrate.get()
 
-        self.is_running = True
-        self.is_paused = False
-        self._update_controls(running=True)
         logger.info("Starting simulation thread.")
 
         def runner() -> None:
@@ -280,8 +432,10 @@ class App(TkinterDnD.Tk):
                 return
             try:
                 logger.info("Simulation plan execution started.")
-                sim.run_plan(plan)
+                stats = sim.run_plan(plan)
                 logger.info("Simulation plan execution finished.")
+                if calibrate and self.current_config is not None:
+                    record_run(self.calibration, self.current_config, "sendinput", stats)
             except Exception as exc:  # pragma: no cover - runtime failure
                 logger.critical("Runtime error during simulation: %s", exc, exc_info=True)
                 self.after(0, messagebox.showerror, "运行时错误", f"发生错误:\n{exc}")
@@ -289,6 +443,59 @@ class App(TkinterDnD.Tk):
 
         self.simulation_thread = threading.Thread(target=runner, daemon=True)
         self.simulation_thread.start()
+        self.progress_bar.config(value=0)
+        self.after(PROGRESS_REFRESH_MS, self._refresh_progress)
+
+    def _launch_in_process(self, config) -> None:
+        # The child builds the plan and types it; this process only draws the UI.
+        if self.simulator_process is None:
+            self.simulator_process = SimulatorProcess(
+                SendInputBackend,
+                SimulatorHooks(
+                    on_countdown=lambda left: self.after(0, self._on_countdown, left),
+                    on_status=lambda status: self.after(0, self._on_status, status),
+                ),
+            )
+        worker = self.simulator_process
+        self.simulator = worker
+        calibrate = self.calibrate.get()
+
+        def show_plan_progress(progress) -> None:
+            self.after(0, self.status_var.set, f"状态: {describe_progress(progress)}")
+
+        def runner() -> None:
+            try:
+                logger.info("Simulation started in worker process.")
+                stats = worker.run(config, on_plan_progress=show_plan_progress)
+                logger.info("Simulation in worker process finished: %s", stats.status)
+                if calibrate:
+                    record_run(self.calibration, config, "sendinput", stats)
+            except (ValueError, ConfigError) as exc:
+                logger.error("Configuration error: %s", exc)
+                self.after(0, messagebox.showerror, "配置错误", str(exc))
+                self.after(0, self._on_status, "error")
+            except Exception as exc:  # pragma: no cover - runtime failure
+                logger.critical("Runtime error in worker process: %s", exc, exc_info=True)
+                self.after(0, messagebox.showerror, "运行时错误", f"发生错误:\n{exc}")
+                self.after(0, self._on_status, "error")
+
+        self.simulation_thread = threading.Thread(target=runner, daemon=True)
+        self.simulation_thread.start()
+        self.progress_bar.config(value=0)
+        self.after(PROGRESS_REFRESH_MS, self._refresh_progress)
+
+    def _refresh_progress(self) -> None:
+        # The simulator publishes immutable snapshots; reading one needs no lock.
+        simulator = self.simulator
+        if simulator is None:
+            return
+        snapshot = simulator.progress
+        fraction = snapshot.fraction
+        if fraction is not None:
+            self.progress_bar.config(value=fraction)
+        self.progress_var.set(format_progress(snapshot))
+        if self.is_running:
+            self.after(PROGRESS_REFRESH_MS, self._refresh_progress)
 
     def _build_config_from_ui(self):
         delay = float(self.delay_spinbox.get())
@@ -319,6 +526,11 @@ class App(TkinterDnD.Tk):
         )
 
     def _force_stop(self) -> None:
+        if self.plan_worker is not None:
+            logger.info("Cancelling plan building.")
+            self.plan_worker.cancel()
+            self._on_status("aborting")
+            return
         if not self.is_running or self.simulator is None:
             return
         logger.info("Force stop requested by user.")
@@ -364,6 +576,7 @@ class App(TkinterDnD.Tk):
         if status in {"completed", "stopped", "error"}:
             self.is_running = False
             self.is_paused = False
+            self._refresh_progress()
             self.pause_button.config(text="暂停 (F11)")
             self._update_controls(running=False)
 
@@ -380,14 +593,21 @@ class App(TkinterDnD.Tk):
             if not messagebox.askyesno("退出", "模拟任务正在运行，确定要退出吗？"):
                 logger.info("User cancelled exit.")
                 return
+            if self.plan_worker is not None:
+                self.plan_worker.cancel()
             if self.simulator:
                 logger.info("Stopping simulation before exit.")
                 self.simulator.stop()
+        self.backend_session.close()
+        if self.simulator_process is not None:
+            self.simulator_process.close()
         logger.info("Destroying main window.")
         self.destroy()
 
 
 if __name__ == "__main__":  # pragma: no cover
+    # 打包后的程序以 spawn 方式启动模拟进程时需要
+    multiprocessing.freeze_support()
     try:
         logger.info("Application starting.")
         app = App()
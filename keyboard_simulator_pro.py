@@ -14,12 +14,12 @@
 #      所有非热键的物理按键。
 # -----------------------------------------------------------------------------
 
+import functools
+import multiprocessing
 import sys
-import time
-import os
 import threading
 from pathlib import Path
-from typing import cast
+from typing import Optional, Union, cast
 import logging
 
 import tkinter as tk
@@ -34,114 +34,67 @@ if SRC_DIR.exists() and str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
 try:
+    from keyboard_simulator.cache import open_cache
     from keyboard_simulator.config import ConfigError, FileConfig, TextConfig, TargetOS
-    from keyboard_simulator.tasks import build_plan
+    from keyboard_simulator.estimate import DEFAULT_CALIBRATION, Calibration, record_run
+    from keyboard_simulator.planner import PlanWorker, describe_progress
+    from keyboard_simulator.progress import format_progress
+    from keyboard_simulator.simulator import KeyboardSimulator, SimulatorHooks
+    from keyboard_simulator.backends.interception import (
+        DEFAULT_DEVICE_CACHE,
+        HotkeyListener,
+        InterceptionBackend,
+        KeyboardDeviceCache,
+        discover_keyboard,
+    )
+    from keyboard_simulator.backends.session import BackendSession
     from keyboard_simulator.logging_config import setup_logging, disable_logging
+    from keyboard_simulator.worker import SimulatorProcess
 except ModuleNotFoundError:  # pragma: no cover - fallback for direct execution without install
     if str(SRC_DIR) not in sys.path:
         sys.path.insert(0, str(SRC_DIR))
+    from keyboard_simulator.cache import open_cache
     from keyboard_simulator.config import ConfigError, FileConfig, TextConfig, TargetOS
-    from keyboard_simulator.tasks import build_plan
+    from keyboard_simulator.estimate import DEFAULT_CALIBRATION, Calibration, record_run
+    from keyboard_simulator.planner import PlanWorker, describe_progress
+    from keyboard_simulator.progress import format_progress
+    from keyboard_simulator.simulator import KeyboardSimulator, SimulatorHooks
+    from keyboard_simulator.backends.interception import (
+        DEFAULT_DEVICE_CACHE,
+        HotkeyListener,
+        InterceptionBackend,
+        KeyboardDeviceCache,
+        discover_keyboard,
+    )
+    from keyboard_simulator.backends.session import BackendSession
     from keyboard_simulator.logging_config import setup_logging, disable_logging
+    from keyboard_simulator.worker import SimulatorProcess
 
 # --- Conditional Logging ---
-if Path("pyproject.toml").exists() or "--log" in sys.argv:
-    setup_logging()
-else:
-    disable_logging()
+# 独立模拟进程以本文件为主模块导入，其日志转发给界面进程
+if multiprocessing.parent_process() is None:
+    if Path("pyproject.toml").exists() or "--log" in sys.argv:
+        setup_logging()
+    else:
+        disable_logging()
 
 logger = logging.getLogger(__name__)
 
+PLAN_POLL_INTERVAL_MS = 50
+PROGRESS_REFRESH_MS = 100
 
-# --- Core Keyboard Simulator Class ---
-class KeyboardSimulatorPro:
-    def __init__(self, context, device):
-        self.stop_event = threading.Event()
-        self.pause_event = threading.Event()
-        self.pause_event.set()  # Not paused by default
-        self.keyboard_device = device
-        self.context = context
-
-    def _check_pause_and_stop(self):
-        while not self.pause_event.is_set():
-            if self.stop_event.is_set():
-                return True
-            time.sleep(0.1)
-        return self.stop_event.is_set()
-
-    def _create_and_send_stroke(self, scan_code, is_extended, state):
-        """
-        正确地创建并发送一个 KeyStroke 对象。
-        """
-        key_stroke_cls = getattr(interception, "KeyStroke")
-        stroke = key_stroke_cls(scan_code, state)
-        if is_extended:
-            key_flag = getattr(interception, "KeyFlag")
-            stroke.flags |= key_flag.KEY_E0
-        self.context.send(self.keyboard_device, stroke)
-
-    def _press_key_from_data(self, key_data, delay):
-        """根据 get_key_information 返回的数据模拟按键"""
-        mods_down = []
-        if key_data.shift:
-            mods_down.append(keycodes.get_key_information("shift"))
-        if key_data.ctrl:
-            mods_down.append(keycodes.get_key_information("ctrl"))
-        if key_data.alt:
-            mods_down.append(keycodes.get_key_information("alt"))
-
-        # 按下修饰键
-        key_flag = getattr(interception, "KeyFlag")
-        for mod_data in mods_down:
-            self._create_and_send_stroke(
-                mod_data.scan_code, mod_data.is_extended, key_flag.KEY_DOWN
-            )
-            time.sleep(delay / 2)
-
-        # 按下主键
-        self._create_and_send_stroke(key_data.scan_code, key_data.is_extended, key_flag.KEY_DOWN)
-        time.sleep(delay)
-
-        # 释放主键
-        self._create_and_send_stroke(key_data.scan_code, key_data.is_extended, key_flag.KEY_UP)
-
-        # 释放修饰键
-        for mod_data in reversed(mods_down):
-            time.sleep(delay / 2)
-            self._create_and_send_stroke(mod_data.scan_code, mod_data.is_extended, key_flag.KEY_UP)
 
-    def type_string(self, s, delay):
-        for char in s:
-            if self._check_pause_and_stop():
-                logger.info("Stop signal detected, halting typing.")
-                return
-
-            try:
-                key_data = keycodes.get_key_information(char)
-                self._press_key_from_data(key_data, delay)
-            except getattr(keycodes, "UnknownKeyError", Exception):
-                logger.warning("Skipping unknown key: '%s'", char)
-
-            time.sleep(delay)
-
-    def generate_linux_command(self, encoded_data, output_filename):
-        chunk_size = 512
-        chunks = [encoded_data[i : i + chunk_size] for i in range(0, len(encoded_data), chunk_size)]
-        command = f"echo -n {chunks[0]}>{output_filename}.b64\n"
-        for chunk in chunks[1:]:
-            command += f"echo -n {chunk}>>{output_filename}.b64\n"
-        command += f"base64 -d {output_filename}.b64>{output_filename}\n"
-        command += f"rm {output_filename}.b64\n"
-        return command
-
-    def generate_windows_command(self, encoded_data, output_filename):
-        lines = [encoded_data[i : i + 76] for i in range(0, len(encoded_data), 76)]
-        command = f"echo {lines[0]}>tmp.b64\n"
-        for line in lines[1:]:
-            command += f"echo {line}>>tmp.b64\n"
-        command += f"certutil -decode tmp.b64 {output_filename}\n"
-        command += "del tmp.b64\n"
-        return command
+STATUS_MAP = {
+    "idle": "状态: 准备就绪 (驱动模式)",
+    "preparing": "状态: 正在准备任务...",
+    "countdown": "状态: {seconds_left} 秒后开始...",
+    "running": "状态: 运行中... 请勿操作键鼠！",
+    "paused": "状态: 已暂停",
+    "completed": "状态: 任务完成",
+    "stopped": "状态: 已被用户中止",
+    "aborting": "状态: 正在中止...",
+    "error": "状态: 发生错误",
+}
 
 
 # --- GUI Application Class ---
@@ -157,26 +110,32 @@ class App(TkinterDnD.Tk):
         self.is_paused = False
         self.file_path = tk.StringVar()
         self.target_os = tk.StringVar(value="linux")
+        self.use_process = tk.BooleanVar(value=False)
+        self.calibrate = tk.BooleanVar(value=True)
         self.simulation_thread = None
-        self.simulator = None
-        self.current_plan = None
+        # 模拟器在本进程的线程中运行，或由独立的模拟进程代为运行
+        self.simulator: Optional[Union[KeyboardSimulator, SimulatorProcess]] = None
+        self.simulator_process: Optional[SimulatorProcess] = None
+        self._process_device: Optional[int] = None
+        self.current_config = None
+        self.plan_worker = None
+        self.payload_cache = open_cache()
+        self.calibration = Calibration.load(DEFAULT_CALIBRATION)
 
         try:
             logger.info("Initializing Interception driver context.")
             context_cls = getattr(interception, "Interception")
             self.context = context_cls()
-            self.context.set_filter(
-                self.context.is_keyboard, interception.FilterKeyFlag.FILTER_KEY_ALL
-            )
 
-            self.keyboard_device = None
-            for i in range(20):
-                if self.context.is_keyboard(i):
-                    self.keyboard_device = i
-                    logger.info("Found keyboard device at index: %d", i)
-                    break
-            if self.keyboard_device is None:
-                raise RuntimeError("未找到键盘设备。")
+            self.device_cache = KeyboardDeviceCache.load(DEFAULT_DEVICE_CACHE)
+            self.keyboard_device = discover_keyboard(self.context, self.device_cache)
+            logger.info("Using keyboard device at index: %d", self.keyboard_device)
+            # 后端与热键监听线程共用驱动上下文；每次开始时只重新校验设备
+            self.backend_session = BackendSession(
+                lambda: InterceptionBackend(
+                    self.context, self.keyboard_device, device_cache=self.device_cache
+                )
+            )
         except Exception as e:
             logger.critical("Failed to initialize Interception driver: %s", e, exc_info=True)
             messagebox.showerror(
@@ -191,50 +150,29 @@ class App(TkinterDnD.Tk):
         self.F11_SCANCODE = keycodes.get_key_information("f11").scan_code
         logger.debug("Registered hotkey scancodes: F9=%d, F10=%d, F11=%d", self.F9_SCANCODE, self.F10_SCANCODE, self.F11_SCANCODE)
 
+        # 热键按扫描码预先登记；监听线程只在按下时调度回到界面线程
+        self.hotkey_listener = HotkeyListener(
+            self.context,
+            {
+                self.F9_SCANCODE: self._hotkey("F9", self._start_simulation),
+                self.F10_SCANCODE: self._hotkey("F10", self._force_stop),
+                self.F11_SCANCODE: self._hotkey("F11", self._toggle_pause),
+            },
+            device_cache=self.device_cache,
+        )
+        self.hotkey_listener.install_filter()
+
         self._create_widgets()
-        self.listener_thread = threading.Thread(target=self._keyboard_listener, daemon=True)
-        self.listener_thread.start()
+        self.hotkey_listener.start()
         self.protocol("WM_DELETE_WINDOW", self._on_closing)
         logger.info("PRO GUI initialized successfully.")
 
-    def _keyboard_listener(self):
-        logger.info("Keyboard listener thread started.")
-        while True:
-            try:
-                device = self.context.await_input()
-                if device is None:
-                    continue
-
-                stroke = self.context.devices[device].receive()
-
-                if stroke is None:
-                    continue
-
-                is_hotkey = False
-                if self.context.is_keyboard(device):
-                    key_flag = getattr(interception, "KeyFlag")
-                    flags = getattr(stroke, "flags", None)
-                    code = getattr(stroke, "code", None)
-                    if flags == key_flag.KEY_DOWN:
-                        if code == self.F9_SCANCODE:
-                            logger.debug("F9 hotkey pressed.")
-                            self.after(0, self._start_simulation)
-                            is_hotkey = True
-                        elif code == self.F10_SCANCODE:
-                            logger.debug("F10 hotkey pressed.")
-                            self.after(0, self._force_stop)
-                            is_hotkey = True
-                        elif code == self.F11_SCANCODE:
-                            logger.debug("F11 hotkey pressed.")
-                            self.after(0, self._toggle_pause)
-                            is_hotkey = True
-
-                if not is_hotkey:
-                    self.context.send(device, stroke)
+    def _hotkey(self, name, callback):
+        def action():
+            logger.debug("%s hotkey pressed.", name)
+            self.after(0, callback)
 
-            except Exception as e:
-                logger.error("Error in keyboard listener thread: %s", e, exc_info=True)
-                time.sleep(1)
+        return action
 
     def _create_widgets(self):
         main_frame = ttk.Frame(self, padding="10")
@@ -294,6 +232,16 @@ class App(TkinterDnD.Tk):
         self.countdown_spinbox = ttk.Spinbox(settings_frame, from_=1, to=60, width=8)
         self.countdown_spinbox.set("5")
         self.countdown_spinbox.grid(row=0, column=3, sticky="w", padx=5, pady=5)
+        ttk.Checkbutton(
+            settings_frame,
+            text="在独立进程中运行 (界面操作不影响按键节奏)",
+            variable=self.use_process,
+        ).grid(row=1, column=0, columnspan=4, sticky="w", padx=5, pady=5)
+        ttk.Checkbutton(
+            settings_frame,
+            text=f"完成后更新耗时校准 ({DEFAULT_CALIBRATION})",
+            variable=self.calibrate,
+        ).grid(row=2, column=0, columnspan=4, sticky="w", padx=5, pady=5)
         control_frame = ttk.Frame(main_frame)
         control_frame.pack(fill=tk.X, pady=5)
         self.start_button = ttk.Button(
@@ -309,9 +257,17 @@ class App(TkinterDnD.Tk):
         )
         self.stop_button.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=5)
         self.status_label = ttk.Label(
-            main_frame, text="状态: 准备就绪 (驱动模式)", relief=tk.SUNKEN, anchor="w", padding=5
+            main_frame, text=STATUS_MAP["idle"], relief=tk.SUNKEN, anchor="w", padding=5
         )
         self.status_label.pack(fill=tk.X, side=tk.BOTTOM, pady=(5, 0))
+        progress_frame = ttk.Frame(main_frame)
+        progress_frame.pack(fill=tk.X, side=tk.BOTTOM, pady=(5, 0))
+        self.progress_bar = ttk.Progressbar(progress_frame, maximum=1.0, mode="determinate")
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.progress_var = tk.StringVar(value="")
+        ttk.Label(progress_frame, textvariable=self.progress_var, width=36, anchor="e").pack(
+            side=tk.LEFT, padx=(10, 0)
+        )
 
     def _select_file(self) -> None:
         logger.debug("Opening file selection dialog.")
@@ -351,28 +307,146 @@ class App(TkinterDnD.Tk):
             logger.info("Building configuration from UI.")
             config = self._build_config_from_ui()
             logger.debug("Built config: %s", config)
-            plan = build_plan(config)
-            logger.info("Built plan with %d tasks.", len(plan.tasks))
         except (ValueError, ConfigError) as exc:
             logger.error("Configuration error: %s", exc, exc_info=True)
             messagebox.showerror("配置错误", str(exc))
             return
-        except Exception as exc:
-            logger.critical("Failed to build plan: %s", exc, exc_info=True)
-            messagebox.showerror("错误", f"任务构建失败:\n{exc}")
-            return
 
+        # 在后台线程中读取与编码文件，界面与 F10 在此期间保持可用
+        self.current_config = config
         self.is_running = True
-        self.simulator = KeyboardSimulatorPro(self.context, self.keyboard_device)
-        self.simulator.stop_event.clear()
-        self.simulator.pause_event.set()
-        self.current_plan = plan
+        self.is_paused = False
+        self.simulator = None
         self._update_ui_for_run_state(True)
-        logger.info("Starting simulation thread.")
-        self.simulation_thread = threading.Thread(
-            target=self._run_simulation, args=(plan,), daemon=True
+        self._on_status("preparing")
+        if self.use_process.get():
+            self._launch_in_process(config)
+            return
+        self.plan_worker = PlanWorker(config, cache=self.payload_cache)
+        self.plan_worker.start()
+        self.after(PLAN_POLL_INTERVAL_MS, self._poll_plan_worker)
+
+    def _poll_plan_worker(self):
+        worker = self.plan_worker
+        if worker is None:
+            return
+        for kind, value in worker.poll():
+            if kind == "progress":
+                self.status_label.config(text=f"状态: {describe_progress(value)}")
+            elif kind == "done":
+                self.plan_worker = None
+                logger.info("Built plan with %d tasks.", len(value.tasks))
+                self._launch_plan(value)
+                return
+            elif kind == "cancelled":
+                self.plan_worker = None
+                logger.info("Plan building cancelled by user.")
+                self._on_status("stopped")
+                return
+            elif kind == "error":
+                self.plan_worker = None
+                self._on_status("error")
+                if isinstance(value, (ValueError, ConfigError)):
+                    messagebox.showerror("配置错误", str(value))
+                else:
+                    messagebox.showerror("错误", f"任务构建失败:\n{value}")
+                return
+        self.after(PLAN_POLL_INTERVAL_MS, self._poll_plan_worker)
+
+    def _hooks(self):
+        return SimulatorHooks(
+            on_countdown=lambda left: self.after(0, self._on_countdown, left),
+            on_status=lambda status: self.after(0, self._on_status, status),
         )
+
+    def _launch_plan(self, plan):
+        try:
+            backend = self.backend_session.acquire()
+        except Exception as exc:
+            logger.critical("Keyboard device lost: %s", exc, exc_info=True)
+            self._on_status("error")
+            messagebox.showerror("驱动错误", f"未找到可用的键盘设备:\n{exc}")
+            return
+        simulator = KeyboardSimulator(backend, self._hooks())
+        self.simulator = simulator
+        config = self.current_config
+        calibrate = self.calibrate.get()
+
+        def runner():
+            try:
+                logger.info("Simulation plan execution started.")
+                stats = simulator.run_plan(plan)
+                logger.info("Simulation finished with status: %s", stats.status)
+                if calibrate and config is not None:
+                    record_run(self.calibration, config, "interception", stats)
+            except Exception as e:
+                logger.critical("Runtime error during simulation: %s", e, exc_info=True)
+                self.after(0, messagebox.showerror, "运行时错误", f"发生错误:\n{e}")
+                self.after(0, self._on_status, "error")
+
+        logger.info("Starting simulation thread.")
+        self.simulation_thread = threading.Thread(target=runner, daemon=True)
+        self.simulation_thread.start()
+        self.progress_bar.config(value=0)
+        self.after(PROGRESS_REFRESH_MS, self._refresh_progress)
+
+    def _launch_in_process(self, config):
+        # 子进程自建驱动上下文，只向该设备发送按键，不安装过滤器
+        try:
+            device = discover_keyboard(self.context, self.device_cache)
+        except Exception as exc:
+            logger.critical("Keyboard device lost: %s", exc, exc_info=True)
+            self._on_status("error")
+            messagebox.showerror("驱动错误", f"未找到可用的键盘设备:\n{exc}")
+            return
+        if self.simulator_process is not None and self._process_device != device:
+            self.simulator_process.close()
+            self.simulator_process = None
+        if self.simulator_process is None:
+            self.simulator_process = SimulatorProcess(
+                functools.partial(InterceptionBackend, device=device), self._hooks()
+            )
+            self._process_device = device
+        worker = self.simulator_process
+        self.simulator = worker
+        calibrate = self.calibrate.get()
+
+        def show_plan_progress(progress):
+            text = f"状态: {describe_progress(progress)}"
+            self.after(0, self.status_label.config, {"text": text})
+
+        def runner():
+            try:
+                logger.info("Simulation started in worker process.")
+                stats = worker.run(config, on_plan_progress=show_plan_progress)
+                logger.info("Simulation in worker process finished: %s", stats.status)
+                if calibrate:
+                    record_run(self.calibration, config, "interception", stats)
+            except (ValueError, ConfigError) as exc:
+                logger.error("Configuration error: %s", exc)
+                self.after(0, messagebox.showerror, "配置错误", str(exc))
+                self.after(0, self._on_status, "error")
+            except Exception as e:
+                logger.critical("Runtime error in worker process: %s", e, exc_info=True)
+                self.after(0, messagebox.showerror, "运行时错误", f"发生错误:\n{e}")
+                self.after(0, self._on_status, "error")
+
+        self.simulation_thread = threading.Thread(target=runner, daemon=True)
         self.simulation_thread.start()
+        self.progress_bar.config(value=0)
+        self.after(PROGRESS_REFRESH_MS, self._refresh_progress)
+
+    def _refresh_progress(self):
+        # 读取模拟器发布的不可变快照，无需加锁
+        simulator = self.simulator
+        if simulator is None:
+            return
+        snapshot = simulator.progress
+        if snapshot.fraction is not None:
+            self.progress_bar.config(value=snapshot.fraction)
+        self.progress_var.set(format_progress(snapshot))
+        if self.is_running:
+            self.after(PROGRESS_REFRESH_MS, self._refresh_progress)
 
     def _build_config_from_ui(self):
         delay = float(self.delay_spinbox.get())
@@ -402,42 +476,17 @@ class App(TkinterDnD.Tk):
             countdown_before_start=countdown,
         )
 
-    def _run_simulation(self, plan):
-        simulator = self.simulator
-        if simulator is None:
-            logger.error("Simulator object was None when runner thread started.")
-            self.after(0, self._update_ui_on_finish, "发生错误")
-            return
-        try:
-            logger.info("Simulation countdown started (%d seconds).", plan.countdown_before_start)
-            for i in range(plan.countdown_before_start, 0, -1):
-                if simulator.stop_event.is_set():
-                    logger.info("Simulation stopped by user during countdown.")
-                    self.after(0, self._update_ui_on_finish, "已被用户中止")
-                    return
-                self.after(0, self.status_label.config, {"text": f"状态: {i} 秒后开始..."})
-                time.sleep(1)
-
-            logger.info("Simulation running.")
-            self.after(0, self.status_label.config, {"text": "状态: 运行中... 请勿操作键鼠！"})
-            for task in plan.tasks:
-                simulator.type_string(task.payload, plan.delay_between_keystrokes)
-
-            final_status = "任务完成" if not simulator.stop_event.is_set() else "已被用户中止"
-            logger.info("Simulation finished with status: %s", final_status)
-            self.after(0, self._update_ui_on_finish, final_status)
-        except Exception as e:
-            logger.critical("Runtime error during simulation: %s", e, exc_info=True)
-            self.after(0, messagebox.showerror, "运行时错误", f"发生错误:\n{e}")
-            self.after(0, self._update_ui_on_finish, "发生错误")
-
     def _force_stop(self):
+        if self.plan_worker is not None:
+            logger.info("Cancelling plan building.")
+            self.plan_worker.cancel()
+            self._on_status("aborting")
+            return
         if not self.is_running or self.simulator is None:
             return
         logger.info("Force stop requested by user.")
-        self.simulator.stop_event.set()
-        self.simulator.pause_event.set()
-        self.status_label.config(text="状态: 正在中止...")
+        self._on_status("aborting")
+        self.simulator.stop()
 
     def _toggle_pause(self):
         if not self.is_running or self.simulator is None:
@@ -445,14 +494,25 @@ class App(TkinterDnD.Tk):
         self.is_paused = not self.is_paused
         if self.is_paused:
             logger.info("Simulation paused.")
-            self.simulator.pause_event.clear()
+            self.simulator.pause()
             self.pause_button.config(text="恢复 (F11)")
-            self.status_label.config(text="状态: 已暂停")
         else:
             logger.info("Simulation resumed.")
-            self.simulator.pause_event.set()
+            self.simulator.resume()
+            self.pause_button.config(text="暂停 (F11)")
+
+    def _on_countdown(self, seconds_left):
+        self.status_label.config(text=STATUS_MAP["countdown"].format(seconds_left=seconds_left))
+
+    def _on_status(self, status):
+        logger.info("Simulation status updated: %s", status)
+        self.status_label.config(text=STATUS_MAP.get(status, f"状态: {status}"))
+        if status in {"completed", "stopped", "error"}:
+            self._update_ui_for_run_state(False)
+            self.is_running = False
+            self.is_paused = False
+            self._refresh_progress()
             self.pause_button.config(text="暂停 (F11)")
-            self.status_label.config(text="状态: 运行中... 请勿操作键鼠！")
 
     def _update_ui_for_run_state(self, is_starting):
         state = "disabled" if is_starting else "normal"
@@ -460,20 +520,25 @@ class App(TkinterDnD.Tk):
         self.pause_button.config(state="normal" if is_starting else "disabled")
         self.stop_button.config(state="normal" if is_starting else "disabled")
 
-    def _update_ui_on_finish(self, status_text):
-        self.status_label.config(text=f"状态: {status_text}")
-        self._update_ui_for_run_state(False)
-        self.is_running = False
-        self.is_paused = False
-        self.pause_button.config(text="暂停 (F11)")
-
     def _on_closing(self):
         logger.info("Close window requested. Destroying context and window.")
+        if self.plan_worker is not None:
+            self.plan_worker.cancel()
+        if self.simulator is not None:
+            self.simulator.stop()
+        if self.simulation_thread is not None:
+            self.simulation_thread.join(timeout=1.5)
+        if self.simulator_process is not None:
+            self.simulator_process.close()
+        self.hotkey_listener.stop(timeout=1.0)
+        self.backend_session.close()
         self.context.destroy()
         self.destroy()
 
 
 if __name__ == "__main__":
+    # 打包后的程序以 spawn 方式启动模拟进程时需要
+    multiprocessing.freeze_support()
     try:
         logger.info("PRO application starting.")
         app = App()
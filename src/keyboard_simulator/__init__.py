@@ -1,11 +1,31 @@
-"""Keyboard Simulator package."""
+"""Keyboard Simulator package.
 
-from importlib.metadata import version, PackageNotFoundError
+Public names are imported lazily (PEP 562) so that ``import
+keyboard_simulator`` and the CLI start without loading every submodule.
+"""
 
-from .config import Config, TextConfig, FileConfig, load
-from .tasks import build_plan, SimulationPlan, TypingTask
-from .simulator import KeyboardSimulator
+from __future__ import annotations
 
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .config import Config, FileConfig, TextConfig, load
+    from .simulator import KeyboardSimulator
+    from .tasks import SimulationPlan, TypingTask, build_plan
+
+_LAZY_ATTRIBUTES = {
+    "Config": ".config",
+    "TextConfig": ".config",
+    "FileConfig": ".config",
+    "load": ".config",
+    "build_plan": ".tasks",
+    "SimulationPlan": ".tasks",
+    "TypingTask": ".tasks",
+    "KeyboardSimulator": ".simulator",
+}
+
+# 静态列出，使类型检查与 ruff 能识别 TYPE_CHECKING 中的导入
 __all__ = [
     "__version__",
     "Config",
@@ -18,7 +38,26 @@ __all__ = [
     "KeyboardSimulator",
 ]
 
-try:
-    __version__ = version("keyboard-simulator")
-except PackageNotFoundError:  # pragma: no cover - during local development
-    __version__ = "0.0.0"
+
+def _package_version() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("keyboard-simulator")
+    except PackageNotFoundError:  # pragma: no cover - during local development
+        return "0.0.0"
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        value = _package_version()
+    elif name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
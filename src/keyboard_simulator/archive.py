@@ -0,0 +1,349 @@
+"""Streaming tar.gz archives of directories and file lists.
+
+:func:`collect_entries` walks the inputs and marks files whose content
+already appeared earlier in the archive; those are stored as tar hard
+links instead of a second copy. Only files that share their size with
+another file are hashed, so the pre-pass is mostly ``stat`` calls.
+
+:func:`iter_archive` then writes the tar headers and file contents block
+by block through a gzip compressor, so memory use is bounded by the block
+size no matter how large the tree is. The target extracts the stream with
+the stock ``tar`` (GNU/busybox on Linux, ``tar.exe`` on Windows 10+).
+
+With several workers the tar stream is cut into blocks that are compressed
+on a thread pool (zlib releases the GIL) as independent gzip members. A
+concatenation of members is itself a valid gzip file, so the target side
+is unchanged; at most two blocks per worker are in flight, which bounds
+memory and keeps the reader from running ahead of the keyboard.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import tarfile
+import threading
+import zlib
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .cache import hash_file
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_SIZE = 1 << 20
+COMPRESSION_LEVEL = 9
+# 并行压缩时每个 gzip 成员的输入大小
+MEMBER_SIZE = 4 << 20
+# gzip 格式的 zlib wbits
+_GZIP_WBITS = 31
+
+
+class ArchiveCancelled(Exception):
+    """Raised by :func:`collect_entries` when its cancel event is set."""
+
+
+@dataclass(slots=True, frozen=True)
+class ArchiveEntry:
+    """One member of the archive."""
+
+    source: Path
+    name: str
+    size: int = 0
+    mode: int = 0o644
+    mtime: int = 0
+    is_dir: bool = False
+    # 内容相同的先前成员，存为硬链接
+    link: Optional[str] = None
+
+
+EntryCallback = Callable[[int, ArchiveEntry], None]
+
+
+def _entry(source: Path, name: str) -> ArchiveEntry:
+    stat = source.stat()
+    is_dir = source.is_dir()
+    return ArchiveEntry(
+        source=source,
+        name=name,
+        size=0 if is_dir else stat.st_size,
+        mode=stat.st_mode & 0o7777,
+        mtime=int(stat.st_mtime),
+        is_dir=is_dir,
+    )
+
+
+def file_entry(path: Path, name: str) -> ArchiveEntry:
+    """Archive member holding the single file ``path`` under ``name``."""
+
+    return _entry(Path(path), name)
+
+
+def _walk(root: Path, name: str) -> Iterator[ArchiveEntry]:
+    yield _entry(root, name)
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        base = Path(directory)
+        relative = base.relative_to(root).as_posix()
+        prefix = name if relative == "." else f"{name}/{relative}"
+        for dirname in dirnames:
+            if (base / dirname).is_symlink():
+                logger.debug("跳过目录链接: %s", base / dirname)
+                continue
+            yield _entry(base / dirname, f"{prefix}/{dirname}")
+        for filename in sorted(filenames):
+            path = base / filename
+            if path.is_file():
+                yield _entry(path, f"{prefix}/{filename}")
+
+
+def collect_entries(
+    paths: Sequence[Path],
+    *,
+    on_file: Optional[Callable[[str, int, int], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> List[ArchiveEntry]:
+    """List the archive members for ``paths`` and link duplicate files.
+
+    Directories are added recursively under their own name, files under
+    their base name. ``on_file(name, bytes_done, bytes_total)`` is called
+    while candidate duplicates are hashed.
+    """
+
+    entries: List[ArchiveEntry] = []
+    for path in paths:
+        path = Path(path)
+        name = path.resolve().name
+        if path.is_dir():
+            entries.extend(_walk(path, name))
+        else:
+            entries.append(_entry(path, name))
+        if cancel_event is not None and cancel_event.is_set():
+            raise ArchiveCancelled()
+
+    names = set()
+    for entry in entries:
+        if entry.name in names:
+            raise ValueError(f"归档中存在重名条目: {entry.name}")
+        names.add(entry.name)
+
+    by_size: Dict[int, List[int]] = defaultdict(list)
+    for index, entry in enumerate(entries):
+        if not entry.is_dir and entry.size > 0:
+            by_size[entry.size].append(index)
+    candidates = [index for group in by_size.values() if len(group) > 1 for index in group]
+    total = sum(entries[index].size for index in candidates)
+    done = 0
+    first_by_hash: Dict[str, str] = {}
+    for index in sorted(candidates):
+        if cancel_event is not None and cancel_event.is_set():
+            raise ArchiveCancelled()
+        entry = entries[index]
+        if on_file is not None:
+            on_file(entry.name, done, total)
+        digest = f"{entry.size}:{hash_file(entry.source)}"
+        done += entry.size
+        original = first_by_hash.setdefault(digest, entry.name)
+        if original != entry.name:
+            entries[index] = ArchiveEntry(
+                source=entry.source,
+                name=entry.name,
+                mode=entry.mode,
+                mtime=entry.mtime,
+                link=original,
+            )
+    return entries
+
+
+def _header(entry: ArchiveEntry) -> bytes:
+    info = tarfile.TarInfo(entry.name)
+    info.mode = entry.mode
+    info.mtime = entry.mtime
+    if entry.is_dir:
+        info.type = tarfile.DIRTYPE
+    elif entry.link is not None:
+        info.type = tarfile.LNKTYPE
+        info.linkname = entry.link
+    else:
+        info.size = entry.size
+    return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+
+def _iter_tar(
+    entries: Sequence[ArchiveEntry], on_entry: Optional[EntryCallback]
+) -> Iterator[bytes]:
+    written = 0
+    for index, entry in enumerate(entries):
+        if on_entry is not None:
+            on_entry(index, entry)
+        header = _header(entry)
+        written += len(header)
+        yield header
+        if entry.is_dir or entry.link is not None:
+            continue
+        remaining = entry.size
+        with entry.source.open("rb") as handle:
+            while remaining:
+                block = handle.read(min(READ_BLOCK_SIZE, remaining))
+                if not block:
+                    raise OSError(f"{entry.source} 在打包期间被修改")
+                remaining -= len(block)
+                written += len(block)
+                yield block
+        padding = -entry.size % tarfile.BLOCKSIZE
+        if padding:
+            written += padding
+            yield bytes(padding)
+    # 归档结尾: 两个空块，再补齐到完整的记录
+    end = 2 * tarfile.BLOCKSIZE
+    end += -(written + end) % tarfile.RECORDSIZE
+    yield bytes(end)
+
+
+def default_workers() -> int:
+    """Number of CPUs this process may run on."""
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - Windows / macOS
+        return os.cpu_count() or 1
+
+
+def _gzip_member(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _iter_parallel(
+    entries: Sequence[ArchiveEntry],
+    on_entry: Optional[EntryCallback],
+    level: int,
+    workers: int,
+    member_size: int,
+) -> Iterator[bytes]:
+    """Compress the tar stream as independent gzip members on a thread pool.
+
+    Members are yielded in order; ``on_entry`` is called for the entries
+    that start in a member just before that member is yielded, so callers
+    see the same ordering as with a single compressor.
+    """
+
+    started: List[Tuple[int, ArchiveEntry]] = []
+
+    def record(index: int, entry: ArchiveEntry) -> None:
+        started.append((index, entry))
+
+    pending: Deque[Tuple[Future, List[Tuple[int, ArchiveEntry]]]] = deque()
+    chunk: List[bytes] = []
+    chunk_size = 0
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gzip")
+
+    def submit() -> None:
+        nonlocal chunk, chunk_size
+        future: Future = pool.submit(_gzip_member, b"".join(chunk), level)
+        pending.append((future, started[:]))
+        started.clear()
+        chunk, chunk_size = [], 0
+
+    def release() -> bytes:
+        future, events = pending.popleft()
+        if on_entry is not None:
+            for index, entry in events:
+                on_entry(index, entry)
+        return future.result()
+
+    try:
+        for block in _iter_tar(entries, record):
+            chunk.append(block)
+            chunk_size += len(block)
+            if chunk_size < member_size:
+                continue
+            submit()
+            if len(pending) >= 2 * workers:
+                yield release()
+        if chunk:
+            submit()
+        while pending:
+            yield release()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_archive(
+    entries: Sequence[ArchiveEntry],
+    *,
+    level: int = COMPRESSION_LEVEL,
+    on_entry: Optional[EntryCallback] = None,
+    workers: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Yield the gzip-compressed tar stream of ``entries``.
+
+    ``on_entry(index, entry)`` is called when a member starts. ``workers``
+    defaults to :func:`default_workers`; with one worker the stream is a
+    single gzip member, otherwise one member per :data:`MEMBER_SIZE` bytes
+    of tar data.
+    """
+
+    workers = default_workers() if workers is None else workers
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if workers > 1:
+        yield from _iter_parallel(entries, on_entry, level, workers, MEMBER_SIZE)
+        return
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    for block in _iter_tar(entries, on_entry):
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def archive_tail(output_filename: str, target_os: str) -> List[str]:
+    """Script lines that unpack the decoded archive on the target."""
+
+    if target_os == "linux":
+        return [f"base64 -d {output_filename}.b64 | tar -xzf -", f"rm {output_filename}.b64"]
+    return [
+        f"certutil -decode tmp.b64 {output_filename}",
+        f"tar -xzf {output_filename}",
+        f"del tmp.b64 {output_filename}",
+    ]
+
+
+def extract_command(output_filename: str, target_os: str) -> str:
+    """Command that unpacks an archive already written to ``output_filename``."""
+
+    if target_os == "linux":
+        return f"tar -xzf {output_filename} && rm {output_filename}"
+    return f"tar -xzf {output_filename} && del {output_filename}"
+
+
+def describe_entries(entries: Iterable[ArchiveEntry]) -> str:
+    files = links = size = 0
+    for entry in entries:
+        if entry.is_dir:
+            continue
+        files += 1
+        if entry.link is not None:
+            links += 1
+        size += entry.size
+    text = f"{files} 个文件, {size / 1024:.1f} KB"
+    if links:
+        text += f", {links} 个重复文件"
+    return text
+
+
+__all__ = [
+    "ArchiveCancelled",
+    "ArchiveEntry",
+    "collect_entries",
+    "default_workers",
+    "iter_archive",
+    "archive_tail",
+    "extract_command",
+    "file_entry",
+    "describe_entries",
+]
@@ -4,17 +4,43 @@ from __future__ import annotations
 
 import abc
 from contextlib import AbstractContextManager
+from typing import TYPE_CHECKING, Optional
+
+from ..clock import SYSTEM_CLOCK, Clock
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ..metrics import KeystrokeMetrics
 
 
 class AbstractKeyboardBackend(AbstractContextManager, metaclass=abc.ABCMeta):
-    """Interface for sending keyboard events."""
+    """Interface for sending keyboard events.
+
+    The context manager is re-entrant: only the outermost ``with`` block
+    starts and stops the backend, so a batch session can wrap several plans
+    without re-initializing the device for each of them.
+
+    While a simulator runs with metrics enabled, :attr:`metrics` is set and
+    backends time their raw injection call whenever ``metrics.active`` is
+    true.
 
-    def __enter__(self):  # pragma: no cover - default implementation
-        self.start()
+    Timestamps and hold-time sleeps go through :attr:`clock`, which the
+    simulator replaces with its own clock while a plan runs.
+    """
+
+    metrics: Optional["KeystrokeMetrics"] = None
+    clock: Clock = SYSTEM_CLOCK
+
+    def __enter__(self):
+        depth = getattr(self, "_session_depth", 0)
+        if depth == 0:
+            self.start()
+        self._session_depth = depth + 1
         return self
 
-    def __exit__(self, exc_type, exc, tb):  # pragma: no cover - default implementation
-        self.stop()
+    def __exit__(self, exc_type, exc, tb):
+        self._session_depth = getattr(self, "_session_depth", 1) - 1
+        if self._session_depth == 0:
+            self.stop()
         return False
 
     def start(self) -> None:
@@ -23,6 +49,9 @@ class AbstractKeyboardBackend(AbstractContextManager, metaclass=abc.ABCMeta):
     def stop(self) -> None:
         """Perform backend specific teardown logic."""
 
+    def revalidate(self) -> None:
+        """Cheaply check a long-running backend is still usable (e.g. after hot-plug)."""
+
     @abc.abstractmethod
     def type_character(self, char: str, delay: float) -> None:
         """Type a single character."""
@@ -31,6 +60,10 @@ class AbstractKeyboardBackend(AbstractContextManager, metaclass=abc.ABCMeta):
     def press_return(self, delay: float) -> None:
         """Send a newline/enter key event."""
 
+    def press_backspace(self, delay: float) -> None:
+        """Erase the character before the cursor."""
+        self.type_character("\b", delay)
+
     def flush(self) -> None:
         """Ensure all buffered events are dispatched."""
 
@@ -2,9 +2,16 @@
 
 from __future__ import annotations
 
+import json
+import logging
+import threading
 import time
-from typing import Optional, Any
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional
 
+from ..clock import SYSTEM_CLOCK, Clock
+from ..metrics import Histogram
 from .base import AbstractKeyboardBackend, BackendError
 
 try:  # pragma: no cover - optional dependency during CI
@@ -15,92 +22,371 @@ except ModuleNotFoundError:  # pragma: no cover - fallback for non-Windows envs
     keycodes = None
 
 
+MAX_DEVICES = 20
+DEFAULT_DEVICE_CACHE = Path.home() / ".keyboard_simulator" / "interception_device.json"
+# 物理按键从接收到转发的延迟预算 (纳秒)
+PASSTHROUGH_BUDGET_NS = 500_000
+# await_input 的超时，监听线程据此检查停止请求
+LISTENER_POLL_MS = 200
+
+logger = logging.getLogger(__name__)
+
+
+def get_hardware_id(context: Any, device: int) -> Optional[str]:
+    """Return the device's hardware id, or ``None`` if it cannot be queried."""
+
+    getter = getattr(context, "get_hardware_id", None)
+    if getter is None:
+        return None
+    try:
+        hardware_id = getter(device)
+    except Exception:  # pragma: no cover - driver specific failures
+        return None
+    return str(hardware_id) if hardware_id else None
+
+
+@dataclass(slots=True)
+class KeyboardDeviceCache:
+    """Remember which keyboard device to use across runs and processes.
+
+    The cached index is revalidated with one ``is_keyboard`` call plus a
+    hardware id comparison, so a replugged or swapped keyboard is noticed
+    without rescanning every device slot.
+    """
+
+    index: Optional[int] = None
+    hardware_id: Optional[str] = None
+    path: Optional[Path] = None
+
+    @classmethod
+    def load(cls, path: Path) -> "KeyboardDeviceCache":
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+            index = data.get("index")
+            hardware_id = data.get("hardware_id")
+        except (OSError, ValueError, AttributeError):
+            return cls(path=path)
+        return cls(
+            index=index if isinstance(index, int) else None,
+            hardware_id=hardware_id if isinstance(hardware_id, str) else None,
+            path=path,
+        )
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(
+                json.dumps({"index": self.index, "hardware_id": self.hardware_id}),
+                encoding="utf-8",
+            )
+        except OSError:  # pragma: no cover - cache is best effort
+            pass
+
+    def validate(self, context: Any) -> Optional[int]:
+        """Return the cached device if it is still the same keyboard."""
+
+        if self.index is None or not context.is_keyboard(self.index):
+            return None
+        if self.hardware_id is not None:
+            current = get_hardware_id(context, self.index)
+            if current is not None and current != self.hardware_id:
+                return None
+        return self.index
+
+    def remember(self, context: Any, device: int) -> None:
+        hardware_id = get_hardware_id(context, device)
+        if device == self.index and hardware_id == self.hardware_id:
+            return
+        self.index = device
+        self.hardware_id = hardware_id
+        self.save()
+
+    def invalidate(self) -> None:
+        self.index = None
+        self.hardware_id = None
+
+
+def discover_keyboard(
+    context: Any, cache: Optional[KeyboardDeviceCache] = None, *, max_devices: int = MAX_DEVICES
+) -> int:
+    """Find a keyboard device, trying the cached one before scanning."""
+
+    if cache is not None:
+        cached = cache.validate(context)
+        if cached is not None:
+            return cached
+    for idx in range(max_devices):
+        if context.is_keyboard(idx):
+            if cache is not None:
+                cache.remember(context, idx)
+            return idx
+    raise BackendError("未找到可用的键盘设备")
+
+
 class InterceptionBackend(AbstractKeyboardBackend):
-    """Backend backed by the interception-python driver."""
+    """Backend backed by the interception-python driver.
+
+    A backend created without a context owns its driver context; the context
+    is released in :meth:`stop` and recreated on the next :meth:`start`, so
+    an owned backend can be started again after a run. A context passed in,
+    e.g. the one a GUI's hotkey listener uses, is shared and left alone.
 
-    def __init__(self, context: Optional[Any] = None, device: Optional[int] = None):
+    The stroke class, key flags and the key data of every character typed
+    are looked up once and reused for all later strokes.
+    """
+
+    def __init__(
+        self,
+        context: Optional[Any] = None,
+        device: Optional[int] = None,
+        *,
+        device_cache: Optional[KeyboardDeviceCache] = None,
+    ):
         if interception is None:
             raise BackendError("interception-python 未安装，无法使用该后端")
-        context_cls = getattr(interception, "Interception")
-        self.context = context or context_cls()
+        self.context = context or self._create_context()
         self.device = device
+        self.device_cache = device_cache
         self._own_context = context is None
+        self._filter_installed = False
+        key_flag = getattr(interception, "KeyFlag")
+        self._key_stroke = getattr(interception, "KeyStroke")
+        self._key_down = key_flag.KEY_DOWN
+        self._key_up = key_flag.KEY_UP
+        self._key_e0 = key_flag.KEY_E0
+        self._key_data: Dict[str, Any] = {}
+
+    @staticmethod
+    def _create_context() -> Any:
+        context_cls = getattr(interception, "Interception")
+        return context_cls()
 
     def start(self) -> None:
+        if self.context is None:
+            self.context = self._create_context()
+            self._filter_installed = False
         if self.device is not None:
             return
 
-        filter_flag = getattr(interception, "FilterKeyFlag")
-        self.context.set_filter(self.context.is_keyboard, filter_flag.FILTER_KEY_ALL)
-        for idx in range(20):
-            if self.context.is_keyboard(idx):
-                self.device = idx
-                break
-        if self.device is None:
-            raise BackendError("未找到可用的键盘设备")
+        if not self._filter_installed:
+            filter_flag = getattr(interception, "FilterKeyFlag")
+            self.context.set_filter(self.context.is_keyboard, filter_flag.FILTER_KEY_ALL)
+            self._filter_installed = True
+        self.device = discover_keyboard(self.context, self.device_cache)
+
+    def revalidate(self) -> None:
+        if self.context is None or self.device is None:
+            return
+        if self.device_cache is None:
+            if self.context.is_keyboard(self.device):
+                return
+        elif self.device_cache.validate(self.context) == self.device:
+            return
+        self.device = discover_keyboard(self.context, self.device_cache)
 
     def stop(self) -> None:
-        if self._own_context:
+        if self._own_context and self.context is not None:
             self.context.destroy()
+            self.context = None
+            self.device = None
+
+    def _key_information(self, key: str) -> Any:
+        key_data = self._key_data.get(key)
+        if key_data is None:
+            if keycodes is None:
+                raise BackendError("无法访问 interception 键码表")
+            key_data = self._key_data[key] = keycodes.get_key_information(key)
+        return key_data
 
     def _send_stroke(self, scan_code: int, is_extended: bool, state: Any) -> None:
         if self.device is None:
             raise BackendError("键盘设备尚未初始化")
-        key_stroke_cls = getattr(interception, "KeyStroke")
-        stroke = key_stroke_cls(scan_code, state)
+        stroke = self._key_stroke(scan_code, state)
         if is_extended:
-            key_flag = getattr(interception, "KeyFlag")
-            stroke.flags |= key_flag.KEY_E0
-        self.context.send(self.device, stroke)
+            stroke.flags |= self._key_e0
+        metrics = self.metrics
+        if metrics is not None and metrics.active:
+            started = self.clock.now_ns()
+            self.context.send(self.device, stroke)
+            metrics.send.observe(self.clock.now_ns() - started)
+        else:
+            self.context.send(self.device, stroke)
 
     def _press_key_data(self, key_data: Any, delay: float) -> None:
-        if keycodes is None:
-            raise BackendError("无法访问 interception 键码表")
         modifiers = []
         if key_data.shift:
-            modifiers.append(keycodes.get_key_information("shift"))
+            modifiers.append(self._key_information("shift"))
         if key_data.ctrl:
-            modifiers.append(keycodes.get_key_information("ctrl"))
+            modifiers.append(self._key_information("ctrl"))
         if key_data.alt:
-            modifiers.append(keycodes.get_key_information("alt"))
-
-        key_flag = getattr(interception, "KeyFlag")
+            modifiers.append(self._key_information("alt"))
 
         for mod in modifiers:
-            self._send_stroke(mod.scan_code, mod.is_extended, key_flag.KEY_DOWN)
+            self._send_stroke(mod.scan_code, mod.is_extended, self._key_down)
             if delay > 0:
-                time.sleep(delay / 2)
+                self.clock.sleep(delay / 2)
 
-        self._send_stroke(key_data.scan_code, key_data.is_extended, key_flag.KEY_DOWN)
+        self._send_stroke(key_data.scan_code, key_data.is_extended, self._key_down)
         if delay > 0:
-            time.sleep(delay)
-        self._send_stroke(key_data.scan_code, key_data.is_extended, key_flag.KEY_UP)
+            self.clock.sleep(delay)
+        self._send_stroke(key_data.scan_code, key_data.is_extended, self._key_up)
 
         for mod in reversed(modifiers):
             if delay > 0:
-                time.sleep(delay / 2)
-            self._send_stroke(mod.scan_code, mod.is_extended, key_flag.KEY_UP)
+                self.clock.sleep(delay / 2)
+            self._send_stroke(mod.scan_code, mod.is_extended, self._key_up)
 
     def type_character(self, char: str, delay: float) -> None:
         if char == "\n":
             self.press_return(delay)
             return
+        if char == "\b":
+            self.press_backspace(delay)
+            return
+        if char == "\x1b":
+            self._press_key_data(self._key_information("esc"), delay)
+            return
         if keycodes is None:
             raise BackendError("无法访问 interception 键码表")
         unknown_error = getattr(keycodes, "UnknownKeyError", Exception)
         try:
-            key_data = keycodes.get_key_information(char)
+            key_data = self._key_information(char)
         except unknown_error as exc:  # type: ignore[arg-type]
             raise BackendError(f"无法处理字符: {char}") from exc
         self._press_key_data(key_data, delay)
-        if delay > 0:
-            time.sleep(delay)
 
     def press_return(self, delay: float) -> None:
-        if keycodes is None:
-            raise BackendError("无法访问 interception 键码表")
-        enter_info = keycodes.get_key_information("enter")
-        self._press_key_data(enter_info, delay)
+        self._press_key_data(self._key_information("enter"), delay)
+
+    def press_backspace(self, delay: float) -> None:
+        self._press_key_data(self._key_information("backspace"), delay)
+
+
+class HotkeyListener:
+    """Forward physical keystrokes and swallow the configured hotkeys.
+
+    Every key press and release on the machine passes through this thread,
+    so the loop is kept short: the driver's bound methods and the key flags
+    are looked up once, hotkeys are a dict keyed by scan code, and only
+    key-down/up strokes are captured. A hotkey's action runs on its key-down;
+    its release is swallowed as well, so the focused window sees neither.
+
+    Each forwarded stroke is timed from ``receive`` to ``send`` into
+    :attr:`latency`; strokes slower than ``budget_ns`` are counted in
+    :attr:`over_budget`.
+    """
+
+    def __init__(
+        self,
+        context: Any,
+        hotkeys: Mapping[int, Callable[[], None]],
+        *,
+        device_cache: Optional[KeyboardDeviceCache] = None,
+        budget_ns: int = PASSTHROUGH_BUDGET_NS,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
+        if interception is None:
+            raise BackendError("interception-python 未安装，无法监听热键")
+        self.context = context
+        self.device_cache = device_cache
+        self.budget_ns = budget_ns
+        self.clock = clock
+        self.latency = Histogram()
+        self.over_budget = 0
+        self._actions = dict(hotkeys)
+        key_flag = getattr(interception, "KeyFlag")
+        self._hotkey_flags = frozenset((key_flag.KEY_DOWN, key_flag.KEY_UP))
+        self._key_down = key_flag.KEY_DOWN
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def install_filter(self) -> None:
+        """Capture key-down/up strokes of every keyboard, nothing else."""
+
+        filter_flag = getattr(interception, "FilterKeyFlag")
+        self.context.set_filter(
+            self.context.is_keyboard, filter_flag.FILTER_KEY_DOWN | filter_flag.FILTER_KEY_UP
+        )
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="hotkey-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self) -> None:
+        logger.info("Keyboard listener thread started.")
+        while not self._stop.is_set():
+            try:
+                self._pump()
+            except Exception as exc:
+                logger.error("Error in keyboard listener thread: %s", exc, exc_info=True)
+                time.sleep(1)
+        logger.info("Keyboard listener stopped: %s", self.summary())
+
+    def _pump(self) -> None:
+        context = self.context
+        await_input = context.await_input
+        receivers = [device.receive for device in context.devices]
+        send = context.send
+        actions = self._actions
+        hotkey_flags = self._hotkey_flags
+        key_down = self._key_down
+        now_ns = self.clock.now_ns
+        observe = self.latency.observe
+        budget_ns = self.budget_ns
+        stopping = self._stop.is_set
+        # 过滤器只放行键盘；设备切换时才更新缓存
+        current = self.device_cache.index if self.device_cache is not None else None
+        while not stopping():
+            device = await_input(LISTENER_POLL_MS)
+            if device is None:
+                continue
+            if device != current:
+                # Follow the keyboard that is actually in use (hot-plug aware).
+                current = device
+                if self.device_cache is not None:
+                    self.device_cache.remember(context, device)
+            started = now_ns()
+            stroke = receivers[device]()
+            if stroke is None:
+                continue
+            action = actions.get(stroke.code)
+            if action is not None and stroke.flags in hotkey_flags:
+                if stroke.flags == key_down:
+                    action()
+                continue
+            send(device, stroke)
+            elapsed = now_ns() - started
+            observe(elapsed)
+            if elapsed > budget_ns:
+                self.over_budget += 1
+
+    def summary(self) -> str:
+        def us(value: Optional[int]) -> str:
+            return "-" if value is None else f"{value / 1e3:.1f} µs"
+
+        latency = self.latency
+        return (
+            f"转发 {latency.count} 次按键，延迟 p50 {us(latency.quantile(0.5))} / "
+            f"p99 {us(latency.quantile(0.99))} / 最大 {us(latency.max_ns or None)}，"
+            f"{self.over_budget} 次超出 {self.budget_ns / 1e3:.0f} µs 预算"
+        )
 
 
-__all__ = ["InterceptionBackend"]
+__all__ = [
+    "HotkeyListener",
+    "InterceptionBackend",
+    "KeyboardDeviceCache",
+    "DEFAULT_DEVICE_CACHE",
+    "PASSTHROUGH_BUDGET_NS",
+    "discover_keyboard",
+    "get_hardware_id",
+]
@@ -0,0 +1,36 @@
+"""Backend that discards every keystroke."""
+
+from __future__ import annotations
+
+from typing import List, Tuple
+
+from .base import AbstractKeyboardBackend
+
+
+class NullBackend(AbstractKeyboardBackend):
+    """Count keystrokes without sending them anywhere.
+
+    Useful for dry runs and for measuring the simulator's own loop overhead.
+    With ``record=True`` every key is stored in :attr:`events` together with
+    its :attr:`clock` timestamp, e.g. for analysing pacing under a
+    :class:`~keyboard_simulator.clock.VirtualClock`.
+    """
+
+    def __init__(self, *, record: bool = False) -> None:
+        self.characters = 0
+        self.returns = 0
+        self.record = record
+        self.events: List[Tuple[float, str]] = []
+
+    def type_character(self, char: str, delay: float) -> None:
+        self.characters += 1
+        if self.record:
+            self.events.append((self.clock.now(), char))
+
+    def press_return(self, delay: float) -> None:
+        self.returns += 1
+        if self.record:
+            self.events.append((self.clock.now(), "\n"))
+
+
+__all__ = ["NullBackend"]
@@ -0,0 +1,61 @@
+"""Pseudo-terminal backend for local testing on POSIX hosts."""
+
+from __future__ import annotations
+
+import os
+
+from .base import AbstractKeyboardBackend, BackendError
+
+try:  # pragma: no cover - POSIX only
+    import termios
+except ModuleNotFoundError:  # pragma: no cover - Windows
+    termios = None  # type: ignore[assignment]
+
+
+class PtyBackend(AbstractKeyboardBackend):
+    """Write keystrokes into the master side of a pseudo-terminal.
+
+    The line discipline of the slave side behaves like a real console: it
+    echoes input back to the master, handles erase characters and turns
+    carriage returns into newlines. This makes the backend a local stand-in
+    for a VM console when exercising feedback-driven typing.
+    """
+
+    def __init__(self, master_fd: int, *, encoding: str = "utf-8"):
+        self.master_fd = master_fd
+        self.encoding = encoding
+        self._erase = b"\x7f"
+        if termios is not None:
+            try:
+                erase = termios.tcgetattr(master_fd)[6][termios.VERASE]
+            except (termios.error, OSError):  # pragma: no cover - not a tty
+                erase = None
+            if isinstance(erase, bytes) and erase:
+                self._erase = erase
+
+    def _write(self, data: bytes) -> None:
+        metrics = self.metrics
+        try:
+            if metrics is not None and metrics.active:
+                started = self.clock.now_ns()
+                os.write(self.master_fd, data)
+                metrics.send.observe(self.clock.now_ns() - started)
+            else:
+                os.write(self.master_fd, data)
+        except OSError as exc:
+            raise BackendError(f"写入伪终端失败: {exc}") from exc
+
+    def type_character(self, char: str, delay: float) -> None:
+        if char == "\n":
+            self.press_return(delay)
+            return
+        if char == "\b":
+            self._write(self._erase)
+            return
+        self._write(char.encode(self.encoding))
+
+    def press_return(self, delay: float) -> None:
+        self._write(b"\r")
+
+
+__all__ = ["PtyBackend"]
@@ -11,6 +11,10 @@ KEYEVENTF_UNICODE = 0x0004
 KEYEVENTF_KEYUP = 0x0002
 KEYEVENTF_SCANCODE = 0x0008
 VK_RETURN = 0x0D
+VK_BACK = 0x08
+VK_ESCAPE = 0x1B
+# 以虚拟键发送的控制字符 (Unicode 方式的 U+0008 等不会被多数程序当作按键)
+CONTROL_KEYS = {"\b": VK_BACK, "\x1b": VK_ESCAPE}
 
 # 定义 ctypes 结构，确保与 Windows API 兼容
 # 参考: https://learn.microsoft.com/en-us/windows/win32/api/winuser/
@@ -48,13 +52,16 @@ class INPUT(ctypes.Structure):
 class SendInputBackend(AbstractKeyboardBackend):
     """使用 SendInput API 的后端。"""
 
-    def __init__(self):
+    def __init__(self, user32=None):
+        """``user32`` 可传入替代对象 (如基准测试中的假实现)，默认加载 user32.dll。"""
         super().__init__()
-        try:
-            # 使用 use_last_error=True 以便在调用失败时获取错误码
-            self.user32 = ctypes.WinDLL('user32', use_last_error=True)
-        except OSError as e:
-            raise BackendError(f"加载 user32.dll 失败: {e}") from e
+        if user32 is None:
+            try:
+                # 使用 use_last_error=True 以便在调用失败时获取错误码
+                user32 = ctypes.WinDLL('user32', use_last_error=True)
+            except OSError as e:
+                raise BackendError(f"加载 user32.dll 失败: {e}") from e
+        self.user32 = user32
 
         # 显式定义 SendInput 函数的参数类型和返回类型，以提高健壮性
         self.user32.SendInput.restype = ctypes.c_uint
@@ -84,8 +91,14 @@ class SendInputBackend(AbstractKeyboardBackend):
                 input_array[i].union.ki.time = 0  # 系统将提供时间戳
                 input_array[i].union.ki.dwExtraInfo = 0 # 通常设置为0
         
-        # 调用 SendInput
-        sent = self.user32.SendInput(n_inputs, input_array, ctypes.sizeof(INPUT))
+        # 调用 SendInput；采样的按键额外记录 API 调用耗时
+        metrics = self.metrics
+        if metrics is not None and metrics.active:
+            started = self.clock.now_ns()
+            sent = self.user32.SendInput(n_inputs, input_array, ctypes.sizeof(INPUT))
+            metrics.send.observe(self.clock.now_ns() - started)
+        else:
+            sent = self.user32.SendInput(n_inputs, input_array, ctypes.sizeof(INPUT))
 
         # 验证结果
         if sent != n_inputs:
@@ -94,6 +107,10 @@ class SendInputBackend(AbstractKeyboardBackend):
 
     def type_character(self, char: str, delay: float = 0.01):
         """输入单个字符。"""
+        virtual_key = CONTROL_KEYS.get(char)
+        if virtual_key is not None:
+            self._press_virtual_key(virtual_key)
+            return
         inputs = []
         # KEYDOWN
         inputs.append({
@@ -109,19 +126,27 @@ class SendInputBackend(AbstractKeyboardBackend):
         })
         self._send_input(inputs)
 
-    def press_return(self, delay: float = 0.01):
-        """按下并释放回车键。"""
+    def _press_virtual_key(self, virtual_key: int):
+        """按下并释放一个虚拟键。"""
         inputs = []
         # KEYDOWN
         inputs.append({
             'type': INPUT_KEYBOARD,
-            'wVk': VK_RETURN,
+            'wVk': virtual_key,
             'dwFlags': 0
         })
         # KEYUP
         inputs.append({
             'type': INPUT_KEYBOARD,
-            'wVk': VK_RETURN,
+            'wVk': virtual_key,
             'dwFlags': KEYEVENTF_KEYUP
         })
         self._send_input(inputs)
+
+    def press_return(self, delay: float = 0.01):
+        """按下并释放回车键。"""
+        self._press_virtual_key(VK_RETURN)
+
+    def press_backspace(self, delay: float = 0.01):
+        """按下并释放退格键。"""
+        self._press_virtual_key(VK_BACK)
@@ -0,0 +1,56 @@
+"""Long-lived backend sessions shared across runs."""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Optional
+
+from .base import AbstractKeyboardBackend
+
+BackendFactory = Callable[[], AbstractKeyboardBackend]
+
+
+class BackendSession:
+    """Keep one started backend alive across many plans.
+
+    The session holds the outermost ``with backend:`` block, so the nested
+    ``with`` in :meth:`KeyboardSimulator.run_plan` does not start or stop the
+    backend again. Each :meth:`acquire` only revalidates the backend, which
+    is a cheap check compared to creating a driver context and rediscovering
+    devices.
+    """
+
+    def __init__(self, factory: BackendFactory):
+        self._factory = factory
+        self._backend: Optional[AbstractKeyboardBackend] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "BackendSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
+
+    @property
+    def is_open(self) -> bool:
+        return self._backend is not None
+
+    def acquire(self) -> AbstractKeyboardBackend:
+        with self._lock:
+            if self._backend is None:
+                backend = self._factory()
+                backend.__enter__()
+                self._backend = backend
+            else:
+                self._backend.revalidate()
+            return self._backend
+
+    def close(self) -> None:
+        with self._lock:
+            backend, self._backend = self._backend, None
+        if backend is not None:
+            backend.__exit__(None, None, None)
+
+
+__all__ = ["BackendSession", "BackendFactory"]
@@ -0,0 +1,324 @@
+"""Content-addressed on-disk cache of ready-to-type scripts.
+
+Entries are keyed by the SHA-256 of the source file plus the pipeline
+parameters that shape the script (target OS, output name, FEC layout and
+the script format version). Before hashing, a per-path record of size,
+mtime and inode is consulted so an unchanged file is not read again.
+
+Every file is written to a unique temporary name and moved into place
+with :func:`os.replace`, so the daemon, the GUIs and several CLI processes
+can share one directory without locks: readers see either a complete
+entry or none, and races only ever cost a redundant rebuild. Entries are
+evicted least-recently-used (by mtime, refreshed on every hit) once the
+directory exceeds ``max_bytes``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Mapping, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".keyboard_simulator" / "cache"
+DEFAULT_MAX_BYTES = 1 << 30
+CACHE_FORMAT = 1
+HASH_BLOCK_SIZE = 1 << 20
+ENTRY_SUFFIX = ".script"
+# 条目头部 (JSON 元数据) 的固定字节数
+HEADER_SIZE = 1024
+# 崩溃进程遗留的临时文件超过该时长 (秒) 后清理
+STALE_TEMPORARY_SECONDS = 24 * 3600
+
+
+def _file_signature(stat: os.stat_result) -> Dict[str, int]:
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "inode": stat.st_ino}
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as handle:
+        for block in iter(lambda: handle.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass(slots=True, frozen=True)
+class CachedScript:
+    """A complete script stored in the cache."""
+
+    path: Path
+    characters: int
+    description: str
+
+    def lines(self) -> Iterator[str]:
+        """Iterate the script line by line, keeping line endings.
+
+        The file is opened immediately, so a later eviction cannot pull it
+        away from a plan that already holds the iterator.
+        """
+
+        handle = self.path.open("r", encoding="utf-8", newline="")
+        handle.readline()  # 头部元数据
+        return _iterate_and_close(handle)
+
+
+def _iterate_and_close(handle: TextIO) -> Iterator[str]:
+    with handle:
+        yield from handle
+
+
+class EntryWriter:
+    """Stream a script into a temporary file and publish it on :meth:`commit`.
+
+    A fixed-size header is reserved up front and filled in on commit, so
+    the script is written exactly once.
+    """
+
+    def __init__(self, cache: "PayloadCache", description: str):
+        self._cache = cache
+        self.description = description
+        self.characters = 0
+        self._temporary = cache._temporary_path()
+        self._handle: BinaryIO = self._temporary.open("wb")
+        self._handle.write(b" " * HEADER_SIZE + b"\n")
+        self._closed = False
+
+    def write(self, text: str) -> None:
+        self._handle.write(text.encode("utf-8", "surrogatepass"))
+        self.characters += len(text)
+
+    def commit(self, key: str) -> Optional[CachedScript]:
+        """Publish the entry under ``key``; failures are logged, not raised."""
+
+        header = json.dumps(
+            {"format": CACHE_FORMAT, "characters": self.characters, "description": self.description}
+        ).encode("ascii")
+        final = self._cache._entry_path(key)
+        try:
+            if len(header) > HEADER_SIZE:
+                raise OSError("缓存条目头部过长")
+            if self._handle.tell() > self._cache.max_bytes:
+                logger.debug("脚本超过缓存容量，不写入缓存")
+                self.abort()
+                return None
+            self._handle.seek(0)
+            self._handle.write(header)
+            self._handle.close()
+            self._closed = True
+            final.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._temporary, final)
+        except OSError as exc:
+            logger.warning("写入缓存失败: %s", exc)
+            self.abort()
+            return None
+        self._cache._evict()
+        return CachedScript(final, self.characters, self.description)
+
+    def abort(self) -> None:
+        if not self._closed:
+            self._handle.close()
+            self._closed = True
+        _remove(self._temporary)
+
+
+def _remove(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+class PayloadCache:
+    """Size-bounded LRU cache of generated scripts shared between processes."""
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, *, max_bytes: int = DEFAULT_MAX_BYTES):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        for name in ("entries", "files", "tmp"):
+            (self.directory / name).mkdir(parents=True, exist_ok=True)
+
+    # --- paths ---
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / "entries" / key[:2] / f"{key}{ENTRY_SUFFIX}"
+
+    def _record_path(self, path: Path) -> Path:
+        name = hashlib.sha256(str(Path(path).resolve()).encode("utf-8", "surrogatepass"))
+        return self.directory / "files" / f"{name.hexdigest()}.json"
+
+    def _temporary_path(self) -> Path:
+        return self.directory / "tmp" / f"{os.getpid()}-{uuid.uuid4().hex}.tmp"
+
+    # --- keys ---
+    @staticmethod
+    def key(content_hash: str, params: Mapping[str, Any]) -> str:
+        """Entry key for a file's content hash and the pipeline parameters."""
+
+        material = json.dumps(
+            {"format": CACHE_FORMAT, "content": content_hash, "params": dict(params)},
+            sort_keys=True,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def known_hash(self, path: Path) -> Optional[str]:
+        """Content hash of ``path`` if its size/mtime/inode are unchanged."""
+
+        try:
+            signature = _file_signature(Path(path).stat())
+            record = json.loads(self._record_path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(record, dict) or any(
+            record.get(name) != value for name, value in signature.items()
+        ):
+            return None
+        digest = record.get("sha256")
+        return digest if isinstance(digest, str) else None
+
+    def remember_hash(self, path: Path, stat: os.stat_result, content_hash: str) -> None:
+        """Record ``content_hash`` for ``path`` as it was when ``stat`` was taken."""
+
+        record = dict(_file_signature(stat), sha256=content_hash, path=str(path))
+        self._write_atomic(self._record_path(path), json.dumps(record, ensure_ascii=False))
+
+    def content_hash(self, path: Path) -> str:
+        """Hash ``path``, skipping the read when the pre-check matches."""
+
+        known = self.known_hash(path)
+        if known is not None:
+            return known
+        stat = Path(path).stat()
+        digest = hash_file(path)
+        self.remember_hash(path, stat, digest)
+        return digest
+
+    # --- entries ---
+    def get(self, key: str) -> Optional[CachedScript]:
+        path = self._entry_path(key)
+        try:
+            with path.open("r", encoding="utf-8", newline="") as handle:
+                header = json.loads(handle.readline())
+            if header.get("format") != CACHE_FORMAT:
+                raise ValueError("unsupported cache entry")
+            entry = CachedScript(path, int(header["characters"]), str(header["description"]))
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            logger.warning("忽略损坏的缓存条目: %s", path)
+            _remove(path)
+            self._count(hit=False)
+            return None
+        try:
+            os.utime(path)  # 刷新最近使用时间
+        except OSError:
+            pass
+        self._count(hit=True)
+        return entry
+
+    def writer(self, description: str) -> EntryWriter:
+        return EntryWriter(self, description)
+
+    def put(self, key: str, script: str, description: str) -> Optional[CachedScript]:
+        writer = self.writer(description)
+        try:
+            writer.write(script)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit(key)
+
+    def size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def clear(self) -> None:
+        for path, _, _ in self._entries():
+            _remove(path)
+
+    # --- internals ---
+    def _count(self, *, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _entries(self) -> List[Tuple[Path, int, int]]:
+        entries = []
+        for path in (self.directory / "entries").glob(f"*/*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime_ns, stat.st_size))
+        return entries
+
+    def _evict(self) -> None:
+        cutoff = time.time() - STALE_TEMPORARY_SECONDS
+        for temporary in (self.directory / "tmp").glob("*.tmp"):
+            try:
+                if temporary.stat().st_mtime < cutoff:
+                    temporary.unlink()
+            except OSError:
+                continue
+
+        entries = self._entries()
+        total = sum(size for _, _, size in entries)
+        if total <= self.max_bytes:
+            return
+        for path, _, size in sorted(entries, key=lambda item: item[1]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:  # pragma: no cover - 条目正被其他进程读取 (Windows)
+                continue
+            total -= size
+            logger.debug("已淘汰缓存条目: %s", path.name)
+
+    def _write_atomic(self, path: Path, content: str) -> None:
+        temporary = self._temporary_path()
+        try:
+            temporary.write_text(content, encoding="utf-8")
+            os.replace(temporary, path)
+        except OSError as exc:
+            logger.debug("写入缓存记录失败: %s", exc)
+            _remove(temporary)
+
+
+def open_cache(
+    directory: Optional[Path] = None, *, max_bytes: int = DEFAULT_MAX_BYTES
+) -> Optional[PayloadCache]:
+    """Open the cache, or return ``None`` if its directory is unusable."""
+
+    try:
+        return PayloadCache(directory or DEFAULT_CACHE_DIR, max_bytes=max_bytes)
+    except OSError as exc:
+        logger.warning("无法使用缓存目录 %s: %s", directory or DEFAULT_CACHE_DIR, exc)
+        return None
+
+
+__all__ = [
+    "DEFAULT_CACHE_DIR",
+    "DEFAULT_MAX_BYTES",
+    "CachedScript",
+    "EntryWriter",
+    "PayloadCache",
+    "hash_file",
+    "open_cache",
+]
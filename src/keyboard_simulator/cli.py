@@ -3,21 +3,24 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import importlib
 import logging
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Optional
 
-from . import config as cfg
-from .config import ConfigError
-from .backends.sendinput import SendInputBackend
-from .simulator import KeyboardSimulator, SimulatorHooks
-from .tasks import build_plan
-from .logging_config import setup_logging, disable_logging
+if TYPE_CHECKING:  # pragma: no cover
+    from . import config as cfg
+    from .backends.base import AbstractKeyboardBackend
+    from .estimate import Calibration
+    from .simulator import RunStats
 
-try:  # pragma: no cover - optional dependency
-    from .backends.interception import InterceptionBackend
-except Exception:  # pragma: no cover
-    InterceptionBackend = None  # type: ignore[assignment]
+# 模块只在真正执行任务时才导入，保证 --help 与参数校验的启动速度。
+BACKENDS = {
+    "sendinput": ".backends.sendinput",
+    "interception": ".backends.interception",
+}
 
 
 def _positive_float(value: str) -> float:
@@ -34,51 +37,127 @@ def _positive_int(value: str) -> int:
     return result
 
 
-def _build_config_from_args(args: argparse.Namespace) -> cfg.Config:
+def _build_config_from_args(args: argparse.Namespace) -> "cfg.Config":
+    from . import config as cfg
+
     if args.config:
         return cfg.load(Path(args.config))
 
     delay = args.delay if args.delay is not None else 0.01
     countdown = args.countdown if args.countdown is not None else 5
 
+    if args.text is not None and args.text_file is not None:
+        raise ValueError("--text 与 --text-file 不能同时使用")
+
+    if args.text is not None or args.text_file is not None:
+        from .editors import get_profile
+
+        get_profile(args.editor)
     if args.text is not None:
         return cfg.TextConfig(
             text_to_type=args.text,
             delay_between_keystrokes=delay,
             countdown_before_start=countdown,
+            editor=args.editor,
+        )
+
+    if args.text_file is not None:
+        return cfg.TextConfig(
+            text_file=Path(args.text_file),
+            delay_between_keystrokes=delay,
+            countdown_before_start=countdown,
+            editor=args.editor,
         )
 
     if args.file is not None:
-        if not args.output:
-            output = Path(args.file).name
-        else:
+        paths = cfg.expand_paths(args.file)
+        archive = len(paths) > 1 or paths[0].is_dir()
+        if args.output:
             output = args.output
+        elif not archive:
+            output = paths[0].name
+        else:
+            output = f"{paths[0].resolve().name if len(paths) == 1 else 'archive'}.tar.gz"
+        if args.fec and not 1 <= args.fec_parity <= args.fec:
+            raise ValueError("--fec-parity 必须介于 1 与 --fec 之间")
+        if archive and args.delta:
+            raise ValueError("--delta 仅支持单个文件")
+        if args.compress and args.delta:
+            raise ValueError("--delta 不能与 --compress 同时使用")
         return cfg.FileConfig(
-            file_path=Path(args.file),
+            file_path=paths[0],
+            extra_paths=tuple(paths[1:]),
             target_os=args.target_os,
             output_filename=output,
             delay_between_keystrokes=delay,
             countdown_before_start=countdown,
+            fec_group_size=args.fec,
+            fec_parity=args.fec_parity,
+            delta_target=args.delta,
+            sparse=not args.no_sparse,
+            compress=args.compress,
         )
 
-    raise argparse.ArgumentError(None, "必须提供 --config 或 --text / --file")
+    raise argparse.ArgumentError(None, "必须提供 --config 或 --text / --text-file / --file")
+
+
+def _delay_list(value: str) -> list[float]:
+    try:
+        delays = [float(item) for item in value.split(",") if item.strip()]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError("必须是以逗号分隔的数值") from exc
+    if not delays or any(delay < 0 for delay in delays):
+        raise argparse.ArgumentTypeError("必须是以逗号分隔的非负数值")
+    return delays
+
 
+def _create_backend(name: str) -> "AbstractKeyboardBackend":
+    """Import and instantiate the backend registered under ``name``."""
 
-def _create_backend(name: str):
-    if name == "sendinput":
-        return SendInputBackend()
+    from .backends.base import BackendError
+
+    if name not in BACKENDS:
+        raise BackendError(f"未知的后端: {name}")
+    try:
+        module = importlib.import_module(BACKENDS[name], __package__)
+    except Exception as exc:  # pragma: no cover - optional dependency
+        if name == "interception":
+            raise BackendError("未安装 interception-python，无法使用 interception 后端") from exc
+        raise BackendError(f"无法加载后端 {name}: {exc}") from exc
     if name == "interception":
-        if InterceptionBackend is None:
-            raise SystemExit("未安装 interception-python，无法使用 interception 后端")
-        return InterceptionBackend()
-    raise SystemExit(f"未知的后端: {name}")
+        cache = module.KeyboardDeviceCache.load(module.DEFAULT_DEVICE_CACHE)
+        return module.InterceptionBackend(device_cache=cache)
+    return module.SendInputBackend()
 
 
 def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="跨虚拟机键盘模拟输入工具")
     parser.add_argument("--config", type=str, help="配置文件路径 (JSON)")
+    parser.add_argument(
+        "--jobs", type=str, help="批量任务清单 (JSON)，在同一个后端会话中依次执行"
+    )
+    parser.add_argument("--report", type=str, help="批量执行结束后写入 JSON 汇总报告的路径")
     parser.add_argument("--text", type=str, help="直接输入要模拟的文本")
-    parser.add_argument("--file", type=str, help="要传输的文件路径")
+    parser.add_argument(
+        "--text-file",
+        type=str,
+        metavar="PATH|-",
+        help="从文件或标准输入 (-) 流式读取文本，边读边输入",
+    )
+    parser.add_argument(
+        "--editor",
+        type=str,
+        default="plain",
+        metavar="PROFILE",
+        help="文本模式的目标编辑器: plain (默认)、vim、nano、vscode；抵消自动缩进等行为",
+    )
+    parser.add_argument(
+        "--file",
+        type=str,
+        nargs="+",
+        metavar="PATH",
+        help="要传输的文件、目录或通配符；目录或多个路径会打包为一个 tar.gz 归档并在目标端解压",
+    )
     parser.add_argument(
         "--target-os",
         type=str,
@@ -87,14 +166,110 @@ def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
         help="文件传输目标操作系统",
     )
     parser.add_argument("--output", type=str, help="目标机器上的输出文件名")
+    parser.add_argument(
+        "--fec",
+        type=_positive_int,
+        default=0,
+        metavar="GROUP",
+        help="启用前向纠错: 每 GROUP 行数据附加校验行 (Linux 需 python3，Windows 需 PowerShell)",
+    )
+    parser.add_argument(
+        "--fec-parity", type=_positive_int, default=1, help="每组数据的交织校验行数 (默认 1)"
+    )
+    parser.add_argument(
+        "--no-sparse",
+        action="store_true",
+        help="Linux 目标上不把长的相同字节区段输入为 dd/tr 命令，始终输入完整的 Base64",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="单个文件也以 tar.gz 压缩传输 (多核并行压缩)，目标端用 tar 解压为 --output",
+    )
+    parser.add_argument(
+        "--delta",
+        type=str,
+        metavar="TARGET",
+        help="目标机器名称：记录发送到该目标的版本，再次发送时只输入差异补丁",
+    )
+    parser.add_argument(
+        "--delta-reset",
+        action="store_true",
+        help="忘记该目标上记录的版本，本次完整传输 (目标端报告补丁失败时使用)",
+    )
+    parser.add_argument(
+        "--history-dir",
+        type=str,
+        help="发送历史目录 (默认 ~/.keyboard_simulator/history)",
+    )
     parser.add_argument("--delay", type=_positive_float, help="按键间隔 (秒)")
     parser.add_argument("--countdown", type=_positive_int, help="启动前倒计时 (秒)")
+    parser.add_argument(
+        "--feedback",
+        type=str,
+        help="目标回显的日志/串口捕获文件，启用闭环自适应速率",
+    )
+    parser.add_argument(
+        "--min-delay", type=_positive_float, default=0.0, help="自适应模式下的最小按键间隔 (秒)"
+    )
+    parser.add_argument(
+        "--max-delay", type=_positive_float, default=0.5, help="自适应模式下的最大按键间隔 (秒)"
+    )
+    parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="只预估按键次数与耗时 (各后端、编码方式与按键间隔的组合)，不执行输入",
+    )
+    parser.add_argument(
+        "--estimate-delays",
+        type=_delay_list,
+        metavar="D1,D2,...",
+        help="预估时比较的按键间隔列表 (默认使用 --delay)",
+    )
+    parser.add_argument(
+        "--calibration",
+        type=str,
+        metavar="PATH",
+        help="耗时校准文件，供 --estimate 使用并在每次完成运行后更新"
+        " (默认 ~/.keyboard_simulator/calibration.json)",
+    )
+    parser.add_argument(
+        "--no-calibrate", action="store_true", help="运行结束后不更新耗时校准文件"
+    )
     parser.add_argument(
         "--backend",
-        choices=["sendinput", "interception"],
+        choices=list(BACKENDS),
         default="sendinput",
         help="选择键盘后端实现",
     )
+    parser.add_argument(
+        "--metrics-json", type=str, metavar="PATH", help="将按键延迟指标写入 JSON 文件"
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        type=str,
+        metavar="PATH",
+        help="将按键延迟指标写入 Prometheus 文本格式文件 (可供 node_exporter 采集)",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=_positive_float,
+        default=10.0,
+        help="运行期间定期导出指标的间隔 (秒，0 表示只在结束时导出)",
+    )
+    parser.add_argument(
+        "--metrics-sample",
+        type=_positive_int,
+        default=1,
+        metavar="N",
+        help="每 N 次按键采样一次耗时 (默认 1，即全部采样)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="脚本缓存目录，相同文件与参数再次传输时直接复用 (默认 ~/.keyboard_simulator/cache)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="不读取也不写入脚本缓存")
     parser.add_argument(
         "--log-level",
         type=str,
@@ -105,26 +280,163 @@ def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
     parser.add_argument(
         "--log", action="store_true", help="启用文件和控制台日志记录"
     )
+    parser.add_argument(
+        "--log-json",
+        type=str,
+        metavar="PATH",
+        help="同时将日志以 JSON Lines 写入 PATH，包含运行结果等结构化字段 (隐含 --log)",
+    )
     return parser.parse_args(argv)
 
 
+def _metrics_from_args(args: argparse.Namespace):
+    """Return ``(metrics, exporter)`` when metrics export was requested."""
+
+    if not args.metrics_json and not args.metrics_prom:
+        return None, contextlib.nullcontext()
+    from .metrics import KeystrokeMetrics, MetricsExporter
+
+    metrics = KeystrokeMetrics(sample_every=max(1, args.metrics_sample))
+    exporter = MetricsExporter(
+        metrics,
+        json_path=Path(args.metrics_json) if args.metrics_json else None,
+        prometheus_path=Path(args.metrics_prom) if args.metrics_prom else None,
+        interval=args.metrics_interval or None,
+    )
+    return metrics, exporter
+
+
+def _calibration_from_args(args: argparse.Namespace) -> "Calibration":
+    from .estimate import DEFAULT_CALIBRATION, Calibration
+
+    return Calibration.load(Path(args.calibration) if args.calibration else DEFAULT_CALIBRATION)
+
+
+def _calibrator_from_args(
+    args: argparse.Namespace,
+) -> Optional[Callable[["cfg.Config", "RunStats"], None]]:
+    """Return a callback recording finished runs, unless ``--no-calibrate`` was given."""
+
+    if args.no_calibrate:
+        return None
+    from .estimate import record_run
+
+    calibration = _calibration_from_args(args)
+    return lambda config, stats: record_run(calibration, config, args.backend, stats)
+
+
+def _cache_from_args(args: argparse.Namespace):
+    if args.no_cache:
+        return None
+    from .cache import open_cache
+
+    return open_cache(Path(args.cache_dir) if args.cache_dir else None)
+
+
+def _history_from_args(args: argparse.Namespace):
+    from .history import DEFAULT_HISTORY_DIR, TransferHistory
+
+    return TransferHistory(Path(args.history_dir) if args.history_dir else DEFAULT_HISTORY_DIR)
+
+
+def _run_jobs(args: argparse.Namespace, logger: logging.Logger) -> None:
+    import json
+
+    from .jobs import JobRunner, load_manifest
+    from .simulator import KeyboardSimulator, SimulatorHooks
+
+    logger.info("正在加载任务清单: %s", args.jobs)
+    jobs = load_manifest(Path(args.jobs))
+    logger.info("任务清单包含 %d 个任务", len(jobs))
+
+    logger.info("正在创建后端: %s", args.backend)
+    backend = _create_backend(args.backend)
+    hooks = SimulatorHooks(
+        on_countdown=lambda s: logger.info("%d 秒后开始...", s),
+        on_status=lambda s: logger.info("状态更新: %s", s),
+    )
+    metrics, exporter = _metrics_from_args(args)
+    calibrate = _calibrator_from_args(args)
+    runner = JobRunner(
+        KeyboardSimulator(backend, hooks, metrics=metrics),
+        cache=_cache_from_args(args),
+        history=_history_from_args(args),
+        on_finished=None if calibrate is None else lambda job, stats: calibrate(job.config, stats),
+    )
+    with exporter:
+        report = runner.run(jobs)
+    if metrics is not None:
+        logger.info("按键指标: %s", metrics.summary())
+
+    print(report.format())
+    if args.report:
+        Path(args.report).write_text(
+            json.dumps(report.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        logger.info("汇总报告已写入: %s", args.report)
+    if not report.succeeded:
+        raise SystemExit(1)
+
+
 def main(argv: Optional[list[str]] = None) -> None:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "serve":
+        from .server import serve
+
+        serve(argv[1:], backend_factory=_create_backend, backends=tuple(BACKENDS))
+        return
+
     args = parse_args(argv)
-    if args.log:
-        setup_logging(log_level=args.log_level)
+
+    from .backends.base import BackendError
+    from .config import ConfigError, FileConfig
+    from .logging_config import disable_logging, setup_logging
+
+    if args.log or args.log_json:
+        setup_logging(log_level=args.log_level, run_log=args.log_json)
     else:
         disable_logging()
     
     logger = logging.getLogger(__name__)
 
     try:
+        if args.jobs:
+            _run_jobs(args, logger)
+            return
+
+        from .simulator import KeyboardSimulator, SimulatorHooks
+        from .tasks import build_plan
+
         logger.info("正在从参数构建配置...")
         config = _build_config_from_args(args)
         logger.debug("构建的配置: %s", config)
 
+        if args.estimate:
+            from .estimate import encoding_variants, estimate_config, format_estimates
+
+            estimates = estimate_config(
+                config,
+                delays=args.estimate_delays,
+                variants=encoding_variants(config),
+                calibration=_calibration_from_args(args),
+            )
+            print(format_estimates(estimates))
+            return
+
         logger.info("正在构建任务计划...")
-        plan = build_plan(config)
+        history = None
+        if isinstance(config, FileConfig) and config.delta_target is not None:
+            history = _history_from_args(args)
+            if args.delta_reset:
+                history.forget(config.delta_target, config.target_os, config.output_filename)
+        plan = build_plan(config, cache=_cache_from_args(args), history=history)
         logger.debug("构建的计划包含 %d 个任务", len(plan.tasks))
+        for task in plan.tasks:
+            length = task.length
+            logger.info(
+                "任务: %s (%s 个字符)", task.description, "未知" if length is None else length
+            )
 
         logger.info("正在创建后端: %s", args.backend)
         backend = _create_backend(args.backend)
@@ -134,15 +446,62 @@ def main(argv: Optional[list[str]] = None) -> None:
             on_status=lambda s: logger.info("状态更新: %s", s),
         )
 
-        simulator = KeyboardSimulator(backend, hooks)
+        metrics, exporter = _metrics_from_args(args)
+        calibrate = _calibrator_from_args(args)
+        controller = None
+        with contextlib.ExitStack() as stack:
+            verifier = None
+            if args.feedback:
+                from .feedback import AIMDRateController, EchoVerifier, FileFeedbackChannel
+
+                logger.info("启用回显反馈通道: %s", args.feedback)
+                channel = stack.enter_context(FileFeedbackChannel(Path(args.feedback)))
+                verifier = EchoVerifier(channel)
+                controller = AIMDRateController(
+                    delay=plan.delay_between_keystrokes,
+                    min_delay=args.min_delay,
+                    max_delay=max(args.max_delay, args.min_delay),
+                )
+            simulator = KeyboardSimulator(
+                backend, hooks, metrics=metrics, verifier=verifier, rate_controller=controller
+            )
 
-        logger.info("开始执行模拟...")
-        simulator.run_plan(plan)
-        logger.info("模拟执行完毕。")
+            logger.info("开始执行模拟...")
+            with exporter:
+                stats = simulator.run_plan(plan)
+        if controller is not None:
+            logger.info(
+                "回显校验: 最终按键间隔 %.4f 秒，校验失败 %d 次。",
+                controller.delay,
+                controller.mismatches,
+            )
+        if metrics is not None:
+            logger.info("按键指标: %s", metrics.summary())
+        for task in plan.tasks:
+            if task.sparse is not None and task.sparse.runs:
+                logger.info("稀疏编码: %s", task.sparse.describe())
+        logger.info(
+            "模拟执行完毕: %d 个字符，用时 %.2f 秒 (%.1f 字符/秒)。",
+            stats.characters,
+            stats.elapsed,
+            stats.characters_per_second,
+            extra={
+                "event": "run_finished",
+                "status": stats.status,
+                "characters": stats.characters,
+                "elapsed": stats.elapsed,
+                "backend": args.backend,
+            },
+        )
+        if calibrate is not None:
+            calibrate(config, stats)
 
     except (ConfigError, argparse.ArgumentError, ValueError) as e:
         logger.error("配置或参数错误: %s", e, exc_info=True)
         raise SystemExit(f"错误: {e}")
+    except BackendError as e:
+        logger.error("后端错误: %s", e, exc_info=True)
+        raise SystemExit(f"错误: {e}") from e
     except Exception as e:
         logger.critical("发生未预料的严重错误: %s", e, exc_info=True)
         raise SystemExit(f"严重错误: {e}")
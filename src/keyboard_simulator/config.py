@@ -5,9 +5,12 @@ from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, Literal, Optional
+from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple
+import glob
 import json
 
+from .editors import DEFAULT_PROFILE, PROFILES
+
 
 class Mode(str, Enum):
     """Supported automation modes."""
@@ -28,6 +31,9 @@ class BaseConfig:
 @dataclass(slots=True)
 class TextConfig(BaseConfig):
     text_to_type: str = ""
+    text_file: Optional[Path] = None
+    # 目标编辑器配置 (editors.PROFILES)，用于抵消自动缩进等行为
+    editor: str = DEFAULT_PROFILE
 
     @property
     def mode(self) -> Mode:
@@ -39,6 +45,30 @@ class FileConfig(BaseConfig):
     file_path: Path = Path()
     target_os: TargetOS = "linux"
     output_filename: str = "output"
+    fec_group_size: int = 0
+    fec_parity: int = 1
+    # 目标机器的名称；设置后记录发送历史，并在可能时只发送差异补丁
+    delta_target: Optional[str] = None
+    # 与 file_path 一起打包传输的其他文件或目录
+    extra_paths: Tuple[Path, ...] = ()
+    # Linux 目标上把长的相同字节区段输入为 dd/tr 命令，而不是 Base64
+    sparse: bool = True
+    # 单个文件也以 tar.gz 压缩传输 (多核并行压缩)，目标端用 tar 解压
+    compress: bool = False
+
+    @property
+    def fec_enabled(self) -> bool:
+        return self.fec_group_size > 0
+
+    @property
+    def paths(self) -> Tuple[Path, ...]:
+        return (self.file_path, *self.extra_paths)
+
+    @property
+    def archive(self) -> bool:
+        """Whether the sources are sent as one tar.gz archive."""
+
+        return bool(self.extra_paths) or self.file_path.is_dir()
 
     @property
     def mode(self) -> Mode:
@@ -75,6 +105,35 @@ def _resolve_path(raw_path: str, field_name: str) -> Path:
     return path
 
 
+def expand_paths(patterns: Iterable[str], *, base_path: Optional[Path] = None) -> List[Path]:
+    """Resolve file/directory paths and glob patterns, keeping their order.
+
+    Patterns without wildcards must exist; patterns with wildcards must
+    match at least one path. Duplicates are dropped.
+    """
+
+    paths: List[Path] = []
+    for pattern in patterns:
+        raw = Path(pattern).expanduser()
+        if base_path and not raw.is_absolute():
+            raw = base_path / raw
+            if not glob.has_magic(str(raw)):
+                raw = raw.resolve()
+        if glob.has_magic(str(raw)):
+            matches = sorted(glob.glob(str(raw), recursive=True))
+            if not matches:
+                raise ConfigError(f"通配符没有匹配任何文件: {pattern}")
+            found = [Path(match) for match in matches]
+        else:
+            if not raw.exists():
+                raise ConfigError(f"文件或目录不存在: {raw}")
+            found = [raw]
+        for path in found:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
 def _parse_common(data: Dict[str, Any]) -> Dict[str, Any]:
     delay = _validate_float(data.get("delay_between_keystrokes", 0.01), "delay_between_keystrokes")
     countdown = _validate_int(data.get("countdown_before_start", 5), "countdown_before_start")
@@ -107,16 +166,37 @@ def from_dict(data: Dict[str, Any], *, base_path: Optional[Path] = None) -> Conf
         text = data.get("text_to_type", "")
         if not isinstance(text, str):
             raise ConfigError("'text_to_type' 必须是字符串")
-        return TextConfig(text_to_type=text, **common_kwargs)
+        editor = data.get("editor", DEFAULT_PROFILE)
+        if not isinstance(editor, str) or editor not in PROFILES:
+            raise ConfigError(f"'editor' 仅支持 {', '.join(repr(name) for name in PROFILES)}")
+        common_kwargs["editor"] = editor
+        raw_text_file = data.get("text_file")
+        if raw_text_file is None:
+            return TextConfig(text_to_type=text, **common_kwargs)
+        if not isinstance(raw_text_file, str):
+            raise ConfigError("'text_file' 必须是字符串")
+        if text:
+            raise ConfigError("'text_to_type' 与 'text_file' 不能同时使用")
+        if raw_text_file == "-":
+            return TextConfig(text_file=Path("-"), **common_kwargs)
+        text_path = Path(raw_text_file)
+        if base_path and not text_path.is_absolute():
+            text_path = (base_path / text_path).resolve()
+        return TextConfig(
+            text_file=_resolve_path(str(text_path), "text_file"), **common_kwargs
+        )
 
     # file mode
     raw_path = data.get("file_path")
-    if not isinstance(raw_path, str):
-        raise ConfigError("'file_path' 必须是字符串")
-    path = Path(raw_path)
-    if base_path and not path.is_absolute():
-        path = (base_path / path).resolve()
-    file_path = _resolve_path(str(path), "file_path")
+    if isinstance(raw_path, str):
+        raw_paths = [raw_path]
+    elif isinstance(raw_path, list) and raw_path and all(isinstance(p, str) for p in raw_path):
+        raw_paths = raw_path
+    else:
+        raise ConfigError("'file_path' 必须是字符串或字符串列表")
+    if any(not p for p in raw_paths):
+        raise ConfigError("'file_path' 不能为空")
+    file_paths = expand_paths(raw_paths, base_path=base_path)
 
     target_os = data.get("target_os", "linux")
     if target_os not in ("windows", "linux"):
@@ -126,10 +206,39 @@ def from_dict(data: Dict[str, Any], *, base_path: Optional[Path] = None) -> Conf
     if not output_filename:
         raise ConfigError("'output_filename' 不能为空")
 
+    fec_group_size = _validate_int(data.get("fec_group_size", 0), "fec_group_size")
+    fec_parity = _validate_int(data.get("fec_parity", 1), "fec_parity")
+    if fec_group_size < 0:
+        raise ConfigError("'fec_group_size' 必须是非负整数")
+    if fec_group_size and not 1 <= fec_parity <= fec_group_size:
+        raise ConfigError("'fec_parity' 必须介于 1 与 'fec_group_size' 之间")
+
+    delta_target = data.get("delta_target")
+    if delta_target is not None and (not isinstance(delta_target, str) or not delta_target):
+        raise ConfigError("'delta_target' 必须是非空字符串")
+    if delta_target is not None and (len(file_paths) > 1 or file_paths[0].is_dir()):
+        raise ConfigError("增量传输 ('delta_target') 仅支持单个文件")
+
+    sparse = data.get("sparse", True)
+    if not isinstance(sparse, bool):
+        raise ConfigError("'sparse' 必须是布尔值")
+
+    compress = data.get("compress", False)
+    if not isinstance(compress, bool):
+        raise ConfigError("'compress' 必须是布尔值")
+    if compress and delta_target is not None:
+        raise ConfigError("增量传输 ('delta_target') 不能与 'compress' 同时使用")
+
     return FileConfig(
-        file_path=file_path,
+        file_path=file_paths[0],
+        extra_paths=tuple(file_paths[1:]),
         target_os=target_os,
         output_filename=str(output_filename),
+        fec_group_size=fec_group_size,
+        fec_parity=fec_parity,
+        delta_target=delta_target,
+        sparse=sparse,
+        compress=compress,
         **common_kwargs,
     )
 
@@ -157,6 +266,7 @@ __all__ = [
     "FileConfig",
     "TargetOS",
     "ConfigError",
+    "expand_paths",
     "from_dict",
     "load",
 ]
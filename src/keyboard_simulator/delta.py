@@ -0,0 +1,286 @@
+"""Binary delta between two versions of a file and the scripts that apply it.
+
+:func:`compute_delta` works like rsync: the old version is cut into
+fixed-size blocks indexed by a rolling Adler-style checksum, the new
+version is scanned byte by byte, and every block hit is extended in both
+directions into the longest common run. The result is a list of
+:class:`Copy` ranges from the old version and :class:`Literal` bytes that
+only exist in the new one.
+
+The patch scripts rebuild the new version on the target from the file
+that is already there plus the typed literals, using only ``tail``,
+``head`` and ``sha256sum`` on Linux. On Windows the script is typed into
+``cmd`` like a full transfer and calls PowerShell for the byte ranges. Both
+check the SHA-256 of the old file before and of the result after patching,
+so a target that does not hold the expected version is left untouched.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+from .encoding import (
+    CHUNK_SIZE_WINDOWS,
+    linux_reconstruction_script,
+    windows_reconstruction_script,
+)
+
+MIN_BLOCK_SIZE = 32
+MAX_BLOCK_SIZE = 4096
+# 比较匹配区间时每次比较的字节数
+_COMPARE_STEP = 256
+_MOD = 1 << 16
+PATCH_FAILED_MESSAGE = "delta: patch failed, send the full file"
+
+
+@dataclass(slots=True, frozen=True)
+class Copy:
+    """Copy ``length`` bytes starting at ``offset`` of the old version."""
+
+    offset: int
+    length: int
+
+
+@dataclass(slots=True, frozen=True)
+class Literal:
+    """Bytes that have to be transferred."""
+
+    data: bytes
+
+
+DeltaOp = Union[Copy, Literal]
+
+
+def block_size_for(base_length: int) -> int:
+    """Block size used for an old version of ``base_length`` bytes."""
+
+    return max(MIN_BLOCK_SIZE, min(MAX_BLOCK_SIZE, math.isqrt(base_length)))
+
+
+def _checksum(block: bytes) -> Tuple[int, int]:
+    a = sum(block) % _MOD
+    b = sum((len(block) - index) * value for index, value in enumerate(block)) % _MOD
+    return a, b
+
+
+def _common_prefix(a: memoryview, a_start: int, b: memoryview, b_start: int) -> int:
+    limit = min(len(a) - a_start, len(b) - b_start)
+    length = 0
+    while length < limit:
+        step = min(_COMPARE_STEP, limit - length)
+        a_end, b_end = a_start + length + step, b_start + length + step
+        if a[a_start + length : a_end] == b[b_start + length : b_end]:
+            length += step
+            continue
+        while a[a_start + length] == b[b_start + length]:
+            length += 1
+        break
+    return length
+
+
+def compute_delta(base: bytes, data: bytes, *, block_size: Optional[int] = None) -> List[DeltaOp]:
+    """Describe ``data`` as copies from ``base`` and literal bytes."""
+
+    size = block_size or block_size_for(len(base))
+    if len(base) < size or len(data) < size:
+        return [Literal(data)] if data else []
+
+    index: Dict[int, List[int]] = {}
+    for offset in range(0, len(base) - size + 1, size):
+        a, b = _checksum(base[offset : offset + size])
+        index.setdefault(a | b << 16, []).append(offset)
+
+    old, new = memoryview(base), memoryview(data)
+    ops: List[DeltaOp] = []
+    literal_start = position = 0
+    a, b = _checksum(data[:size])
+    end = len(data)
+    while True:
+        match = None
+        for offset in index.get(a | b << 16, ()):
+            if old[offset : offset + size] == new[position : position + size]:
+                match = offset
+                break
+        if match is not None:
+            length = size + _common_prefix(old, match + size, new, position + size)
+            # 向前扩展，吃掉与旧版本相同的字面量尾部
+            while position > literal_start and match > 0 and base[match - 1] == data[position - 1]:
+                match -= 1
+                position -= 1
+                length += 1
+            if position > literal_start:
+                ops.append(Literal(data[literal_start:position]))
+            previous = ops[-1] if ops else None
+            if isinstance(previous, Copy) and previous.offset + previous.length == match:
+                ops[-1] = Copy(previous.offset, previous.length + length)
+            else:
+                ops.append(Copy(match, length))
+            position += length
+            literal_start = position
+            if position + size > end:
+                break
+            a, b = _checksum(data[position : position + size])
+            continue
+        if position + size >= end:
+            break
+        outgoing, incoming = data[position], data[position + size]
+        a = (a - outgoing + incoming) % _MOD
+        b = (b - size * outgoing + a) % _MOD
+        position += 1
+    if literal_start < end:
+        ops.append(Literal(data[literal_start:]))
+    return ops
+
+
+def apply_delta(base: bytes, ops: List[DeltaOp]) -> bytes:
+    """Rebuild the new version from ``base`` and ``ops``."""
+
+    return b"".join(
+        base[op.offset : op.offset + op.length] if isinstance(op, Copy) else op.data for op in ops
+    )
+
+
+def _literal_offsets(ops: List[DeltaOp]) -> Tuple[bytes, List[Tuple[str, int, int]]]:
+    """Concatenated literal bytes and ``(source, offset, length)`` per op."""
+
+    literals: List[bytes] = []
+    ranges: List[Tuple[str, int, int]] = []
+    done = 0
+    for op in ops:
+        if isinstance(op, Copy):
+            ranges.append(("base", op.offset, op.length))
+        else:
+            literals.append(op.data)
+            ranges.append(("literal", done, len(op.data)))
+            done += len(op.data)
+    return b"".join(literals), ranges
+
+
+def linux_patch_script(
+    base: bytes, data: bytes, ops: List[DeltaOp], output_filename: str
+) -> str:
+    """Bash script that patches ``output_filename`` on the target in place."""
+
+    if not data:
+        raise ValueError("data is empty")
+    literal, ranges = _literal_offsets(ops)
+    delta_file = f"{output_filename}.delta"
+    new_file = f"{output_filename}.new"
+    script: List[str] = []
+    if literal:
+        script.extend(
+            linux_reconstruction_script(
+                base64.b64encode(literal).decode("ascii"), delta_file
+            ).splitlines()
+        )
+    script.append('_ksd(){ tail -c +$(($2+1)) "$1" | head -c $3; }')
+    script.append(
+        f"echo '{hashlib.sha256(base).hexdigest()}  {output_filename}' "
+        f"| sha256sum -c >/dev/null 2>&1 && {{"
+    )
+    for source, offset, length in ranges:
+        name = output_filename if source == "base" else delta_file
+        script.append(f"_ksd {name} {offset} {length}")
+    script.append(f"}} > {new_file}")
+    script.append(
+        f"echo '{hashlib.sha256(data).hexdigest()}  {new_file}' | sha256sum -c >/dev/null 2>&1 "
+        f"&& mv {new_file} {output_filename} || echo '{PATCH_FAILED_MESSAGE}' >&2"
+    )
+    script.append(f"rm -f {delta_file} {new_file}; unset -f _ksd")
+    return "\n".join(script) + "\n"
+
+
+def _windows_ranges(ranges: List[Tuple[str, int, int]]) -> List[str]:
+    """``echo`` lines writing one ``b|l:offset:length`` token per range."""
+
+    tokens = [f"{source[0]}:{offset}:{length}" for source, offset, length in ranges]
+    lines: List[str] = []
+    line: List[str] = []
+    width = 0
+    for token in tokens:
+        if line and width + len(token) + 1 > CHUNK_SIZE_WINDOWS:
+            lines.append(" ".join(line))
+            line, width = [], 0
+        line.append(token)
+        width += len(token) + 1
+    if line:
+        lines.append(" ".join(line))
+    # 重定向前留一个空格，避免行尾数字被 cmd 当作句柄号
+    return [f"echo {text} {'>' if index == 0 else '>>'}" for index, text in enumerate(lines)]
+
+
+def windows_patch_script(
+    base: bytes, data: bytes, ops: List[DeltaOp], output_filename: str
+) -> str:
+    """cmd script that patches ``output_filename`` on the target in place.
+
+    Like the full Windows transfer it is typed into ``cmd``: the literals
+    arrive through ``echo`` and ``certutil -decode``, the ranges through
+    ``echo``, and a single ``powershell -Command`` line, free of ``"`` and
+    ``%``, assembles and verifies the result.
+    """
+
+    if not data:
+        raise ValueError("data is empty")
+    literal, ranges = _literal_offsets(ops)
+    delta_file = f"{output_filename}.delta"
+    ranges_file = f"{output_filename}.ranges"
+    script: List[str] = []
+    if literal:
+        script.append(f"if exist {delta_file} del {delta_file}")
+        script.extend(
+            windows_reconstruction_script(
+                base64.b64encode(literal).decode("ascii"), delta_file
+            ).splitlines()
+        )
+    script.extend(f"{line}{ranges_file}" for line in _windows_ranges(ranges))
+    read_literal = (
+        f"$l=[IO.File]::ReadAllBytes([IO.Path]::GetFullPath('{delta_file}'))"
+        if literal
+        else "$l=New-Object byte[] 0"
+    )
+    command = [
+        "try{",
+        f"$f=[IO.Path]::GetFullPath('{output_filename}');$b=[IO.File]::ReadAllBytes($f);",
+        f"{read_literal};$m=New-Object IO.MemoryStream;",
+        f"foreach($r in (Get-Content '{ranges_file}') -split '\\s+'){{if($r){{",
+        "$p=$r -split ':';$s=$b;if($p[0] -eq 'l'){$s=$l};$m.Write($s,[int]$p[1],[int]$p[2])",
+        "}};",
+        "$h={param($x)-join([Security.Cryptography.SHA256]::Create().ComputeHash($x)",
+        "|ForEach-Object{$_.ToString('x2')})};",
+        f"$ok=(&$h $b) -eq '{hashlib.sha256(base).hexdigest()}' -and ",
+        f"(&$h $m.ToArray()) -eq '{hashlib.sha256(data).hexdigest()}'",
+        "}catch{$ok=$false};",
+        "if($ok){[IO.File]::WriteAllBytes($f,$m.ToArray())}",
+        f"else{{Write-Error '{PATCH_FAILED_MESSAGE}'}}",
+    ]
+    script.append('powershell -NoProfile -Command "' + "".join(command) + '"')
+    leftovers = f"{delta_file} {ranges_file}" if literal else ranges_file
+    script.append(f"del {leftovers}")
+    return "\n".join(script) + "\n"
+
+
+def patch_script(base: bytes, data: bytes, output_filename: str, target_os: str) -> str:
+    """Patch script turning ``base`` into ``data`` on the target."""
+
+    ops = compute_delta(base, data)
+    if target_os == "linux":
+        return linux_patch_script(base, data, ops, output_filename)
+    return windows_patch_script(base, data, ops, output_filename)
+
+
+__all__ = [
+    "Copy",
+    "Literal",
+    "DeltaOp",
+    "block_size_for",
+    "compute_delta",
+    "apply_delta",
+    "linux_patch_script",
+    "windows_patch_script",
+    "patch_script",
+]
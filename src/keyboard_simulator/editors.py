@@ -0,0 +1,123 @@
+"""Text-mode target profiles for editors that indent or pair as you type.
+
+Typing source code into an editor with auto-indent doubles the leading
+whitespace of every line, and auto-closing brackets add characters of their
+own. An :class:`EditorProfile` rewrites the text so that what ends up in the
+editor equals the source:
+
+- ``vim`` switches the ``paste`` option on around the text, which turns off
+  auto-indent, ``indentexpr`` and insert-mode mappings (auto-pair plugins)
+  whatever the user's configuration is;
+- ``nano`` and ``vscode`` model an editor that copies the previous line's
+  indentation on Enter: only the difference is typed, with backspaces where
+  a line is indented less than the one before. Brackets and quotes closed on
+  the same line need no rewrite, as typing the closing character overtypes
+  the one the editor inserted; pairs spanning lines require auto-closing to
+  be off in the editor.
+
+The rewrite works line by line on a stream of chunks, so it also applies to
+streamed text files. The cursor is assumed to be at the start of an empty
+line.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, Tuple
+
+from .streaming import split_lines
+
+BACKSPACE = "\b"
+ESCAPE = "\x1b"
+
+
+@dataclass(slots=True, frozen=True)
+class EditorProfile:
+    name: str
+    description: str
+    # 正文前后输入的按键，例如切换 vim 的 paste 选项
+    prefix: str = ""
+    suffix: str = ""
+    # 回车时编辑器原样复制上一行的缩进
+    auto_indent: bool = False
+    # 退格在空格缩进中删除到上一个制表位 (VS Code 的 useTabStops)；0 表示逐字符删除
+    tab_stop: int = 0
+
+    def rewrite(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Yield the keys to type for ``chunks``, one line at a time."""
+
+        if self.prefix:
+            yield self.prefix
+        if self.auto_indent:
+            yield from self._dedented(chunks)
+        else:
+            yield from chunks
+        if self.suffix:
+            yield self.suffix
+
+    def _dedented(self, chunks: Iterable[str]) -> Iterator[str]:
+        carried = ""
+        for line in split_lines(chunks):
+            body = line[:-1] if line.endswith("\n") else line
+            newline = line[len(body) :]
+            if not body:
+                # 空行上未使用的自动缩进会被编辑器删除，下一行仍沿用它
+                yield newline
+                continue
+            content = body.lstrip(" \t")
+            indent = body[: len(body) - len(content)]
+            keep = 0 if not content else _common_prefix(carried, indent)
+            keys, kept = self._erase(carried, keep)
+            yield keys + indent[kept:] + content + newline
+            carried = indent
+
+    def _erase(self, indent: str, keep: int) -> Tuple[str, int]:
+        """Backspaces that shorten ``indent`` to at most ``keep`` characters."""
+
+        length = len(indent)
+        presses = 0
+        while length > keep:
+            if self.tab_stop and not indent[:length].strip(" "):
+                length = (length - 1) // self.tab_stop * self.tab_stop
+            else:
+                length -= 1
+            presses += 1
+        return BACKSPACE * presses, length
+
+
+def _common_prefix(a: str, b: str) -> int:
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+PROFILES: Dict[str, EditorProfile] = {
+    profile.name: profile
+    for profile in (
+        EditorProfile("plain", "原样输入"),
+        EditorProfile(
+            "vim",
+            "vim 插入模式 (输入期间开启 paste)",
+            prefix=f"{ESCAPE}:set paste\ngi",
+            suffix=f"{ESCAPE}:set nopaste\ngi",
+        ),
+        EditorProfile("nano", "nano (set autoindent)", auto_indent=True),
+        EditorProfile(
+            "vscode", "VS Code 风格 (autoIndent: keep，按制表位退格)", auto_indent=True, tab_stop=4
+        ),
+    )
+}
+DEFAULT_PROFILE = "plain"
+
+
+def get_profile(name: str) -> EditorProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"未知的编辑器配置: {name} (可选: {', '.join(PROFILES)})") from None
+
+
+__all__ = ["DEFAULT_PROFILE", "EditorProfile", "PROFILES", "get_profile"]
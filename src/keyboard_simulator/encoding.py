@@ -5,11 +5,14 @@ from __future__ import annotations
 import base64
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import Callable, Iterable, Iterator, List, Optional
 
 
 CHUNK_SIZE_LINUX = 512
 CHUNK_SIZE_WINDOWS = 76
+LINES_PER_READ = 64
+# 生成脚本的格式版本；修改 encoding.py 或 fec.py 的输出时递增，使旧缓存失效
+SCRIPT_FORMAT_VERSION = 1
 
 
 @dataclass(slots=True, frozen=True)
@@ -30,19 +33,35 @@ def chunk_string(data: str, chunk_size: int) -> List[str]:
     return [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
 
 
+def _linux_tail(output_filename: str) -> List[str]:
+    return [
+        f"base64 -d {output_filename}.b64 > {output_filename}",
+        f"rm {output_filename}.b64",
+    ]
+
+
+def _windows_tail(output_filename: str) -> List[str]:
+    return [f"certutil -decode tmp.b64 {output_filename}", "del tmp.b64"]
+
+
+def _linux_line(chunk: str, output_filename: str, first: bool) -> str:
+    redirect = ">" if first else ">>"
+    return f"echo -n {chunk} {redirect} {output_filename}.b64"
+
+
+def _windows_line(chunk: str, output_filename: str, first: bool) -> str:
+    redirect = ">" if first else ">>"
+    return f"echo {chunk}{redirect}tmp.b64"
+
+
 def linux_reconstruction_script(encoded: str, output_filename: str) -> str:
     chunks = chunk_string(encoded, CHUNK_SIZE_LINUX)
     if not chunks:
         raise ValueError("encoded data is empty")
-    lines: List[str] = [f"echo -n {chunks[0]} > {output_filename}.b64"]
-    for chunk in chunks[1:]:
-        lines.append(f"echo -n {chunk} >> {output_filename}.b64")
-    lines.extend(
-        [
-            f"base64 -d {output_filename}.b64 > {output_filename}",
-            f"rm {output_filename}.b64",
-        ]
-    )
+    lines: List[str] = [
+        _linux_line(chunk, output_filename, index == 0) for index, chunk in enumerate(chunks)
+    ]
+    lines.extend(_linux_tail(output_filename))
     return "\n".join(lines) + "\n"
 
 
@@ -50,13 +69,130 @@ def windows_reconstruction_script(encoded: str, output_filename: str) -> str:
     chunks = chunk_string(encoded, CHUNK_SIZE_WINDOWS)
     if not chunks:
         raise ValueError("encoded data is empty")
-    lines: List[str] = [f"echo {chunks[0]}>tmp.b64"]
-    lines.extend(f"echo {chunk}>>tmp.b64" for chunk in chunks[1:])
-    lines.append(f"certutil -decode tmp.b64 {output_filename}")
-    lines.append("del tmp.b64")
+    lines: List[str] = [
+        _windows_line(chunk, output_filename, index == 0) for index, chunk in enumerate(chunks)
+    ]
+    lines.extend(_windows_tail(output_filename))
     return "\n".join(lines) + "\n"
 
 
+def _aligned_blocks(blocks: Iterable[bytes], size: int) -> Iterator[bytes]:
+    """Regroup ``blocks`` into blocks of exactly ``size`` bytes, except the last."""
+
+    pending = b""
+    for block in blocks:
+        if pending:
+            block = pending + block
+        offset = 0
+        while len(block) - offset >= size:
+            yield block[offset : offset + size]
+            offset += size
+        pending = block[offset:]
+    if pending:
+        yield pending
+
+
+def iter_block_script(
+    blocks: Iterable[bytes],
+    output_filename: str,
+    target_os: str,
+    *,
+    tail: Optional[List[str]] = None,
+    lines_per_read: int = LINES_PER_READ,
+) -> Iterator[str]:
+    """Yield the reconstruction script for the bytes produced by ``blocks``.
+
+    ``blocks`` may have any sizes; the output equals the script for their
+    concatenation. ``tail`` replaces the default decode-and-clean-up lines.
+    """
+
+    if target_os == "linux":
+        chunk_size, make_line = CHUNK_SIZE_LINUX, _linux_line
+        default_tail = _linux_tail
+    else:
+        chunk_size, make_line = CHUNK_SIZE_WINDOWS, _windows_line
+        default_tail = _windows_tail
+    block_size = chunk_size // 4 * 3 * lines_per_read
+    first = True
+    for block in _aligned_blocks(blocks, block_size):
+        encoded = base64.b64encode(block).decode("ascii")
+        for chunk in chunk_string(encoded, chunk_size):
+            yield make_line(chunk, output_filename, first) + "\n"
+            first = False
+    if first:
+        raise ValueError("encoded data is empty")
+    for line in default_tail(output_filename) if tail is None else tail:
+        yield line + "\n"
+
+
+def _read_blocks(
+    path: Path, block_size: int, on_block: Optional[Callable[[bytes], None]]
+) -> Iterator[bytes]:
+    with path.open("rb") as handle:
+        while True:
+            block = handle.read(block_size)
+            if not block:
+                return
+            if on_block is not None:
+                on_block(block)
+            yield block
+
+
+def iter_reconstruction_script(
+    path: Path,
+    output_filename: str,
+    target_os: str,
+    *,
+    lines_per_read: int = LINES_PER_READ,
+    on_block: Optional[Callable[[bytes], None]] = None,
+) -> Iterator[str]:
+    """Yield the reconstruction script line by line while encoding ``path``.
+
+    The file is read in blocks that encode to whole script lines, so the
+    output equals :func:`linux_reconstruction_script` /
+    :func:`windows_reconstruction_script` without holding the file in memory.
+    ``on_block`` sees every raw block, e.g. to hash the file in the same pass.
+    """
+
+    chunk_size = CHUNK_SIZE_LINUX if target_os == "linux" else CHUNK_SIZE_WINDOWS
+    block_size = chunk_size // 4 * 3 * lines_per_read
+    return iter_block_script(
+        _read_blocks(path, block_size, on_block),
+        output_filename,
+        target_os,
+        lines_per_read=lines_per_read,
+    )
+
+
+def encoded_length(size: int) -> int:
+    """Length of the Base64 encoding of ``size`` bytes."""
+
+    return 4 * ((size + 2) // 3)
+
+
+def reconstruction_script_length(encoded_length: int, output_filename: str, target_os: str) -> int:
+    """Number of characters the plain reconstruction script will contain.
+
+    Computed from the line templates, without building the script.
+    """
+
+    if encoded_length <= 0:
+        raise ValueError("encoded data is empty")
+    if target_os == "linux":
+        chunk_size = CHUNK_SIZE_LINUX
+        first = f"echo -n  > {output_filename}.b64"
+        other = f"echo -n  >> {output_filename}.b64"
+        tail = _linux_tail(output_filename)
+    else:
+        chunk_size = CHUNK_SIZE_WINDOWS
+        first = "echo >tmp.b64"
+        other = "echo >>tmp.b64"
+        tail = _windows_tail(output_filename)
+    chunks = (encoded_length + chunk_size - 1) // chunk_size
+    framing = len(first) + 1 + (chunks - 1) * (len(other) + 1)
+    return encoded_length + framing + sum(len(line) + 1 for line in tail)
+
+
 def render_script(script: str) -> str:
     """Ensure script uses Windows line endings when needed."""
 
@@ -73,6 +209,10 @@ __all__ = [
     "chunk_string",
     "linux_reconstruction_script",
     "windows_reconstruction_script",
+    "reconstruction_script_length",
+    "iter_reconstruction_script",
+    "iter_block_script",
+    "encoded_length",
     "render_script",
     "iter_lines",
 ]
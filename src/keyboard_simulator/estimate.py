@@ -0,0 +1,297 @@
+"""Predict keystrokes and wall time of a run before starting it.
+
+The model mirrors what the code actually does per typed character:
+
+- the simulator waits ``delay`` before every character;
+- SendInput sends one key down/up pair through ``KEYEVENTF_UNICODE`` and
+  never needs modifier keys;
+- Interception holds every key for ``delay`` and every Shift for a further
+  ``delay`` (``delay / 2`` after pressing and before releasing it);
+- every character costs a backend-specific overhead (API calls, sleep
+  overshoot), calibrated from previously recorded runs.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+
+from . import config as cfg
+from .streaming import STDIN, TextStream
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .simulator import RunStats
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("sendinput", "interception")
+DEFAULT_CALIBRATION = Path.home() / ".keyboard_simulator" / "calibration.json"
+# 未校准时每个字符的额外开销 (秒)
+DEFAULT_OVERHEAD = {"sendinput": 0.0005, "interception": 0.001}
+# 新测量值在校准结果中所占的权重
+CALIBRATION_WEIGHT = 0.3
+
+# 美式键盘布局下需要按住 Shift 的字符
+SHIFTED_CHARACTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ~!@#$%^&*()_+{}|:"<>?'
+_SHIFTED_BYTES = SHIFTED_CHARACTERS.encode("ascii")
+
+
+@dataclass(slots=True)
+class PayloadProfile:
+    """Character counts of everything a plan will type."""
+
+    characters: int = 0
+    shifted: int = 0
+    newlines: int = 0
+
+    def add(self, chunk: str) -> None:
+        data = chunk.encode("utf-8", "surrogatepass")
+        self.characters += len(chunk)
+        self.shifted += len(data) - len(data.translate(None, _SHIFTED_BYTES))
+        self.newlines += chunk.count("\n")
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[str]) -> "PayloadProfile":
+        profile = cls()
+        for chunk in chunks:
+            profile.add(chunk)
+        return profile
+
+
+@dataclass(slots=True, frozen=True)
+class Estimate:
+    encoding: str
+    backend: str
+    delay: float
+    characters: int
+    keystrokes: int
+    modifier_strokes: int
+    seconds: float
+
+    @property
+    def key_events(self) -> int:
+        """Key down plus key up events sent to the target."""
+
+        return 2 * (self.keystrokes + self.modifier_strokes)
+
+
+@dataclass(slots=True)
+class Calibration:
+    """Per-backend overhead per character, learned from finished runs."""
+
+    overheads: Dict[str, float] = field(default_factory=dict)
+    path: Optional[Path] = None
+
+    @classmethod
+    def load(cls, path: Path) -> "Calibration":
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+            overheads = {
+                str(name): float(value)
+                for name, value in data.get("overheads", {}).items()
+                if float(value) >= 0
+            }
+        except (OSError, ValueError, TypeError, AttributeError):
+            return cls(path=path)
+        return cls(overheads=overheads, path=path)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps({"overheads": self.overheads}), encoding="utf-8")
+        except OSError:  # pragma: no cover - calibration is best effort
+            pass
+
+    def overhead(self, backend: str) -> float:
+        return self.overheads.get(backend, DEFAULT_OVERHEAD.get(backend, 0.0))
+
+    def record(self, backend: str, profile: PayloadProfile, delay: float, elapsed: float) -> None:
+        """Fold the measured overhead of a completed run into the calibration."""
+
+        if profile.characters <= 0 or elapsed <= 0:
+            return
+        modelled = _sleep_time(backend, profile, delay)
+        measured = max(0.0, (elapsed - modelled) / profile.characters)
+        previous = self.overheads.get(backend)
+        if previous is None:
+            self.overheads[backend] = measured
+        else:
+            self.overheads[backend] = previous + CALIBRATION_WEIGHT * (measured - previous)
+        self.save()
+
+
+def _modifier_strokes(backend: str, profile: PayloadProfile) -> int:
+    return profile.shifted if backend == "interception" else 0
+
+
+def _sleep_time(backend: str, profile: PayloadProfile, delay: float) -> float:
+    """Seconds spent in deliberate waits for ``profile`` on ``backend``."""
+
+    pacing = profile.characters * delay
+    if backend == "interception":
+        return pacing + (profile.characters + profile.shifted) * delay
+    return pacing
+
+
+def estimate_profile(
+    profile: PayloadProfile,
+    backend: str,
+    delay: float,
+    *,
+    encoding: str = "",
+    calibration: Optional[Calibration] = None,
+) -> Estimate:
+    calibration = calibration or Calibration()
+    seconds = _sleep_time(backend, profile, delay) + profile.characters * calibration.overhead(
+        backend
+    )
+    return Estimate(
+        encoding=encoding,
+        backend=backend,
+        delay=delay,
+        characters=profile.characters,
+        keystrokes=profile.characters,
+        modifier_strokes=_modifier_strokes(backend, profile),
+        seconds=seconds,
+    )
+
+
+def profile_config(config: cfg.Config) -> PayloadProfile:
+    """Count what ``config`` will type, streaming large payloads."""
+
+    if isinstance(config, cfg.TextConfig) and config.text_file is not None:
+        if str(config.text_file) == STDIN:
+            raise ValueError("无法预估标准输入的内容")
+    from .tasks import build_plan
+
+    plan = build_plan(config)
+    profile = PayloadProfile()
+    for task in plan.tasks:
+        if isinstance(task.payload, TextStream):
+            try:
+                for chunk in task.payload.chunks():
+                    profile.add(chunk)
+            finally:
+                task.payload.close()
+        else:
+            profile.add(task.payload)
+    return profile
+
+
+def _encoding_label(config: cfg.Config) -> str:
+    if isinstance(config, cfg.TextConfig):
+        return "文本"
+    system = "Linux" if config.target_os == "linux" else "Windows"
+    if config.fec_enabled:
+        return f"{system} FEC {config.fec_group_size}+{config.fec_parity}"
+    return system
+
+
+def encoding_variants(config: cfg.Config) -> List[cfg.Config]:
+    """The configured encoding plus its alternative for file transfers.
+
+    A plain transfer is compared with an FEC 8+1 transfer and vice versa.
+    """
+
+    if not isinstance(config, cfg.FileConfig):
+        return [config]
+    if config.fec_enabled:
+        return [config, replace(config, fec_group_size=0)]
+    return [config, replace(config, fec_group_size=8, fec_parity=1)]
+
+
+def estimate_config(
+    config: cfg.Config,
+    *,
+    backends: Sequence[str] = BACKENDS,
+    delays: Optional[Sequence[float]] = None,
+    variants: Optional[Sequence[cfg.Config]] = None,
+    calibration: Optional[Calibration] = None,
+) -> List[Estimate]:
+    """Estimate every backend, encoding and delay combination.
+
+    ``variants`` defaults to ``[config]`` and ``delays`` to the configured
+    delay.
+    """
+
+    delays = list(delays) if delays else [config.delay_between_keystrokes]
+    variants = list(variants) if variants else [config]
+
+    estimates: List[Estimate] = []
+    for variant in variants:
+        profile = profile_config(variant)
+        label = _encoding_label(variant)
+        for backend in backends:
+            for delay in delays:
+                estimates.append(
+                    estimate_profile(
+                        profile, backend, delay, encoding=label, calibration=calibration
+                    )
+                )
+    return estimates
+
+
+def record_run(
+    calibration: Calibration, config: cfg.Config, backend: str, stats: "RunStats"
+) -> None:
+    """Calibrate ``backend`` from a completed run of ``config``.
+
+    Uses the profile the simulator collected while typing; the plan is
+    never rebuilt after the run.
+    """
+
+    if stats.status != "completed" or stats.profile.characters == 0:
+        return
+    calibration.record(backend, stats.profile, config.delay_between_keystrokes, stats.elapsed)
+    logger.info(
+        "已更新 %s 的耗时校准: 每字符额外 %.6f 秒 (%s)",
+        backend,
+        calibration.overhead(backend),
+        calibration.path or "未保存",
+    )
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours} 时 {minutes:02d} 分 {seconds:02d} 秒"
+    if minutes:
+        return f"{minutes} 分 {seconds:02d} 秒"
+    return f"{seconds} 秒"
+
+
+def format_estimates(estimates: Sequence[Estimate]) -> str:
+    """Render estimates as a plain-text table."""
+
+    lines = [
+        f"{'编码':<18}{'后端':<14}{'间隔(秒)':>10}{'按键':>14}{'修饰键':>12}{'预计耗时':>18}"
+    ]
+    for item in estimates:
+        lines.append(
+            f"{item.encoding:<18}{item.backend:<14}{item.delay:>10.3f}{item.keystrokes:>14,}"
+            f"{item.modifier_strokes:>12,}{format_duration(item.seconds):>18}"
+        )
+    return "\n".join(lines)
+
+
+__all__ = [
+    "BACKENDS",
+    "DEFAULT_CALIBRATION",
+    "PayloadProfile",
+    "Estimate",
+    "Calibration",
+    "estimate_profile",
+    "profile_config",
+    "encoding_variants",
+    "estimate_config",
+    "record_run",
+    "format_duration",
+    "format_estimates",
+]
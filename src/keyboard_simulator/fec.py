@@ -0,0 +1,250 @@
+"""Forward error correction for lossy console file transfers.
+
+The payload is split into fixed-size blocks. Each block is typed as one
+line holding its index, a CRC-16 of the line and the Base64 encoded block.
+Every group of ``group_size`` data lines is followed by ``parity`` XOR
+parity lines; parity line ``p`` covers the data lines whose position in the
+group is congruent to ``p`` modulo ``parity`` (interleaving), so up to
+``parity`` damaged lines per group can be rebuilt as long as they fall into
+different residue classes. A dropped or corrupted character only damages
+the line it belongs to, which the target-side decoder detects by length and
+checksum and repairs without any retransmission.
+
+On Windows the script is typed into ``cmd`` like every other transfer: the
+lines are written with ``echo`` and the PowerShell decoder arrives Base64
+encoded through ``certutil``, so none of its characters need escaping.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from .encoding import windows_reconstruction_script
+
+HEREDOC_MARKER = "FEC_EOF"
+
+_PYTHON_DECODER = """\
+import base64,binascii,sys
+K,R,B,N,S,W={params}
+got={{}}
+for t in open(sys.argv[1],encoding='ascii',errors='replace'):
+    t=t.strip()
+    try:
+        i=int(t[:W],16);c=int(t[W:W+4],16);d=t[W+4:]
+        if binascii.crc_hqx((t[:W]+d).encode(),0)==c:got[i]=base64.b64decode(d,validate=True)
+    except Exception:pass
+out=[]
+for g in range(0,N,K):
+    n=min(K,N-g);o=g//K*(K+R);blk=[got.get(o+j) for j in range(n)]
+    for p in range(R):
+        miss=[j for j in range(p,n,R) if blk[j] is None]
+        if len(miss)==1 and o+n+p in got:
+            x=bytearray(got[o+n+p].ljust(B,b'\\0'))
+            for j in range(p,n,R):
+                if j!=miss[0]:
+                    for q,v in enumerate(blk[j]):x[q]^=v
+            blk[miss[0]]=bytes(x)
+    if None in blk:sys.exit('FEC: group %d unrecoverable'%(g//K))
+    out+=blk
+open(sys.argv[2],'wb').write(b''.join(out)[:S])
+"""
+
+# PowerShell 变量名不区分大小写：循环变量不能与 $K,$R,$B,$N,$S,$W 同名
+_POWERSHELL_DECODER = """\
+param($src,$dst)
+$K,$R,$B,$N,$S,$W={params}
+function Crc([byte[]]$a){{
+$c=0
+foreach($x in $a){{
+$c=$c -bxor ($x -shl 8)
+for($i=0;$i -lt 8;$i++){{
+if($c -band 0x8000){{$c=(($c -shl 1) -bxor 0x1021) -band 0xFFFF}}else{{$c=($c -shl 1) -band 0xFFFF}}
+}}
+}}
+$c
+}}
+$got=@{{}}
+foreach($t in Get-Content $src){{
+$t=$t.Trim()
+try{{
+$i=[Convert]::ToInt32($t.Substring(0,$W),16)
+$c=[Convert]::ToInt32($t.Substring($W,4),16)
+$d=$t.Substring($W+4)
+if((Crc ([Text.Encoding]::ASCII.GetBytes($t.Substring(0,$W)+$d))) -eq $c){{
+$got[$i]=[Convert]::FromBase64String($d)
+}}
+}}catch{{}}
+}}
+$ms=New-Object IO.MemoryStream
+for($g=0;$g -lt $N;$g+=$K){{
+$cnt=[Math]::Min($K,$N-$g);$o=[int]($g/$K)*($K+$R);$blk=New-Object object[] $cnt
+for($j=0;$j -lt $cnt;$j++){{$blk[$j]=$got[$o+$j]}}
+for($p=0;$p -lt $R;$p++){{
+$miss=@(for($j=$p;$j -lt $cnt;$j+=$R){{if($null -eq $blk[$j]){{$j}}}})
+if($miss.Count -eq 1 -and $got.ContainsKey($o+$cnt+$p)){{
+$x=New-Object byte[] $B;$y=$got[$o+$cnt+$p];[Array]::Copy($y,$x,$y.Length)
+for($j=$p;$j -lt $cnt;$j+=$R){{
+if($j -ne $miss[0]){{
+$v=$blk[$j]
+for($q=0;$q -lt $v.Length;$q++){{$x[$q]=$x[$q] -bxor $v[$q]}}
+}}
+}}
+$blk[$miss[0]]=$x
+}}
+}}
+for($j=0;$j -lt $cnt;$j++){{
+if($null -eq $blk[$j]){{throw "FEC: group $($g/$K) unrecoverable"}}
+$ms.Write($blk[$j],0,$blk[$j].Length)
+}}
+}}
+$ms.SetLength($S)
+$out=$ExecutionContext.SessionState.Path.GetUnresolvedProviderPathFromPSPath($dst)
+[IO.File]::WriteAllBytes($out,$ms.ToArray())
+"""
+
+
+@dataclass(slots=True, frozen=True)
+class FecParams:
+    """Redundancy level of an FEC protected transfer."""
+
+    group_size: int = 8
+    parity: int = 1
+    block_size: int = 57
+
+    def __post_init__(self) -> None:
+        if self.group_size <= 0:
+            raise ValueError("group_size must be positive")
+        if not 1 <= self.parity <= self.group_size:
+            raise ValueError("parity must be between 1 and group_size")
+        if self.block_size <= 0:
+            raise ValueError("block_size must be positive")
+
+    @property
+    def redundancy(self) -> float:
+        """Fraction of extra lines relative to the data lines."""
+
+        return self.parity / self.group_size
+
+
+def _xor_into(target: bytearray, block: bytes) -> None:
+    for index, value in enumerate(block):
+        target[index] ^= value
+
+
+def _layout(data_length: int, params: FecParams) -> Tuple[int, int]:
+    """Return the number of data blocks and the hex width of line indices."""
+
+    blocks = (data_length + params.block_size - 1) // params.block_size
+    groups = (blocks + params.group_size - 1) // params.group_size
+    total_lines = blocks + groups * params.parity
+    return blocks, max(1, len(f"{total_lines - 1:x}"))
+
+
+def fec_lines(data: bytes, params: FecParams) -> List[str]:
+    """Encode ``data`` into indexed, checksummed data and parity lines."""
+
+    if not data:
+        raise ValueError("data is empty")
+    size = params.block_size
+    blocks = [data[i : i + size] for i in range(0, len(data), size)]
+    _, width = _layout(len(data), params)
+
+    def line(index: int, block: bytes) -> str:
+        head = f"{index:0{width}x}"
+        body = base64.b64encode(block).decode("ascii")
+        crc = binascii.crc_hqx((head + body).encode("ascii"), 0)
+        return f"{head}{crc:04x}{body}"
+
+    lines: List[str] = []
+    for start in range(0, len(blocks), params.group_size):
+        group = blocks[start : start + params.group_size]
+        for block in group:
+            lines.append(line(len(lines), block))
+        for residue in range(params.parity):
+            parity = bytearray(size)
+            for block in group[residue :: params.parity]:
+                _xor_into(parity, block)
+            lines.append(line(len(lines), bytes(parity)))
+    return lines
+
+
+def _decoder_params(data_length: int, params: FecParams) -> str:
+    blocks, width = _layout(data_length, params)
+    return ",".join(
+        str(value)
+        for value in (
+            params.group_size,
+            params.parity,
+            params.block_size,
+            blocks,
+            data_length,
+            width,
+        )
+    )
+
+
+def python_decoder(data_length: int, params: FecParams) -> str:
+    """Source of the python3 decoder stub for a payload of ``data_length`` bytes."""
+
+    return _PYTHON_DECODER.format(params=_decoder_params(data_length, params))
+
+
+def powershell_decoder(data_length: int, params: FecParams) -> str:
+    """Source of the PowerShell decoder stub for a payload of ``data_length`` bytes."""
+
+    return _POWERSHELL_DECODER.format(params=_decoder_params(data_length, params))
+
+
+def linux_fec_script(data: bytes, output_filename: str, params: FecParams) -> str:
+    """Bash script that stores the FEC lines and decodes them with python3."""
+
+    lines = fec_lines(data, params)
+    fec_file = f"{output_filename}.fec"
+    decoder_file = f"{output_filename}.fecdec.py"
+    script: List[str] = [f"cat > {fec_file} <<'{HEREDOC_MARKER}'"]
+    script.extend(lines)
+    script.append(HEREDOC_MARKER)
+    script.append(f"cat > {decoder_file} <<'{HEREDOC_MARKER}'")
+    script.extend(python_decoder(len(data), params).splitlines())
+    script.append(HEREDOC_MARKER)
+    script.append(
+        f"python3 {decoder_file} {fec_file} {output_filename} && rm {fec_file} {decoder_file}"
+    )
+    return "\n".join(script) + "\n"
+
+
+def windows_fec_script(data: bytes, output_filename: str, params: FecParams) -> str:
+    """cmd script that stores the FEC lines and decodes them with PowerShell."""
+
+    lines = fec_lines(data, params)
+    fec_file = f"{output_filename}.fec"
+    decoder_file = f"{output_filename}.fecdec.ps1"
+    script: List[str] = [
+        f"echo {line}{'>' if index == 0 else '>>'}{fec_file}" for index, line in enumerate(lines)
+    ]
+    decoder = powershell_decoder(len(data), params).encode("ascii")
+    # certutil 不覆盖已存在的文件
+    script.append(f"if exist {decoder_file} del {decoder_file}")
+    script.extend(
+        windows_reconstruction_script(
+            base64.b64encode(decoder).decode("ascii"), decoder_file
+        ).splitlines()
+    )
+    script.append(
+        f"powershell -NoProfile -ExecutionPolicy Bypass -File {decoder_file} "
+        f"{fec_file} {output_filename} && del {fec_file} {decoder_file}"
+    )
+    return "\n".join(script) + "\n"
+
+
+__all__ = [
+    "FecParams",
+    "fec_lines",
+    "python_decoder",
+    "powershell_decoder",
+    "linux_fec_script",
+    "windows_fec_script",
+]
@@ -0,0 +1,303 @@
+"""Echo feedback channels and adaptive pacing for closed-loop typing."""
+
+from __future__ import annotations
+
+import abc
+import codecs
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from .clock import SYSTEM_CLOCK, Clock
+
+try:  # pragma: no cover - POSIX only
+    import select
+except ModuleNotFoundError:  # pragma: no cover
+    select = None  # type: ignore[assignment]
+
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]|\x1b[()][A-Za-z0-9]|\x1b[=>]")
+
+
+class FeedbackChannel(abc.ABC):
+    """Source of text echoed back by the target machine."""
+
+    def __enter__(self) -> "FeedbackChannel":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
+
+    @abc.abstractmethod
+    def read(self) -> str:
+        """Return newly echoed text without blocking (empty if none)."""
+
+    def close(self) -> None:  # noqa: B027 - optional for channels without resources
+        """Release the underlying resource."""
+
+
+class FileFeedbackChannel(FeedbackChannel):
+    """Tail a console log, serial capture or any file the target writes to."""
+
+    def __init__(self, path: Path, *, from_start: bool = False, encoding: str = "utf-8"):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        if not from_start:
+            self._file.seek(0, os.SEEK_END)
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    def read(self) -> str:
+        data = self._file.read()
+        return self._decoder.decode(data) if data else ""
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class FdFeedbackChannel(FeedbackChannel):
+    """Read echoes from a pty master or serial device descriptor (POSIX)."""
+
+    def __init__(self, fd: int, *, owns_fd: bool = False, encoding: str = "utf-8"):
+        if select is None:  # pragma: no cover - Windows
+            raise OSError("当前平台不支持基于文件描述符的回显通道")
+        self.fd = fd
+        self._owns_fd = owns_fd
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    def read(self) -> str:
+        parts: List[str] = []
+        while True:
+            ready, _, _ = select.select([self.fd], [], [], 0)
+            if not ready:
+                break
+            try:
+                data = os.read(self.fd, 4096)
+            except OSError:  # the other side of a pty was closed
+                break
+            if not data:
+                break
+            parts.append(self._decoder.decode(data))
+        return "".join(parts)
+
+    def close(self) -> None:
+        if self._owns_fd:
+            os.close(self.fd)
+
+
+class EchoTracker:
+    """Reconstruct the current terminal line from a raw echo stream.
+
+    The model is a minimal terminal: printable characters overwrite the cell
+    under the cursor, ``\\b`` moves left, ``\\r`` returns to column zero and
+    ``\\n`` commits the line. ANSI escape sequences are dropped, except for
+    "erase to end of line" which truncates the buffer at the cursor.
+    :attr:`lines` counts the committed lines.
+    """
+
+    def __init__(self) -> None:
+        self.lines = 0
+        self._line: List[str] = []
+        self._col = 0
+        self._pending = ""
+
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        text = self._pending + text
+        self._pending = ""
+        # Keep an unterminated escape sequence for the next chunk.
+        tail = text.rfind("\x1b")
+        if tail != -1 and not _ANSI_ESCAPE.match(text, tail) and len(text) - tail < 16:
+            text, self._pending = text[:tail], text[tail:]
+
+        pos = 0
+        for match in _ANSI_ESCAPE.finditer(text):
+            self._feed_plain(text[pos : match.start()])
+            if match.group().endswith("K"):
+                del self._line[self._col :]
+            pos = match.end()
+        self._feed_plain(text[pos:])
+
+    def _feed_plain(self, text: str) -> None:
+        line = self._line
+        for char in text:
+            if char == "\n":
+                line.clear()
+                self._col = 0
+                self.lines += 1
+            elif char == "\r":
+                self._col = 0
+            elif char == "\b":
+                if self._col > 0:
+                    self._col -= 1
+            elif char >= " " and char != "\x7f":
+                if self._col < len(line):
+                    line[self._col] = char
+                else:
+                    line.append(char)
+                self._col += 1
+
+    @property
+    def text(self) -> str:
+        """Visible content of the current line up to the cursor.
+
+        Cells right of the cursor are kept without the trailing blanks that an
+        erase sequence (``\\b \\b``) leaves behind.
+        """
+
+        head = "".join(self._line[: self._col])
+        return head + "".join(self._line[self._col :]).rstrip(" ")
+
+
+@dataclass(slots=True)
+class AIMDRateController:
+    """Additive-increase / multiplicative-decrease control of the key delay.
+
+    Every verified line shortens the delay by ``additive_step`` (the typing
+    rate goes up linearly); every mismatch multiplies it by
+    ``backoff_factor``. The delay is always clamped to
+    ``[min_delay, max_delay]``.
+    """
+
+    delay: float
+    min_delay: float = 0.0
+    max_delay: float = 0.5
+    additive_step: float = 0.001
+    backoff_factor: float = 2.0
+    backoff_floor: float = 0.005
+    mismatches: int = field(default=0, init=False)
+    successes: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        if self.min_delay < 0 or self.max_delay < self.min_delay:
+            raise ValueError("延迟上下限无效")
+        if self.backoff_factor <= 1:
+            raise ValueError("backoff_factor 必须大于 1")
+        self.delay = min(max(self.delay, self.min_delay), self.max_delay)
+
+    def on_success(self) -> None:
+        self.successes += 1
+        self.delay = max(self.min_delay, self.delay - self.additive_step)
+
+    def on_mismatch(self) -> None:
+        self.mismatches += 1
+        # A zero delay would never grow multiplicatively, so back off from a floor.
+        backed_off = max(self.delay, self.backoff_floor) * self.backoff_factor
+        self.delay = min(self.max_delay, backed_off)
+
+
+class EchoVerifier:
+    """Compare echoed text against what was typed on the current line.
+
+    Timeouts are measured and polls are slept on :attr:`clock`, which the
+    simulator replaces with its own clock while a plan runs.
+    """
+
+    def __init__(
+        self,
+        channel: FeedbackChannel,
+        *,
+        echo_timeout: float = 2.0,
+        settle_time: float = 0.05,
+        stall_timeout: float = 0.5,
+        poll_interval: float = 0.005,
+        max_retries: int = 5,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
+        self.channel = channel
+        self.clock = clock
+        self.tracker = EchoTracker()
+        self.echo_timeout = echo_timeout
+        self.settle_time = settle_time
+        self.stall_timeout = stall_timeout
+        self.poll_interval = poll_interval
+        self.max_retries = max_retries
+
+    def snapshot(self) -> str:
+        """Drain pending echoes and return the current line."""
+
+        self.tracker.feed(self.channel.read())
+        return self.tracker.text
+
+    def committed_lines(self) -> int:
+        """Drain pending echoes and return the number of committed lines."""
+
+        self.snapshot()
+        return self.tracker.lines
+
+    def observed(self, baseline: str) -> str:
+        current = self.snapshot()
+        if current.startswith(baseline):
+            return current[len(baseline) :]
+        return current
+
+    def wait_for(self, baseline: str, expected: str, *, timeout: Optional[float] = None) -> str:
+        """Wait until the line shows ``expected`` or the echo stops changing.
+
+        Returns what was observed after ``baseline``. A result different
+        from ``expected`` means keystrokes were dropped, duplicated or
+        corrupted on the way to the target.
+        """
+
+        clock = self.clock
+        deadline = clock.now() + (self.echo_timeout if timeout is None else timeout)
+        last = self.observed(baseline)
+        last_change = clock.now()
+        while True:
+            if last == expected:
+                return last
+            now = clock.now()
+            if now >= deadline:
+                return last
+            quiet = now - last_change
+            if len(last) >= len(expected) and quiet >= self.settle_time:
+                return last
+            if quiet >= self.stall_timeout:
+                return last
+            clock.sleep(self.poll_interval)
+            current = self.observed(baseline)
+            if current != last:
+                last = current
+                last_change = clock.now()
+
+    def wait_for_commit(self, committed: int, *, timeout: Optional[float] = None) -> str:
+        """Wait until a newline after ``committed`` lines is echoed and the output settles.
+
+        After the newline a console typically prints a prompt, so the line is
+        only read once nothing changed for ``settle_time``. Returns that line,
+        the baseline for the next line typed. Gives up after ``stall_timeout``
+        without a newline, or after ``echo_timeout``.
+        """
+
+        clock = self.clock
+        deadline = clock.now() + (self.echo_timeout if timeout is None else timeout)
+        last = (self.tracker.lines, self.snapshot())
+        last_change = clock.now()
+        while True:
+            now = clock.now()
+            if now >= deadline:
+                return last[1]
+            quiet = now - last_change
+            if last[0] > committed:
+                if quiet >= self.settle_time:
+                    return last[1]
+            elif quiet >= self.stall_timeout:
+                return last[1]
+            clock.sleep(self.poll_interval)
+            text = self.snapshot()
+            current = (self.tracker.lines, text)
+            if current != last:
+                last = current
+                last_change = clock.now()
+
+
+__all__ = [
+    "FeedbackChannel",
+    "FileFeedbackChannel",
+    "FdFeedbackChannel",
+    "EchoTracker",
+    "AIMDRateController",
+    "EchoVerifier",
+]
@@ -0,0 +1,128 @@
+"""Local record of the file versions sent to each named target.
+
+For every ``(target, target_os, output_filename)`` the last version that
+was typed completely is kept as a copy, so the next transfer of the same
+output can be sent as a delta against it. Files are replaced atomically;
+the record is only written after a run finished, never for stopped runs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_DIR = Path.home() / ".keyboard_simulator" / "history"
+
+
+@dataclass(slots=True, frozen=True)
+class SentVersion:
+    """A file version the target is known to hold."""
+
+    target: str
+    target_os: str
+    output_filename: str
+    sha256: str
+    size: int
+    sent_at: float
+    path: Path
+
+    def read(self) -> Optional[bytes]:
+        """Content of the version, or ``None`` if the copy is gone or damaged."""
+
+        try:
+            data = self.path.read_bytes()
+        except OSError:
+            return None
+        if hashlib.sha256(data).hexdigest() != self.sha256:
+            logger.warning("历史版本已损坏，忽略: %s", self.path)
+            return None
+        return data
+
+
+class TransferHistory:
+    """Directory of the last version sent per target and output filename."""
+
+    def __init__(self, directory: Path = DEFAULT_HISTORY_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _key(self, target: str, target_os: str, output_filename: str) -> str:
+        material = json.dumps([target, target_os, output_filename], ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def last_sent(self, target: str, target_os: str, output_filename: str) -> Optional[SentVersion]:
+        key = self._key(target, target_os, output_filename)
+        try:
+            record = json.loads((self.directory / f"{key}.json").read_text(encoding="utf-8"))
+            return SentVersion(
+                target=target,
+                target_os=target_os,
+                output_filename=output_filename,
+                sha256=str(record["sha256"]),
+                size=int(record["size"]),
+                sent_at=float(record["sent_at"]),
+                path=self.directory / f"{key}.bin",
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning("无法读取发送历史: %s", exc)
+            return None
+
+    def record(self, target: str, target_os: str, output_filename: str, data: bytes) -> SentVersion:
+        """Remember ``data`` as the version the target now holds."""
+
+        key = self._key(target, target_os, output_filename)
+        version = SentVersion(
+            target=target,
+            target_os=target_os,
+            output_filename=output_filename,
+            sha256=hashlib.sha256(data).hexdigest(),
+            size=len(data),
+            sent_at=time.time(),
+            path=self.directory / f"{key}.bin",
+        )
+        record = {
+            "target": target,
+            "target_os": target_os,
+            "output_filename": output_filename,
+            "sha256": version.sha256,
+            "size": version.size,
+            "sent_at": version.sent_at,
+        }
+        # 先写内容再写记录，记录总是指向完整的内容
+        self._write_atomic(version.path, data)
+        self._write_atomic(
+            self.directory / f"{key}.json",
+            json.dumps(record, ensure_ascii=False, indent=2).encode("utf-8"),
+        )
+        logger.info("已记录发送到 %s 的 %s (%d 字节)", target, output_filename, len(data))
+        return version
+
+    def forget(self, target: str, target_os: str, output_filename: str) -> None:
+        """Drop the record so the next transfer is sent in full."""
+
+        key = self._key(target, target_os, output_filename)
+        for suffix in (".json", ".bin"):
+            (self.directory / f"{key}{suffix}").unlink(missing_ok=True)
+
+    def _write_atomic(self, path: Path, content: bytes) -> None:
+        temporary = path.with_name(f"{path.name}.{os.getpid()}-{uuid.uuid4().hex}.tmp")
+        try:
+            temporary.write_bytes(content)
+            os.replace(temporary, path)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+
+
+__all__ = ["DEFAULT_HISTORY_DIR", "SentVersion", "TransferHistory"]
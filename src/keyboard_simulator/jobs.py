@@ -0,0 +1,245 @@
+"""Batch execution of several typing jobs in one backend session."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from . import config as cfg
+from .config import ConfigError
+from .simulator import KeyboardSimulator, RunStats
+from .tasks import SimulationPlan, build_plan
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache import PayloadCache
+    from .history import TransferHistory
+
+
+@dataclass(slots=True)
+class Job:
+    name: str
+    config: cfg.Config
+
+
+@dataclass(slots=True)
+class JobResult:
+    name: str
+    status: str
+    description: str = ""
+    characters: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    # 稀疏编码比普通脚本少输入的字符数
+    saved_characters: int = 0
+
+    @property
+    def characters_per_second(self) -> float:
+        return self.characters / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass(slots=True)
+class BatchReport:
+    results: List[JobResult]
+    elapsed: float = 0.0
+
+    @property
+    def total_characters(self) -> int:
+        return sum(result.characters for result in self.results)
+
+    @property
+    def succeeded(self) -> bool:
+        return all(result.status == "completed" for result in self.results)
+
+    def to_dict(self) -> Dict[str, Any]:
+        jobs = []
+        for result in self.results:
+            entry = asdict(result)
+            entry["characters_per_second"] = round(result.characters_per_second, 2)
+            jobs.append(entry)
+        return {
+            "elapsed": round(self.elapsed, 3),
+            "total_characters": self.total_characters,
+            "jobs": jobs,
+        }
+
+    def format(self) -> str:
+        """Render a plain-text summary table."""
+
+        lines = [f"{'任务':<24}{'状态':<12}{'字符数':>10}{'耗时(秒)':>12}{'字符/秒':>12}"]
+        for result in self.results:
+            lines.append(
+                f"{result.name[:22]:<24}{result.status:<12}{result.characters:>10}"
+                f"{result.elapsed:>12.2f}{result.characters_per_second:>12.1f}"
+            )
+            if result.saved_characters:
+                lines.append(f"    稀疏编码节省: {result.saved_characters} 次按键")
+            if result.error:
+                lines.append(f"    错误: {result.error}")
+        lines.append(f"合计: {self.total_characters} 个字符，用时 {self.elapsed:.2f} 秒")
+        return "\n".join(lines)
+
+
+def parse_manifest(data: Any, *, base_path: Optional[Path] = None) -> List[Job]:
+    """Parse a jobs manifest.
+
+    The manifest is either a list of job objects or an object with a
+    ``jobs`` list and optional ``defaults`` merged into every job. Each job
+    uses the same keys as a single config file plus an optional ``name``.
+    """
+
+    defaults: Dict[str, Any] = {}
+    if isinstance(data, dict):
+        defaults = data.get("defaults", {})
+        if not isinstance(defaults, dict):
+            raise ConfigError("'defaults' 必须是对象")
+        data = data.get("jobs")
+    if not isinstance(data, list) or not data:
+        raise ConfigError("任务清单必须包含非空的 'jobs' 列表")
+
+    jobs: List[Job] = []
+    for index, entry in enumerate(data, start=1):
+        if not isinstance(entry, dict):
+            raise ConfigError(f"第 {index} 个任务必须是对象")
+        merged = {**defaults, **entry}
+        name = str(merged.pop("name", f"job-{index}"))
+        try:
+            config = cfg.from_dict(merged, base_path=base_path)
+        except ConfigError as exc:
+            raise ConfigError(f"任务 '{name}': {exc}") from exc
+        jobs.append(Job(name=name, config=config))
+    return jobs
+
+
+def load_manifest(path: Path) -> List[Job]:
+    """Load a jobs manifest from a JSON file."""
+
+    try:
+        content = path.read_text(encoding="utf-8")
+    except FileNotFoundError as exc:
+        raise ConfigError(f"未找到任务清单: {path}") from exc
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as exc:
+        raise ConfigError(f"解析 JSON 失败: {exc}") from exc
+    return parse_manifest(data, base_path=path.parent)
+
+
+class JobRunner:
+    """Run jobs back to back inside a single backend session.
+
+    Plans for upcoming jobs are built on a worker thread while the current
+    job is typing, at most ``lookahead`` jobs ahead. :meth:`stop` ends the
+    current job and skips the rest, also when it arrives between two jobs.
+    ``on_finished`` is called with every job that was typed and its stats.
+    """
+
+    def __init__(
+        self,
+        simulator: KeyboardSimulator,
+        *,
+        lookahead: int = 1,
+        cache: Optional["PayloadCache"] = None,
+        history: Optional["TransferHistory"] = None,
+        on_finished: Optional[Callable[[Job, RunStats], None]] = None,
+    ):
+        if lookahead < 1:
+            raise ValueError("lookahead must be at least 1")
+        self.simulator = simulator
+        self.lookahead = lookahead
+        self.cache = cache
+        self.history = history
+        self.on_finished = on_finished
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.simulator.stop()
+
+    def run(self, jobs: List[Job]) -> BatchReport:
+        started = time.perf_counter()
+        results: List[JobResult] = []
+        self._stopped.clear()
+        self.simulator.stop_event.clear()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="plan-builder") as pool:
+            pending: Dict[int, Future[SimulationPlan]] = {}
+
+            def schedule(upto: int) -> None:
+                for index in range(len(pending) + len(results), min(upto, len(jobs))):
+                    pending[index] = pool.submit(
+                        build_plan,
+                        jobs[index].config,
+                        cancel_event=self._stopped,
+                        cache=self.cache,
+                        history=self.history,
+                    )
+
+            with self.simulator.backend:
+                for index, job in enumerate(jobs):
+                    schedule(index + 1 + self.lookahead)
+                    future = pending.pop(index)
+                    # run_plan 开始时会清除模拟器的停止事件，任务之间的停止请求记在运行器上
+                    if self._stopped.is_set() or self.simulator.stop_event.is_set():
+                        self._stopped.set()
+                        _discard(future)
+                        results.append(JobResult(name=job.name, status="skipped"))
+                        continue
+                    try:
+                        plan = future.result()
+                    except Exception as exc:
+                        # 单个任务的构建失败只记录在报告中，不中断整批任务
+                        results.append(JobResult(name=job.name, status="failed", error=str(exc)))
+                        continue
+                    results.append(self._type(job, plan))
+
+        return BatchReport(results=results, elapsed=time.perf_counter() - started)
+
+    def _type(self, job: Job, plan: SimulationPlan) -> JobResult:
+        description = "; ".join(task.description for task in plan.tasks)
+        try:
+            stats = self.simulator.run_plan(plan)
+        except Exception as exc:
+            # Typing failed half way; the session can no longer be trusted.
+            self._stopped.set()
+            return JobResult(
+                name=job.name, status="failed", description=description, error=str(exc)
+            )
+        if self.on_finished is not None:
+            self.on_finished(job, stats)
+        return JobResult(
+            name=job.name,
+            status=stats.status,
+            description=description,
+            characters=stats.characters,
+            elapsed=stats.elapsed,
+            saved_characters=sum(
+                task.sparse.saved_characters for task in plan.tasks if task.sparse is not None
+            ),
+        )
+
+
+def _discard(future: "Future[SimulationPlan]") -> None:
+    """Cancel a plan build, closing the streams of a plan that was already built."""
+
+    if future.cancel():
+        return
+    try:
+        plan = future.result()
+    except Exception:
+        return
+    for stream in plan.streams:
+        stream.close()
+
+
+__all__ = [
+    "Job",
+    "JobResult",
+    "BatchReport",
+    "JobRunner",
+    "parse_manifest",
+    "load_manifest",
+]
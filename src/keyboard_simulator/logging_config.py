@@ -1,59 +1,241 @@
-"""Centralized logging configuration for the Keyboard Simulator project."""
+"""Centralized logging configuration for the Keyboard Simulator project.
 
+Loggers never write to the disk or the console themselves: the root logger
+only holds a :class:`QueueHandler` that puts records on a bounded queue,
+and a :class:`~logging.handlers.QueueListener` thread writes them to a
+size-limited rotating log file, the console and, optionally, a JSON Lines
+run log. A thread that logs therefore never waits for I/O; when the queue
+is full the record is dropped and counted instead.
+
+Modules on the typing hot path are gated at ``INFO`` (:data:`HOT_PATH_LEVELS`),
+so even with ``DEBUG`` logging a keystroke never builds a log record there;
+the check is a cached level comparison on the logger.
+"""
+
+from __future__ import annotations
+
+import atexit
+import datetime
+import json
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+LOG_FILE_NAME = "keyboard_simulator.log"
+DEFAULT_MAX_BYTES = 5 << 20
+DEFAULT_BACKUP_COUNT = 3
+# 队列满时丢弃日志而不是阻塞写日志的线程
+QUEUE_SIZE = 10_000
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# 输入循环所在模块的最低日志级别，优先于全局级别
+HOT_PATH_LEVELS: Dict[str, str] = {
+    "keyboard_simulator.simulator": "INFO",
+    "keyboard_simulator.backends": "INFO",
+    "keyboard_simulator.streaming": "INFO",
+}
+
+_STANDARD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+_gated: List[str] = []
+_atexit_registered = False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Enqueue records without ever blocking; count the ones that do not fit."""
+
+    def __init__(self, records: "queue.Queue[logging.LogRecord]"):
+        super().__init__(records)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只合并参数，格式化与异常堆栈留给监听线程
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
 
-def setup_logging(log_level: str = "INFO", log_dir: Path | str = "logs") -> None:
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # 队列可能已满；停止时等待监听线程腾出位置
+        self.queue.put(self._sentinel)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, including any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(
+    log_level: str = "INFO",
+    log_dir: Union[Path, str] = "logs",
+    *,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    backup_count: int = DEFAULT_BACKUP_COUNT,
+    run_log: Optional[Union[Path, str]] = None,
+    levels: Optional[Mapping[str, str]] = None,
+    console: bool = True,
+) -> QueueListener:
     """
-    Set up logging to both console and a file.
+    Set up logging to a rotating file, the console and an optional run log.
 
     Args:
         log_level: The minimum logging level to capture (e.g., "DEBUG", "INFO").
         log_dir: The directory where log files will be stored.
+        max_bytes: Size at which the log file is rotated.
+        backup_count: Number of rotated files to keep.
+        run_log: Optional JSON Lines file receiving every record with its extra fields.
+        levels: Per-logger levels, applied on top of :data:`HOT_PATH_LEVELS`.
+        console: Whether to also log to stdout.
     """
+    shutdown_logging()
+    level = logging.getLevelName(log_level.upper())
     log_dir = Path(log_dir)
-    log_dir.mkdir(exist_ok=True)
-    log_file = log_dir / "keyboard_simulator.log"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_file = log_dir / LOG_FILE_NAME
 
-    # Get the root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(log_level.upper())
+    formatter = logging.Formatter(FORMAT)
+    file_handler = RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+    )
+    file_handler.setLevel(logging.DEBUG)  # Capture all levels in the file
+    file_handler.setFormatter(formatter)
+    handlers: List[logging.Handler] = [file_handler]
+
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(level)
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
 
+    if run_log is not None:
+        run_log = Path(run_log)
+        run_log.parent.mkdir(parents=True, exist_ok=True)
+        json_handler = RotatingFileHandler(
+            run_log, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+        json_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(json_handler)
+
+    global _listener, _queue_handler, _atexit_registered
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(records)
+    _install(_queue_handler, level, levels)
+    _listener = _Listener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    if not _atexit_registered:
+        atexit.register(shutdown_logging)
+        _atexit_registered = True
+
+    logging.info("Logging configured: Level=%s, File=%s", log_level, log_file)
+    return _listener
+
+
+def forward_logging(records: Any, level: int) -> None:
+    """Send every record at ``level`` or above to ``records``, e.g. from a child process.
+
+    ``records`` is any queue with ``put_nowait``, typically a
+    :class:`multiprocessing.Queue` drained by the parent's handlers.
+    """
+
+    shutdown_logging()
+    _install(QueueHandler(records), level, None)
+
+
+def shutdown_logging() -> None:
+    """Stop the listener after it has written every queued record."""
+
+    global _listener, _queue_handler
+    listener, _listener = _listener, None
+    handler, _queue_handler = _queue_handler, None
+    if listener is None:
+        return
+    logging.getLogger().removeHandler(handler)
+    listener.stop()
+    if handler is not None and handler.dropped:
+        listener.handle(
+            logging.makeLogRecord(
+                {
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": f"日志队列已满，丢弃了 {handler.dropped} 条日志",
+                }
+            )
+        )
+    for target in listener.handlers:
+        target.close()
+
+
+def _install(handler: logging.Handler, level: int, levels: Optional[Mapping[str, str]]) -> None:
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
     # Clear existing handlers to avoid duplicate logs
-    if root_logger.hasHandlers():
-        root_logger.handlers.clear()
+    for existing in list(root_logger.handlers):
+        root_logger.removeHandler(existing)
+    root_logger.addHandler(handler)
 
-    # Create a formatter
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    _reset_gates()
+    gates = {
+        name: max(level, logging.getLevelName(gate.upper()))
+        for name, gate in HOT_PATH_LEVELS.items()
+    }
+    gates.update(
+        (name, logging.getLevelName(gate.upper())) for name, gate in (levels or {}).items()
     )
+    for name, gate in gates.items():
+        logging.getLogger(name).setLevel(gate)
+        _gated.append(name)
 
-    # Create a file handler
-    # Use 'a' for append mode. Use a rotating file handler for long-running apps.
-    file_handler = logging.FileHandler(log_file, mode="a", encoding="utf-8")
-    file_handler.setLevel(logging.DEBUG)  # Capture all levels in the file
-    file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
 
-    # Create a console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(log_level.upper())
-    console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+def _reset_gates() -> None:
+    for name in _gated:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    _gated.clear()
 
-    logging.info("Logging configured: Level=%s, File=%s", log_level, log_file)
 
 def disable_logging() -> None:
     """Disable all logging by removing handlers and adding a NullHandler."""
+    shutdown_logging()
+    _reset_gates()
     root_logger = logging.getLogger()
     if root_logger.hasHandlers():
         root_logger.handlers.clear()
     root_logger.addHandler(logging.NullHandler())
     root_logger.setLevel(logging.CRITICAL + 1)  # Effectively silence the root logger
 
-# Example of getting a logger for a specific module
-# In other files, you would just do:
-# import logging
-# logger = logging.getLogger(__name__)
-# logger.info("This is a test message.")
+
+__all__ = [
+    "DroppingQueueHandler",
+    "HOT_PATH_LEVELS",
+    "JsonLinesFormatter",
+    "disable_logging",
+    "forward_logging",
+    "setup_logging",
+    "shutdown_logging",
+]
@@ -0,0 +1,270 @@
+"""Low-overhead keystroke timing with JSON and Prometheus export.
+
+Timings are taken from the run's :class:`~keyboard_simulator.clock.Clock`
+(:func:`time.perf_counter_ns` by default) on every
+``sample_every``-th keystroke and aggregated into fixed-bucket histograms,
+so the cost per key is a counter increment plus, for sampled keys, a few
+clock reads and a bisect.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .clock import SYSTEM_CLOCK, Clock
+
+# 固定桶上界 (纳秒)：1 µs 到 10 s，按 1-2-5 递增
+BUCKET_BOUNDS_NS: Tuple[int, ...] = tuple(
+    mantissa * 10**exponent for exponent in range(3, 10) for mantissa in (1, 2, 5)
+) + (10**10,)
+
+METRIC_PREFIX = "keyboard_simulator"
+
+HISTOGRAM_HELP = {
+    "keystroke": "Duration of a backend type_character call.",
+    "send": "Duration of the raw injection call (SendInput, context.send).",
+    "overshoot": "Time a pacing wait took beyond the requested delay.",
+}
+
+
+class Histogram:
+    """Counts of nanosecond observations in fixed buckets."""
+
+    __slots__ = ("bounds", "counts", "count", "total_ns", "max_ns")
+
+    def __init__(self, bounds: Tuple[int, ...] = BUCKET_BOUNDS_NS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def observe(self, value_ns: int) -> None:
+        if value_ns < 0:
+            value_ns = 0
+        self.counts[bisect_left(self.bounds, value_ns)] += 1
+        self.count += 1
+        self.total_ns += value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def quantile(self, q: float) -> Optional[int]:
+        """Upper bound (ns) of the bucket holding the ``q`` quantile."""
+
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                if index == len(self.bounds):
+                    return self.max_ns
+                return min(self.bounds[index], self.max_ns)
+        return self.max_ns
+
+    def to_dict(self) -> Dict[str, Any]:
+        def seconds(value: Optional[int]) -> Optional[float]:
+            return None if value is None else value / 1e9
+
+        return {
+            "count": self.count,
+            "sum_seconds": self.total_ns / 1e9,
+            "max_seconds": self.max_ns / 1e9,
+            "p50_seconds": seconds(self.quantile(0.5)),
+            "p99_seconds": seconds(self.quantile(0.99)),
+            "buckets": [
+                [bound / 1e9, count] for bound, count in zip(self.bounds, self.counts)
+            ]
+            + [["+Inf", self.counts[-1]]],
+        }
+
+
+class KeystrokeMetrics:
+    """Latency histograms and counters for one or more runs.
+
+    The simulator counts every key of the plan in :attr:`keys`, keys typed
+    again or erased after an echo mismatch in :attr:`retyped`, and times
+    every ``sample_every``-th key;
+    while a sampled key is being sent :attr:`active` is true, which tells
+    backends to time their raw injection call as well. :attr:`clock` is
+    pointed at the simulator's clock while a run is in progress.
+    """
+
+    def __init__(self, *, sample_every: int = 1, clock: Clock = SYSTEM_CLOCK):
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1")
+        self.sample_every = sample_every
+        self.clock = clock
+        self.keystroke = Histogram()
+        self.send = Histogram()
+        self.overshoot = Histogram()
+        self.keys = 0
+        self.retyped = 0
+        self.pause_ns = 0
+        self.busy_ns = 0
+        self.active = False
+        self._tick = 0
+        self._run_started: Optional[int] = None
+
+    def should_sample(self) -> bool:
+        self._tick += 1
+        if self._tick >= self.sample_every:
+            self._tick = 0
+            return True
+        return False
+
+    def begin(self) -> None:
+        self._run_started = self.clock.now_ns()
+
+    def end(self) -> None:
+        if self._run_started is not None:
+            self.busy_ns += self.clock.now_ns() - self._run_started
+            self._run_started = None
+
+    @property
+    def elapsed(self) -> float:
+        running = 0
+        if self._run_started is not None:
+            running = self.clock.now_ns() - self._run_started
+        return (self.busy_ns + running) / 1e9
+
+    @property
+    def keys_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.keys / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def histograms(self) -> Dict[str, Histogram]:
+        return {"keystroke": self.keystroke, "send": self.send, "overshoot": self.overshoot}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "keys": self.keys,
+            "retyped": self.retyped,
+            "elapsed_seconds": round(self.elapsed, 6),
+            "keys_per_second": round(self.keys_per_second, 3),
+            "pause_seconds": self.pause_ns / 1e9,
+            "sample_every": self.sample_every,
+            "histograms": {name: hist.to_dict() for name, hist in self.histograms.items()},
+        }
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+
+        lines: List[str] = []
+        for name, hist in self.histograms.items():
+            metric = f"{METRIC_PREFIX}_{name}_seconds"
+            lines.append(f"# HELP {metric} {HISTOGRAM_HELP[name]}")
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(hist.bounds, hist.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{_number(bound / 1e9)}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {hist.count}')
+            lines.append(f"{metric}_sum {_number(hist.total_ns / 1e9)}")
+            lines.append(f"{metric}_count {hist.count}")
+        scalars = (
+            ("keys_total", "counter", "Keys typed.", self.keys),
+            (
+                "retyped_keys_total",
+                "counter",
+                "Keys typed again or erased after an echo mismatch.",
+                self.retyped,
+            ),
+            ("pause_seconds_total", "counter", "Time spent paused.", self.pause_ns / 1e9),
+            ("busy_seconds_total", "counter", "Time spent running plans.", self.elapsed),
+            ("keys_per_second", "gauge", "Achieved typing rate.", self.keys_per_second),
+        )
+        for suffix, kind, help_text, value in scalars:
+            metric = f"{METRIC_PREFIX}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """One-line human readable summary."""
+
+        def ms(value: Optional[int]) -> str:
+            return "-" if value is None else f"{value / 1e6:.3f} ms"
+
+        return (
+            f"{self.keys} 次按键，{self.keys_per_second:.1f} 键/秒，"
+            f"发送延迟 p50 {ms(self.send.quantile(0.5))} / p99 {ms(self.send.quantile(0.99))}，"
+            f"间隔超时 p50 {ms(self.overshoot.quantile(0.5))} / "
+            f"p99 {ms(self.overshoot.quantile(0.99))}，暂停 {self.pause_ns / 1e9:.1f} 秒"
+        )
+
+
+def _number(value: float) -> str:
+    # 整数原样输出，浮点数用 repr 保留全部精度 (``:g`` 只有 6 位有效数字)
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    # 先写临时文件再替换，避免采集端读到写了一半的文件
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_text(content, encoding="utf-8")
+    os.replace(temporary, path)
+
+
+class MetricsExporter:
+    """Write metrics to JSON and/or Prometheus files periodically and on exit."""
+
+    def __init__(
+        self,
+        metrics: KeystrokeMetrics,
+        *,
+        json_path: Optional[Path] = None,
+        prometheus_path: Optional[Path] = None,
+        interval: Optional[float] = 10.0,
+    ):
+        self.metrics = metrics
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self) -> None:
+        if self.json_path is not None:
+            _write_atomic(
+                self.json_path, json.dumps(self.metrics.to_dict(), ensure_ascii=False, indent=2)
+            )
+        if self.prometheus_path is not None:
+            _write_atomic(self.prometheus_path, self.metrics.to_prometheus())
+
+    def _loop(self) -> None:
+        assert self.interval is not None
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def __enter__(self) -> "MetricsExporter":
+        if self.interval:
+            self._thread = threading.Thread(target=self._loop, name="metrics-export", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.export()
+        return False
+
+
+__all__ = [
+    "BUCKET_BOUNDS_NS",
+    "Histogram",
+    "KeystrokeMetrics",
+    "MetricsExporter",
+]
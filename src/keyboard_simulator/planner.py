@@ -0,0 +1,97 @@
+"""Build simulation plans on a background thread for the GUIs."""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+from . import config as cfg
+from .tasks import PlanCancelled, PlanProgress, SimulationPlan, build_plan
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache import PayloadCache
+
+logger = logging.getLogger(__name__)
+
+PlanEvent = Tuple[str, Any]
+
+
+class PlanWorker:
+    """Run :func:`build_plan` off the UI thread.
+
+    Results are delivered through a thread-safe queue that the UI drains
+    with :meth:`poll` on its own timer. Events are ``("progress",
+    PlanProgress)``, followed by exactly one of ``("done", SimulationPlan)``,
+    ``("error", Exception)`` or ``("cancelled", None)``.
+    """
+
+    def __init__(self, config: cfg.Config, *, cache: Optional["PayloadCache"] = None):
+        self.config = config
+        self.cache = cache
+        self.events: "queue.Queue[PlanEvent]" = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="plan-worker", daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def poll(self) -> List[PlanEvent]:
+        """Return all pending events without blocking."""
+
+        events: List[PlanEvent] = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _report(self, progress: PlanProgress) -> None:
+        self.events.put(("progress", progress))
+
+    def _run(self) -> None:
+        try:
+            plan: SimulationPlan = build_plan(
+                self.config, on_progress=self._report, cancel_event=self._cancel, cache=self.cache
+            )
+        except PlanCancelled:
+            self.events.put(("cancelled", None))
+            return
+        except Exception as exc:
+            logger.error("构建任务计划失败: %s", exc, exc_info=True)
+            self.events.put(("error", exc))
+            return
+        if self._cancel.is_set():
+            self.events.put(("cancelled", None))
+        else:
+            self.events.put(("done", plan))
+
+
+def describe_progress(progress: PlanProgress) -> str:
+    """One-line status text for a :class:`PlanProgress` update."""
+
+    mb = 1024 * 1024
+    text = f"正在准备: {progress.bytes_done / mb:.1f}/{progress.bytes_total / mb:.1f} MB"
+    if progress.estimated_keystrokes is not None:
+        text += f"，预计 {progress.estimated_keystrokes:,} 次按键"
+    if progress.current_file is not None:
+        text += f" ({progress.current_file})"
+    return text
+
+
+__all__ = ["PlanWorker", "PlanEvent", "describe_progress"]
@@ -0,0 +1,137 @@
+"""Coalesced typing progress for UIs and reporters."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .clock import SYSTEM_CLOCK, Clock
+
+DEFAULT_PROGRESS_INTERVAL = 0.1
+# 速率的指数平滑系数，越大越跟随最近的速度
+RATE_SMOOTHING = 0.3
+
+
+@dataclass(slots=True, frozen=True)
+class ProgressSnapshot:
+    """Immutable view of a run's progress.
+
+    A new instance replaces the previous one on every update, so readers on
+    other threads can take a reference without locking.
+    """
+
+    characters: int = 0
+    total: Optional[int] = None
+    elapsed: float = 0.0
+    rate: float = 0.0
+    eta: Optional[float] = None
+    # 当前所在的分段，例如归档中正在输入的文件
+    section: Optional[str] = None
+
+    @property
+    def fraction(self) -> Optional[float]:
+        if not self.total:
+            return None
+        return min(1.0, self.characters / self.total)
+
+
+ProgressCallback = Callable[[ProgressSnapshot], None]
+
+
+class ProgressMeter:
+    """Count typed characters and publish snapshots at a bounded rate.
+
+    :meth:`advance` is called for every character but only builds a
+    :class:`ProgressSnapshot` (and calls ``callback``) once per
+    ``interval`` seconds, e.g. 10 Hz for the default of 0.1 s. When
+    :attr:`section` is set, it is called with the character count to label
+    each snapshot; :attr:`total_source` likewise refreshes :attr:`total`
+    for plans whose length is refined while they are typed.
+    """
+
+    def __init__(
+        self,
+        total: Optional[int] = None,
+        *,
+        interval: float = DEFAULT_PROGRESS_INTERVAL,
+        callback: Optional[ProgressCallback] = None,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
+        if interval < 0:
+            raise ValueError("interval must not be negative")
+        self.total = total
+        self.interval = interval
+        self.callback = callback
+        self.section: Optional[Callable[[int], Optional[str]]] = None
+        self.total_source: Optional[Callable[[], Optional[int]]] = None
+        self._now = clock.now
+        self.characters = 0
+        self.snapshot = ProgressSnapshot(total=total)
+        self._started = self._now()
+        self._last_time = self._started
+        self._last_characters = 0
+        self._rate = 0.0
+        self._next_publish = self._started + interval
+
+    def advance(self, count: int = 1) -> None:
+        self.characters += count
+        now = self._now()
+        if now >= self._next_publish:
+            self._publish(now)
+
+    def finish(self) -> ProgressSnapshot:
+        """Publish the final state regardless of the interval."""
+
+        self._publish(self._now())
+        return self.snapshot
+
+    def _publish(self, now: float) -> None:
+        span = now - self._last_time
+        if span > 0:
+            instant = (self.characters - self._last_characters) / span
+            if self._last_characters == 0 and self._rate == 0.0:
+                self._rate = instant
+            else:
+                self._rate += RATE_SMOOTHING * (instant - self._rate)
+        self._last_time = now
+        self._last_characters = self.characters
+        self._next_publish = now + self.interval
+
+        if self.total_source is not None:
+            self.total = self.total_source()
+        eta = None
+        if self.total is not None and self._rate > 0:
+            eta = max(0, self.total - self.characters) / self._rate
+        self.snapshot = ProgressSnapshot(
+            characters=self.characters,
+            total=self.total,
+            elapsed=now - self._started,
+            rate=self._rate,
+            eta=eta,
+            section=None if self.section is None else self.section(self.characters),
+        )
+        if self.callback is not None:
+            self.callback(self.snapshot)
+
+
+def format_progress(snapshot: ProgressSnapshot) -> str:
+    """Short status line such as ``1,200/5,000 字符 · 85.0 字符/秒 · 剩余 45 秒``."""
+
+    if snapshot.total is None:
+        text = f"{snapshot.characters:,} 字符"
+    else:
+        text = f"{snapshot.characters:,}/{snapshot.total:,} 字符"
+    text += f" · {snapshot.rate:.1f} 字符/秒"
+    if snapshot.eta is not None:
+        text += f" · 剩余 {snapshot.eta:.0f} 秒"
+    if snapshot.section:
+        text += f" · {snapshot.section}"
+    return text
+
+
+__all__ = [
+    "DEFAULT_PROGRESS_INTERVAL",
+    "ProgressSnapshot",
+    "ProgressMeter",
+    "format_progress",
+]
@@ -0,0 +1,655 @@
+"""Local daemon that queues typing jobs and streams progress as NDJSON.
+
+Clients connect over a Unix socket or a localhost TCP port and exchange
+newline-delimited JSON. Every request is one object with an ``op`` field.
+The Unix socket is only accessible to its owner; over TCP every request
+must also carry the daemon's ``token``, which :func:`serve` writes to a
+file readable only by the user, so that web pages and other users on the
+machine cannot submit jobs:
+
+- ``{"op": "submit", "job": {...}, "priority": 0, "name": "...", "follow": true}``
+  queues a job (same keys as a config file) and, with ``follow``, streams
+  its events until it finishes.
+- ``{"op": "watch", "job_id": "..."}`` streams the events of a job.
+- ``{"op": "pause" | "resume" | "stop", "job_id": "..."}`` controls a job,
+  whether it is running or still queued.
+- ``{"op": "status"}`` lists all known jobs.
+- ``{"op": "shutdown"}`` stops the daemon.
+
+Higher ``priority`` values run first; jobs of equal priority run in
+submission order. Backends are kept warm in :class:`BackendSession` objects
+between jobs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hmac
+import itertools
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import socket
+import socketserver
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Collection, Dict, List, Optional
+
+from . import config as cfg
+from .backends.base import AbstractKeyboardBackend
+from .backends.session import BackendSession
+from .config import ConfigError
+from .estimate import DEFAULT_CALIBRATION, Calibration, record_run
+from .logging_config import disable_logging, setup_logging
+from .progress import ProgressSnapshot
+from .simulator import KeyboardSimulator, SimulatorHooks
+from .tasks import build_plan
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache import PayloadCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+DEFAULT_TOKEN_FILE = Path.home() / ".keyboard_simulator" / "serve.token"
+TERMINAL_STATES = frozenset({"completed", "stopped", "failed", "cancelled"})
+
+BackendFactory = Callable[[str], AbstractKeyboardBackend]
+DEFAULT_BACKENDS = ("sendinput", "interception")
+
+# 浏览器等 HTTP 客户端的请求行，例如 "POST / HTTP/1.1"
+_HTTP_REQUEST_LINE = re.compile(rb"^[A-Z]+ \S+ HTTP/\d")
+
+
+@dataclass(slots=True, eq=False)
+class ServerJob:
+    job_id: str
+    name: str
+    config: cfg.Config
+    priority: int = 0
+    backend: str = "sendinput"
+    sequence: int = 0
+    state: str = "queued"
+    held: bool = False
+    total_characters: Optional[int] = None
+    typed_characters: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    simulator: Optional[KeyboardSimulator] = None
+    paused: bool = False
+    stop_requested: bool = False
+    subscribers: List["queue.Queue[Dict[str, Any]]"] = field(default_factory=list)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in TERMINAL_STATES
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "name": self.name,
+            "state": self.state,
+            "held": self.held,
+            "priority": self.priority,
+            "backend": self.backend,
+            "characters": self.typed_characters,
+            "total": self.total_characters,
+            "elapsed": round(self.elapsed, 3),
+            "error": self.error,
+        }
+
+
+class SimulatorService:
+    """Priority job queue executed by a single typing worker.
+
+    Jobs naming a backend outside ``backends`` are rejected on submit; a
+    backend that fails to start fails its job and the worker moves on.
+    Completed jobs update ``calibration`` when one is given.
+    """
+
+    def __init__(
+        self,
+        backend_factory: BackendFactory,
+        *,
+        progress_interval: float = 0.5,
+        cache: Optional["PayloadCache"] = None,
+        backends: Optional[Collection[str]] = None,
+        calibration: Optional[Calibration] = None,
+    ):
+        self._backend_factory = backend_factory
+        self.backends = backends
+        self.calibration = calibration
+        self.progress_interval = progress_interval
+        self.cache = cache
+        self._jobs: Dict[str, ServerJob] = {}
+        self._sessions: Dict[str, BackendSession] = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count(1)
+        self._closing = False
+        self._worker: Optional[threading.Thread] = None
+
+    # --- lifecycle ---
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, name="ksim-worker", daemon=True)
+            self._worker.start()
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._closing = True
+            running = [job for job in self._jobs.values() if job.simulator is not None]
+            for job in running:
+                job.stop_requested = True
+            self._condition.notify_all()
+        for job in running:
+            job.simulator.stop()  # type: ignore[union-attr]
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+    # --- job control ---
+    def submit(
+        self,
+        data: Dict[str, Any],
+        *,
+        name: Optional[str] = None,
+        priority: int = 0,
+        backend: str = "sendinput",
+    ) -> ServerJob:
+        if self.backends is not None and backend not in self.backends:
+            raise ValueError(f"未知的后端: {backend}")
+        config = cfg.from_dict(data)
+        sequence = next(self._sequence)
+        job = ServerJob(
+            job_id=f"job-{sequence}",
+            name=name or f"job-{sequence}",
+            config=config,
+            priority=priority,
+            backend=backend,
+            sequence=sequence,
+        )
+        with self._condition:
+            if self._closing:
+                raise RuntimeError("服务正在关闭")
+            self._jobs[job.job_id] = job
+            self._condition.notify_all()
+        self._publish(job, {"event": "queued", **job.snapshot()})
+        return job
+
+    def get(self, job_id: str) -> ServerJob:
+        try:
+            return self._jobs[job_id]
+        except KeyError as exc:
+            raise KeyError(f"未知的任务: {job_id}") from exc
+
+    def jobs(self) -> List[ServerJob]:
+        return sorted(self._jobs.values(), key=lambda job: job.sequence)
+
+    def pause(self, job_id: str) -> None:
+        job = self.get(job_id)
+        with self._condition:
+            if job.simulator is not None:
+                job.paused = True
+                job.simulator.pause()
+            elif not job.finished:
+                job.held = True
+                self._publish(job, {"event": "status", "status": "held", "job_id": job_id})
+
+    def resume(self, job_id: str) -> None:
+        job = self.get(job_id)
+        with self._condition:
+            if job.simulator is not None:
+                job.paused = False
+                job.simulator.resume()
+            elif job.held:
+                job.held = False
+                self._publish(job, {"event": "status", "status": "queued", "job_id": job_id})
+                self._condition.notify_all()
+
+    def stop(self, job_id: str) -> None:
+        job = self.get(job_id)
+        with self._condition:
+            if job.simulator is not None:
+                job.stop_requested = True
+                job.simulator.stop()
+            elif not job.finished:
+                job.state = "cancelled"
+                self._finish(job)
+
+    def subscribe(self, job_id: str) -> "queue.Queue[Dict[str, Any]]":
+        job = self.get(job_id)
+        events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        with self._condition:
+            if job.finished:
+                events.put({"event": "finished", **job.snapshot()})
+            else:
+                job.subscribers.append(events)
+        return events
+
+    def unsubscribe(self, job_id: str, events: "queue.Queue[Dict[str, Any]]") -> None:
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None and events in job.subscribers:
+                job.subscribers.remove(events)
+
+    # --- internals ---
+    def _publish(self, job: ServerJob, event: Dict[str, Any]) -> None:
+        for events in list(job.subscribers):
+            events.put(event)
+
+    def _finish(self, job: ServerJob) -> None:
+        self._publish(job, {"event": "finished", **job.snapshot()})
+        job.subscribers.clear()
+
+    def _next_job(self) -> Optional[ServerJob]:
+        with self._condition:
+            while True:
+                if self._closing:
+                    return None
+                ready = [
+                    job for job in self._jobs.values() if job.state == "queued" and not job.held
+                ]
+                if ready:
+                    job = min(ready, key=lambda item: (-item.priority, item.sequence))
+                    job.state = "running"
+                    return job
+                self._condition.wait()
+
+    def _session(self, backend: str) -> BackendSession:
+        session = self._sessions.get(backend)
+        if session is None:
+            session = BackendSession(lambda: self._backend_factory(backend))
+            self._sessions[backend] = session
+        return session
+
+    def _work(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            except Exception as exc:
+                logger.error("任务 %s 执行失败: %s", job.job_id, exc, exc_info=True)
+                job.state = "failed"
+                job.error = str(exc)
+            with self._condition:
+                job.simulator = None
+                self._finish(job)
+
+    def _run(self, job: ServerJob) -> None:
+        try:
+            plan = build_plan(job.config, cache=self.cache)
+        except (ConfigError, ValueError, OSError) as exc:
+            job.state = "failed"
+            job.error = str(exc)
+            return
+        job.total_characters = plan.total_characters
+        backend = self._session(job.backend).acquire()
+
+        def apply_pending() -> None:
+            # run_plan 开始时会重置暂停与停止状态，之前已确认的命令在此补上
+            with self._condition:
+                if job.stop_requested:
+                    simulator.stop()
+                elif job.paused and simulator.pause_event.is_set():
+                    simulator.pause()
+
+        def on_status(status: str) -> None:
+            self._publish(job, {"event": "status", "status": status, "job_id": job.job_id})
+            if status == "running":
+                apply_pending()
+
+        def on_countdown(seconds_left: int) -> None:
+            apply_pending()
+            self._publish(
+                job, {"event": "countdown", "seconds_left": seconds_left, "job_id": job.job_id}
+            )
+
+        def on_progress(snapshot: ProgressSnapshot) -> None:
+            job.typed_characters = snapshot.characters
+            job.elapsed = snapshot.elapsed
+            self._publish(
+                job,
+                {
+                    "event": "progress",
+                    "job_id": job.job_id,
+                    "characters": snapshot.characters,
+                    "total": snapshot.total,
+                    "characters_per_second": round(snapshot.rate, 2),
+                    "eta": None if snapshot.eta is None else round(snapshot.eta, 1),
+                },
+            )
+
+        simulator = KeyboardSimulator(
+            backend,
+            SimulatorHooks(on_countdown=on_countdown, on_status=on_status, on_progress=on_progress),
+            progress_interval=self.progress_interval,
+        )
+        with self._condition:
+            # The job may have been held or cancelled while its plan was built.
+            while job.held and job.state == "running" and not self._closing:
+                self._condition.wait()
+            if self._closing:
+                job.state = "cancelled"
+            if job.state != "running":
+                for stream in plan.streams:
+                    stream.close()
+                return
+            job.simulator = simulator
+        stats = simulator.run_plan(plan)
+        if self.calibration is not None:
+            record_run(self.calibration, job.config, job.backend, stats)
+        job.state = stats.status
+        job.typed_characters = stats.characters
+        job.elapsed = stats.elapsed
+        self._publish(
+            job,
+            {
+                "event": "metrics",
+                "job_id": job.job_id,
+                "characters": stats.characters,
+                "elapsed": round(stats.elapsed, 3),
+                "characters_per_second": round(stats.characters_per_second, 2),
+            },
+        )
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "_ServiceMixin"
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def _parse(self, raw: bytes) -> Optional[Dict[str, Any]]:
+        """Decode one request, or ``None`` if the connection must be closed."""
+
+        if _HTTP_REQUEST_LINE.match(raw):
+            self._send({"event": "error", "error": "不接受 HTTP 请求"})
+            return None
+        try:
+            request = json.loads(raw)
+        except ValueError:
+            self._send({"event": "error", "error": "请求不是有效的 JSON"})
+            return None
+        if not isinstance(request, dict):
+            self._send({"event": "error", "error": "请求必须是 JSON 对象"})
+            return None
+        token = self.server.token
+        supplied = request.pop("token", None)
+        if token is not None and not (
+            isinstance(supplied, str) and hmac.compare_digest(supplied, token)
+        ):
+            self._send({"event": "error", "error": "令牌无效"})
+            return None
+        return request
+
+    def handle(self) -> None:
+        for raw in self.rfile:
+            if not raw.strip():
+                continue
+            try:
+                # 格式错误的请求直接断开连接，不再读取后续内容
+                request = self._parse(raw)
+                if request is None:
+                    return
+                keep_open = self._dispatch(request)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except (ConfigError, KeyError, ValueError, RuntimeError) as exc:
+                message = exc.args[0] if isinstance(exc, KeyError) and exc.args else str(exc)
+                self._send({"event": "error", "error": message})
+                continue
+            if not keep_open:
+                return
+
+    def _dispatch(self, request: Dict[str, Any]) -> bool:
+        service = self.server.service
+        op = request.get("op")
+        if op == "submit":
+            job_data = request.get("job")
+            if not isinstance(job_data, dict):
+                raise ValueError("'job' 必须是对象")
+            priority = request.get("priority", 0)
+            if isinstance(priority, bool) or not isinstance(priority, int):
+                raise ValueError("'priority' 必须是整数")
+            job = service.submit(
+                job_data,
+                name=request.get("name"),
+                priority=priority,
+                backend=str(request.get("backend", self.server.default_backend)),
+            )
+            events = service.subscribe(job.job_id) if request.get("follow") else None
+            self._send({"event": "accepted", "job_id": job.job_id})
+            if events is not None:
+                self._stream(job.job_id, events)
+        elif op == "watch":
+            job_id = str(request.get("job_id"))
+            self._stream(job_id, service.subscribe(job_id))
+        elif op in ("pause", "resume", "stop"):
+            job_id = str(request.get("job_id"))
+            getattr(service, op)(job_id)
+            self._send({"event": "ok", "op": op, "job_id": job_id})
+        elif op == "status":
+            self._send({"event": "status", "jobs": [job.snapshot() for job in service.jobs()]})
+        elif op == "shutdown":
+            self._send({"event": "ok", "op": "shutdown"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return False
+        else:
+            raise ValueError(f"未知的操作: {op}")
+        return True
+
+    def _stream(self, job_id: str, events: "queue.Queue[Dict[str, Any]]") -> None:
+        try:
+            while True:
+                event = events.get()
+                self._send(event)
+                if event.get("event") == "finished":
+                    return
+        finally:
+            self.server.service.unsubscribe(job_id, events)
+
+
+class _ServiceMixin:
+    service: SimulatorService
+    default_backend: str
+    token: Optional[str]
+
+
+class TCPServiceServer(_ServiceMixin, socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class UnixServiceServer(
+        _ServiceMixin, socketserver.ThreadingUnixStreamServer  # type: ignore[name-defined]
+    ):
+        daemon_threads = True
+
+else:  # pragma: no cover - Windows
+    UnixServiceServer = None  # type: ignore[assignment,misc]
+
+
+def create_server(
+    service: SimulatorService,
+    *,
+    socket_path: Optional[Path] = None,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    default_backend: str = "sendinput",
+    token: Optional[str] = None,
+) -> socketserver.BaseServer:
+    """Bind a server for ``service`` on a Unix socket or a local TCP port.
+
+    The Unix socket is created with mode 0600. When ``token`` is given,
+    every request must carry it.
+    """
+
+    if socket_path is not None:
+        if UnixServiceServer is None:
+            raise RuntimeError("当前平台不支持 Unix 套接字，请改用 --port")
+        socket_path = Path(socket_path)
+        if socket_path.exists():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(str(socket_path))
+            except OSError:
+                socket_path.unlink()  # stale socket left by a crashed daemon
+            else:
+                raise RuntimeError(f"套接字已被占用: {socket_path}")
+            finally:
+                probe.close()
+        umask = os.umask(0o177)
+        try:
+            server: Any = UnixServiceServer(str(socket_path), _RequestHandler)
+        finally:
+            os.umask(umask)
+    else:
+        server = TCPServiceServer((host, port), _RequestHandler)
+    server.service = service
+    server.default_backend = default_backend
+    server.token = token
+    return server
+
+
+def write_token(path: Path) -> str:
+    """Generate a new daemon token and store it in ``path`` with mode 0600."""
+
+    token = secrets.token_hex(16)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as handle:
+        os.chmod(path, 0o600)
+        handle.write(token + "\n")
+    return token
+
+
+def parse_args(
+    argv: Optional[List[str]] = None, *, backends: Collection[str] = DEFAULT_BACKENDS
+) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="keyboard-simulator serve", description="以守护进程模式运行键盘模拟器"
+    )
+    parser.add_argument("--socket", type=str, help="监听的 Unix 套接字路径")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="监听地址 (默认仅本机)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听的 TCP 端口")
+    parser.add_argument(
+        "--token-file",
+        type=str,
+        help=f"TCP 模式下写入访问令牌的文件 (默认 {DEFAULT_TOKEN_FILE})",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=list(backends),
+        default="sendinput",
+        help="任务未指定时使用的后端",
+    )
+    parser.add_argument(
+        "--progress-interval", type=float, default=0.5, help="进度事件的推送间隔 (秒)"
+    )
+    parser.add_argument(
+        "--cache-dir", type=str, help="脚本缓存目录 (默认 ~/.keyboard_simulator/cache)"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="不使用脚本缓存")
+    parser.add_argument(
+        "--calibration",
+        type=str,
+        metavar="PATH",
+        help="每个完成的任务结束后更新的耗时校准文件 (默认 ~/.keyboard_simulator/calibration.json)",
+    )
+    parser.add_argument(
+        "--no-calibrate", action="store_true", help="任务结束后不更新耗时校准文件"
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        default="INFO",
+        help="设置日志记录级别",
+    )
+    parser.add_argument("--log", action="store_true", help="启用文件和控制台日志记录")
+    parser.add_argument(
+        "--log-json",
+        type=str,
+        metavar="PATH",
+        help="同时将日志以 JSON Lines 写入 PATH (隐含 --log)",
+    )
+    return parser.parse_args(argv)
+
+
+def serve(
+    argv: Optional[List[str]] = None,
+    *,
+    backend_factory: BackendFactory,
+    backends: Collection[str] = DEFAULT_BACKENDS,
+) -> None:
+    args = parse_args(argv, backends=backends)
+    if args.log or args.log_json:
+        setup_logging(log_level=args.log_level, run_log=args.log_json)
+    else:
+        disable_logging()
+    cache = None
+    if not args.no_cache:
+        from .cache import open_cache
+
+        cache = open_cache(Path(args.cache_dir) if args.cache_dir else None)
+    calibration = None
+    if not args.no_calibrate:
+        calibration = Calibration.load(
+            Path(args.calibration) if args.calibration else DEFAULT_CALIBRATION
+        )
+    service = SimulatorService(
+        backend_factory,
+        progress_interval=args.progress_interval,
+        cache=cache,
+        backends=backends,
+        calibration=calibration,
+    )
+    token_file = None
+    token = None
+    if not args.socket:
+        token_file = Path(args.token_file) if args.token_file else DEFAULT_TOKEN_FILE
+        token = write_token(token_file)
+        logger.info("访问令牌已写入 %s", token_file)
+    server = create_server(
+        service,
+        socket_path=Path(args.socket) if args.socket else None,
+        host=args.host,
+        port=args.port,
+        default_backend=args.backend,
+        token=token,
+    )
+    service.start()
+    logger.info("守护进程已启动: %s", args.socket or f"{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:  # pragma: no cover - interactive
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if args.socket:
+            Path(args.socket).unlink(missing_ok=True)
+        if token_file is not None:
+            token_file.unlink(missing_ok=True)
+        logger.info("守护进程已退出")
+
+
+__all__ = [
+    "ServerJob",
+    "SimulatorService",
+    "create_server",
+    "write_token",
+    "serve",
+    "DEFAULT_PORT",
+]
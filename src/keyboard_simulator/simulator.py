@@ -3,11 +3,21 @@
 from __future__ import annotations
 
 import threading
-import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Callable, Optional, Iterable
 
-from .backends.base import AbstractKeyboardBackend
+from .backends.base import AbstractKeyboardBackend, BackendError
+from .clock import SYSTEM_CLOCK, Clock
+from .estimate import PayloadProfile
+from .feedback import AIMDRateController, EchoVerifier
+from .metrics import KeystrokeMetrics
+from .progress import (
+    DEFAULT_PROGRESS_INTERVAL,
+    ProgressCallback,
+    ProgressMeter,
+    ProgressSnapshot,
+)
+from .streaming import TextStream
 from .tasks import SimulationPlan, TypingTask
 
 CountdownCallback = Callable[[int], None]
@@ -18,15 +28,79 @@ StateCallback = Callable[[str], None]
 class SimulatorHooks:
     on_countdown: Optional[CountdownCallback] = None
     on_status: Optional[StateCallback] = None
+    # Called from the typing thread at most once per ``progress_interval``.
+    on_progress: Optional[ProgressCallback] = None
+
+
+@dataclass(slots=True)
+class RunStats:
+    """Outcome of a single :meth:`KeyboardSimulator.run_plan` call."""
+
+    status: str
+    characters: int = 0
+    elapsed: float = 0.0
+    # What was handed to the backend, counted chunk by chunk while typing.
+    profile: PayloadProfile = field(default_factory=PayloadProfile)
+
+    @property
+    def characters_per_second(self) -> float:
+        return self.characters / self.elapsed if self.elapsed > 0 else 0.0
 
 
 class KeyboardSimulator:
-    def __init__(self, backend: AbstractKeyboardBackend, hooks: Optional[SimulatorHooks] = None):
+    """Type simulation plans through a backend.
+
+    The simulator owns the pacing between keystrokes; backends only decide
+    how long a single key is held. When an :class:`EchoVerifier` is supplied
+    every line is checked against the target's echo before it is submitted,
+    and the delay is adapted by an :class:`AIMDRateController`.
+
+    Progress is coalesced into :class:`ProgressSnapshot` objects published at
+    most once per ``progress_interval`` seconds; UIs can either use the
+    ``on_progress`` hook or read :attr:`progress` on their own timer.
+
+    With a :class:`KeystrokeMetrics` the simulator additionally times the
+    backend calls, pacing waits and pauses of sampled keystrokes.
+
+    Every wait and timestamp goes through ``clock``; with a
+    :class:`~keyboard_simulator.clock.VirtualClock` a run finishes as fast
+    as the backend allows while all timings stay exact. The backend and the
+    metrics share the simulator's clock for the duration of a run.
+    """
+
+    def __init__(
+        self,
+        backend: AbstractKeyboardBackend,
+        hooks: Optional[SimulatorHooks] = None,
+        *,
+        verifier: Optional[EchoVerifier] = None,
+        rate_controller: Optional[AIMDRateController] = None,
+        progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+        metrics: Optional[KeystrokeMetrics] = None,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
         self.backend = backend
         self.hooks = hooks or SimulatorHooks()
+        self.verifier = verifier
+        self.rate_controller = rate_controller
         self.stop_event = threading.Event()
         self.pause_event = threading.Event()
         self.pause_event.set()
+        self.progress_interval = progress_interval
+        self.metrics = metrics
+        self.clock = clock
+        self._meter = ProgressMeter(interval=progress_interval, clock=clock)
+        self._profile = PayloadProfile()
+
+    @property
+    def typed_characters(self) -> int:
+        return self._meter.characters
+
+    @property
+    def progress(self) -> ProgressSnapshot:
+        """Latest published snapshot; safe to read from any thread."""
+
+        return self._meter.snapshot
 
     def stop(self) -> None:
         self.stop_event.set()
@@ -34,51 +108,240 @@ class KeyboardSimulator:
 
     def pause(self) -> None:
         self.pause_event.clear()
-        if self.hooks.on_status:
+        if self.hooks.on_status is not None:
             self.hooks.on_status("paused")
 
     def resume(self) -> None:
         self.pause_event.set()
-        if self.hooks.on_status:
+        if self.hooks.on_status is not None:
             self.hooks.on_status("running")
 
     def _handle_countdown(self, countdown: int) -> bool:
         for seconds_left in range(countdown, 0, -1):
             if self.stop_event.is_set():
                 return False
-            if self.hooks.on_countdown:
+            if self.hooks.on_countdown is not None:
                 self.hooks.on_countdown(seconds_left)
-            time.sleep(1)
+            if self.clock.wait(self.stop_event, 1):
+                return False
         return True
 
-    def run_plan(self, plan: SimulationPlan) -> None:
+    def run_plan(self, plan: SimulationPlan) -> RunStats:
         self.stop_event.clear()
         self.pause_event.set()
+        self._profile = PayloadProfile()
+        self._meter = ProgressMeter(
+            plan.total_characters,
+            interval=self.progress_interval,
+            callback=self.hooks.on_progress,
+            clock=self.clock,
+        )
+        if any(task.sparse is not None for task in plan.tasks):
+            self._meter.total_source = lambda: plan.total_characters
+        # 流式任务在倒计时期间就开始预读输入。
+        for stream in plan.streams:
+            stream.start()
+        backend_clock = self.backend.clock
+        self.backend.clock = self.clock
+        if self.verifier is not None:
+            verifier_clock = self.verifier.clock
+            self.verifier.clock = self.clock
+        if self.metrics is not None:
+            self.metrics.clock = self.clock
+            self.backend.metrics = self.metrics
+        try:
+            return self._run(plan)
+        finally:
+            if self.metrics is not None:
+                self.metrics.end()
+                self.backend.metrics = None
+            self.backend.clock = backend_clock
+            if self.verifier is not None:
+                self.verifier.clock = verifier_clock
+            for stream in plan.streams:
+                stream.close()
+
+    def _run(self, plan: SimulationPlan) -> RunStats:
         if not self._handle_countdown(plan.countdown_before_start):
-            return
-        if self.hooks.on_status:
+            return RunStats(status="stopped", profile=self._profile)
+        if self.hooks.on_status is not None:
             self.hooks.on_status("running")
+        if self.metrics is not None:
+            self.metrics.begin()
+        started = self.clock.now()
+
+        controller = None
+        if self.verifier is not None:
+            controller = self.rate_controller or AIMDRateController(
+                delay=plan.delay_between_keystrokes
+            )
 
         with self.backend:
             for task in plan.tasks:
-                self._execute_task(task, plan.delay_between_keystrokes)
+                self._meter.section = self._section_source(task)
+                if controller is not None:
+                    self._execute_verified(task, controller)
+                else:
+                    self._execute_task(task, plan.delay_between_keystrokes)
                 if self.stop_event.is_set():
                     break
+                if task.on_complete is not None:
+                    task.on_complete()
 
-        if self.hooks.on_status:
-            self.hooks.on_status("stopped" if self.stop_event.is_set() else "completed")
+        status = "stopped" if self.stop_event.is_set() else "completed"
+        self._meter.finish()
+        stats = RunStats(
+            status=status,
+            characters=self.typed_characters,
+            elapsed=self.clock.now() - started,
+            profile=self._profile,
+        )
+        if self.hooks.on_status is not None:
+            self.hooks.on_status(status)
+        return stats
 
-    def _execute_task(self, task: TypingTask, delay: float) -> None:
-        for char in task.payload:
-            if self.stop_event.is_set():
-                break
+    def _section_source(self, task: TypingTask) -> Optional[Callable[[int], Optional[str]]]:
+        payload = task.payload
+        if not isinstance(payload, TextStream):
+            return None
+        start = self._meter.characters
+        return lambda characters: payload.section_at(characters - start)
+
+    def _wait_turn(self, delay: float, metrics: Optional[KeystrokeMetrics] = None) -> bool:
+        """Pace the next keystroke and block while paused.
+
+        Passing ``metrics`` records how far the pacing wait overshot.
+        Returns ``False`` once a stop was requested.
+        """
+
+        clock = self.clock
+        if delay > 0:
+            if metrics is None:
+                if clock.wait(self.stop_event, delay):
+                    return False
+            else:
+                started = clock.now_ns()
+                if clock.wait(self.stop_event, delay):
+                    return False
+                metrics.overshoot.observe(clock.now_ns() - started - int(delay * 1e9))
+        if not self.pause_event.is_set():
+            paused = clock.now_ns()
             while not self.pause_event.is_set():
-                if self.stop_event.is_set():
-                    break
-                time.sleep(0.1)
-            if self.stop_event.is_set():
+                clock.wait(self.pause_event, 0.1)
+            if self.metrics is not None:
+                self.metrics.pause_ns += clock.now_ns() - paused
+        return not self.stop_event.is_set()
+
+    def _characters(self, task: TypingTask) -> Iterable[str]:
+        """Characters of ``task``, each chunk counted into the run's profile."""
+
+        payload = task.payload
+        if isinstance(payload, TextStream):
+            return self._profiled_chunks(payload)
+        self._profile.add(payload)
+        return payload
+
+    def _profiled_chunks(self, stream: TextStream) -> Iterable[str]:
+        add = self._profile.add
+        for chunk in stream.chunks():
+            add(chunk)
+            yield from chunk
+
+    def _execute_task(self, task: TypingTask, delay: float) -> None:
+        if self.metrics is not None:
+            self._execute_task_instrumented(task, delay, self.metrics)
+            return
+        advance = self._meter.advance
+        for char in self._characters(task):
+            if not self._wait_turn(delay):
                 break
             self.backend.type_character(char, delay)
+            advance()
+
+    def _execute_task_instrumented(
+        self, task: TypingTask, delay: float, metrics: KeystrokeMetrics
+    ) -> None:
+        advance = self._meter.advance
+        clock = self.clock.now_ns
+        for char in self._characters(task):
+            if not metrics.should_sample():
+                if not self._wait_turn(delay):
+                    break
+                self.backend.type_character(char, delay)
+            else:
+                if not self._wait_turn(delay, metrics):
+                    break
+                metrics.active = True
+                started = clock()
+                try:
+                    self.backend.type_character(char, delay)
+                finally:
+                    metrics.keystroke.observe(clock() - started)
+                    metrics.active = False
+            metrics.keys += 1
+            advance()
+
+    def _accept_verified(self, count: int) -> None:
+        if self.metrics is not None:
+            self.metrics.keys += count
+        self._meter.advance(count)
+
+    def _type_verified_line(
+        self, body: str, baseline: str, controller: AIMDRateController
+    ) -> bool:
+        # 进度与按键数只在整行通过校验后累加，重输和退格计入 metrics.retyped
+        verifier = self.verifier
+        assert verifier is not None
+        typed = 0
+        for char in body:
+            if not self._wait_turn(controller.delay):
+                self._discard_verified(typed)
+                return False
+            self.backend.type_character(char, controller.delay)
+            typed += 1
+        observed = verifier.wait_for(baseline, body)
+        if observed == body:
+            controller.on_success()
+            self._accept_verified(typed)
+            return True
+
+        controller.on_mismatch()
+        for _ in range(max(len(observed), len(body))):
+            if not self._wait_turn(controller.delay):
+                self._discard_verified(typed)
+                return False
+            self.backend.press_backspace(controller.delay)
+            typed += 1
+        self._discard_verified(typed)
+        verifier.wait_for(baseline, "")
+        return False
+
+    def _discard_verified(self, count: int) -> None:
+        if self.metrics is not None:
+            self.metrics.retyped += count
+
+    def _execute_verified(self, task: TypingTask, controller: AIMDRateController) -> None:
+        verifier = self.verifier
+        assert verifier is not None
+        baseline = verifier.snapshot()
+        for line in task.lines():
+            self._profile.add(line)
+            body = line.rstrip("\n")
+            attempts = 0
+            while not self._type_verified_line(body, baseline, controller):
+                if self.stop_event.is_set():
+                    return
+                attempts += 1
+                if attempts > verifier.max_retries:
+                    raise BackendError(f"回显校验连续失败 {attempts} 次: {body[:40]!r}")
+            if line.endswith("\n"):
+                if not self._wait_turn(controller.delay):
+                    return
+                committed = verifier.committed_lines()
+                self.backend.type_character("\n", controller.delay)
+                self._accept_verified(1)
+                # 等待换行回显和提示符输出完毕，再以当前行作为下一行的基线
+                baseline = verifier.wait_for_commit(committed)
 
     def iter_characters(self, plan: SimulationPlan) -> Iterable[str]:
         for task in plan.tasks:
@@ -86,4 +349,4 @@ class KeyboardSimulator:
                 yield char
 
 
-__all__ = ["KeyboardSimulator", "SimulatorHooks"]
+__all__ = ["KeyboardSimulator", "SimulatorHooks", "RunStats", "ProgressSnapshot"]
@@ -0,0 +1,250 @@
+"""Replace long constant byte runs with target-side shell commands.
+
+Disk images, padded binaries and preallocated files contain long runs of
+one byte value. :func:`iter_segments` finds them while the file streams
+past (runs may span read blocks), and :func:`iter_sparse_script` types
+them as one short command each instead of their Base64 encoding:
+
+- zeros extend the file with ``dd if=/dev/null ... seek=END``, which
+  leaves a hole on file systems that support sparse files;
+- any other byte value is produced by ``head -c N /dev/zero | tr``.
+
+The remaining data is typed exactly as in the plain Linux script, one
+Base64 segment per stretch between runs. A file without runs produces the
+same script as :func:`~keyboard_simulator.encoding.iter_reconstruction_script`.
+"""
+
+from __future__ import annotations
+
+import functools
+import itertools
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Pattern, Tuple, Union
+
+from .encoding import (
+    CHUNK_SIZE_LINUX,
+    LINES_PER_READ,
+    _read_blocks,
+    encoded_length,
+    iter_block_script,
+    reconstruction_script_length,
+)
+
+# 短于该字节数的连续区段仍按 Base64 输入
+MIN_RUN = 256
+# 与普通脚本相同的读取块大小，每块恰好编码为整数行
+READ_BLOCK_SIZE = CHUNK_SIZE_LINUX // 4 * 3 * LINES_PER_READ
+
+Segment = Union[Tuple[str, bytes], Tuple[str, int, int]]
+
+
+@dataclass(slots=True)
+class SparseStats:
+    """What run encoding did to one file."""
+
+    runs: int = 0
+    run_bytes: int = 0
+    # 与普通脚本相比少输入的字符数，文件全部生成后才确定
+    saved_characters: int = 0
+    # 当前对完整脚本长度的估计，生成结束时等于实际长度
+    estimated_characters: Optional[int] = None
+
+    def describe(self) -> str:
+        return (
+            f"{self.runs} 个连续区段 ({self.run_bytes / 1024:.1f} KB)，"
+            f"节省 {self.saved_characters:,} 次按键"
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _other_than(value: int) -> Pattern[bytes]:
+    return re.compile(b"[^" + re.escape(bytes((value,))) + b"]")
+
+
+@functools.lru_cache(maxsize=None)
+def _repeated(count: int) -> Pattern[bytes]:
+    return re.compile(rb"(.)\1{%d}" % (count - 1), re.DOTALL)
+
+
+def _find_runs(buffer: bytes, min_run: int) -> Iterator[Tuple[int, int]]:
+    """Yield ``(start, end)`` of every run of at least ``min_run`` equal bytes.
+
+    A run that long covers at least ``min_run // step`` consecutive bytes of
+    the sample ``buffer[::step]``, so only where the sample repeats is the
+    buffer itself looked at.
+    """
+
+    step = max(1, min_run // 4)
+    samples = buffer[::step]
+    pattern = _repeated(min_run // step)
+    done = index = 0
+    while True:
+        match = pattern.search(samples, index)
+        if match is None:
+            return
+        probe = match.start() * step
+        value = buffer[probe]
+        head = buffer[max(done, probe - min_run) : probe]
+        begin = probe - (len(head) - len(head.rstrip(bytes((value,)))))
+        other = _other_than(value).search(buffer, probe)
+        end = other.start() if other else len(buffer)
+        if end - begin >= min_run:
+            yield begin, end
+            done = end
+            index = -(-end // step)
+        else:
+            index = match.start() + 1
+
+
+def iter_segments(blocks: Iterable[bytes], min_run: int = MIN_RUN) -> Iterator[Segment]:
+    """Split a byte stream into ``("data", bytes)`` and ``("run", value, length)``.
+
+    Consecutive data segments may follow each other; runs are at least
+    ``min_run`` bytes long and never adjacent to a run of the same value.
+    """
+
+    if min_run < 2:
+        raise ValueError("min_run must be at least 2")
+    carry = b""
+    run_value: Optional[int] = None
+    run_length = 0
+    for block in blocks:
+        if run_value is not None:
+            rest = block.lstrip(bytes((run_value,)))
+            run_length += len(block) - len(rest)
+            if not rest:
+                continue
+            yield ("run", run_value, run_length)
+            run_value = None
+            block = rest
+        buffer = carry + block if carry else block
+        position = 0
+        for start, end in _find_runs(buffer, min_run):
+            if start > position:
+                yield ("data", buffer[position:start])
+            position = end
+            if end == len(buffer):
+                # 区段可能延续到下一个块
+                run_value, run_length = buffer[start], end - start
+                break
+            yield ("run", buffer[start], end - start)
+        carry = b""
+        if run_value is not None or position == len(buffer):
+            continue
+        rest = buffer[position:]
+        # 末尾的相同字节留到下一个块，以便识别跨块的区段
+        kept = len(rest) - len(rest.rstrip(rest[-1:]))
+        if kept < len(rest):
+            yield ("data", rest[: len(rest) - kept])
+        carry = rest[len(rest) - kept :]
+    if run_value is not None:
+        yield ("run", run_value, run_length)
+    if carry:
+        yield ("data", carry)
+
+
+def run_command(value: int, length: int, offset: int, output_filename: str) -> str:
+    """Shell command appending ``length`` bytes of ``value`` at ``offset``."""
+
+    if value == 0:
+        return f"dd if=/dev/null of={output_filename} bs=1 seek={offset + length} 2>/dev/null"
+    return f"head -c {length} /dev/zero | tr '\\0' '\\{value:03o}' >> {output_filename}"
+
+
+def iter_sparse_script(
+    blocks: Iterable[bytes],
+    output_filename: str,
+    *,
+    size: int,
+    min_run: int = MIN_RUN,
+    stats: Optional[SparseStats] = None,
+) -> Iterator[str]:
+    """Yield a Linux reconstruction script that types constant runs as commands.
+
+    ``size`` is the file size, used to keep ``stats.estimated_characters``
+    up to date while the script is generated.
+    """
+
+    stats = stats if stats is not None else SparseStats()
+    classic = 0
+    if size:
+        classic = reconstruction_script_length(encoded_length(size), output_filename, "linux")
+    stats.estimated_characters = classic
+    b64_file = f"{output_filename}.b64"
+    offset = typed = 0
+    created = used_b64 = False
+
+    def data(group: Iterable[Segment]) -> Iterator[bytes]:
+        nonlocal offset
+        for segment in group:
+            offset += len(segment[1])  # type: ignore[arg-type]
+            yield segment[1]  # type: ignore[misc]
+
+    for kind, group in itertools.groupby(iter_segments(blocks, min_run), key=lambda s: s[0]):
+        if kind == "data":
+            redirect = ">>" if created else ">"
+            decode = f"base64 -d {b64_file} {redirect} {output_filename}"
+            for line in iter_block_script(data(group), output_filename, "linux", tail=[decode]):
+                typed += len(line)
+                yield line
+            created = used_b64 = True
+            continue
+        for _, value, length in group:  # type: ignore[misc]
+            lines = [] if created else [f": > {output_filename}"]
+            lines.append(run_command(value, length, offset, output_filename))
+            created = True
+            offset += length
+            stats.runs += 1
+            stats.run_bytes += length
+            for line in lines:
+                typed += len(line) + 1
+                yield line + "\n"
+            remaining = size - offset
+            stats.estimated_characters = typed + (
+                reconstruction_script_length(encoded_length(remaining), output_filename, "linux")
+                if remaining > 0
+                else len(f"rm {b64_file}") + 1
+            )
+    if not created:
+        raise ValueError("encoded data is empty")
+    if used_b64:
+        line = f"rm {b64_file}\n"
+        typed += len(line)
+        yield line
+    stats.estimated_characters = typed
+    stats.saved_characters = classic - typed
+
+
+def iter_sparse_file_script(
+    path: Path,
+    output_filename: str,
+    *,
+    min_run: int = MIN_RUN,
+    stats: Optional[SparseStats] = None,
+    on_block: Optional[Callable[[bytes], None]] = None,
+) -> Iterator[str]:
+    """:func:`iter_sparse_script` for a file, read block by block.
+
+    ``on_block`` sees every raw block, as in
+    :func:`~keyboard_simulator.encoding.iter_reconstruction_script`.
+    """
+
+    return iter_sparse_script(
+        _read_blocks(path, READ_BLOCK_SIZE, on_block),
+        output_filename,
+        size=path.stat().st_size,
+        min_run=min_run,
+        stats=stats,
+    )
+
+
+__all__ = [
+    "MIN_RUN",
+    "SparseStats",
+    "iter_segments",
+    "iter_sparse_file_script",
+    "iter_sparse_script",
+    "run_command",
+]
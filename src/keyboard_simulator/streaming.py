@@ -0,0 +1,234 @@
+"""Bounded, backpressured text streams used as typing payloads."""
+
+from __future__ import annotations
+
+import bisect
+import codecs
+import io
+import queue
+import sys
+import threading
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+STDIN = "-"
+DEFAULT_CHUNK_SIZE = 4096
+DEFAULT_MAX_CHUNKS = 16
+
+_END = object()
+
+
+class _Failure:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class TextStream:
+    """Text produced on a reader thread and typed as it arrives.
+
+    The reader pulls chunks from ``source`` into a queue holding at most
+    ``max_chunks`` chunks. When the keyboard falls behind, the queue fills
+    up and the reader blocks, which in turn blocks whatever process feeds a
+    pipe. A stream can be consumed once.
+
+    ``sections`` is a list of ``(offset, label)`` pairs that the source may
+    append to while it produces text, e.g. the file an archive is currently
+    packing; :meth:`section_at` maps a typed position back to its label.
+    """
+
+    def __init__(
+        self,
+        source: Iterable[str],
+        *,
+        length: Optional[int] = None,
+        max_chunks: int = DEFAULT_MAX_CHUNKS,
+        name: str = "text",
+        sections: Optional[List[Tuple[int, str]]] = None,
+    ):
+        if max_chunks <= 0:
+            raise ValueError("max_chunks must be positive")
+        self.length = length
+        self.name = name
+        self.sections: List[Tuple[int, str]] = sections if sections is not None else []
+        self._source = source
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max_chunks)
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the reader thread; calling it again has no effect."""
+
+        with self._lock:
+            if self._thread is not None or self._closed.is_set():
+                return
+            self._thread = threading.Thread(
+                target=self._produce, name=f"text-stream-{self.name}", daemon=True
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        """Stop the reader and release the source."""
+
+        with self._lock:
+            self._closed.set()
+            thread = self._thread
+        if thread is None:
+            # 读取线程从未启动，由这里关闭源 (例如尚未打开文件的生成器)
+            close = getattr(self._source, "close", None)
+            if close is not None:
+                close()
+        elif thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def section_at(self, position: int) -> Optional[str]:
+        """Label of the section containing character ``position``."""
+
+        index = bisect.bisect_right(self.sections, position, key=lambda section: section[0])
+        return self.sections[index - 1][1] if index else None
+
+    def _put(self, item: object) -> bool:
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self) -> None:
+        iterator = iter(self._source)
+        try:
+            for chunk in iterator:
+                if chunk and not self._put(chunk):
+                    return
+        except Exception as exc:
+            self._put(_Failure(exc))
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        self._put(_END)
+
+    def chunks(self) -> Iterator[str]:
+        """Yield chunks in order as the reader delivers them."""
+
+        self.start()
+        while not self._closed.is_set():
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item  # type: ignore[misc]
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self.chunks():
+            yield from chunk
+
+    def lines(self) -> Iterator[str]:
+        """Yield lines including their trailing newline, if any."""
+
+        return split_lines(self.chunks())
+
+
+def split_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Regroup ``chunks`` into lines including their trailing newline, if any.
+
+    Only the new chunk is scanned; the unfinished line is kept as a list of
+    pieces and joined once its newline arrives, so the cost stays linear even
+    for input without newlines.
+    """
+
+    pending: List[str] = []
+    for chunk in chunks:
+        end = chunk.rfind("\n")
+        if end < 0:
+            if chunk:
+                pending.append(chunk)
+            continue
+        pending.append(chunk[: end + 1])
+        complete = "".join(pending).split("\n")
+        pending = [chunk[end + 1 :]] if end + 1 < len(chunk) else []
+        for line in complete[:-1]:
+            yield line + "\n"
+    if pending:
+        yield "".join(pending)
+
+
+def read_text_chunks(
+    raw: BinaryIO, *, encoding: str = "utf-8", chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[str]:
+    """Decode ``raw`` incrementally, yielding text as soon as it is readable.
+
+    ``read1`` is preferred so that a pipe yields whatever is available
+    instead of waiting for a full chunk. Line endings are normalised to
+    ``\\n``.
+    """
+
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(encoding)(errors="replace"), translate=True
+    )
+    read = getattr(raw, "read1", raw.read)
+    while True:
+        data = read(chunk_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _read_path(path: Path, encoding: str, chunk_size: int) -> Iterator[str]:
+    with path.open("rb") as raw:
+        yield from read_text_chunks(raw, encoding=encoding, chunk_size=chunk_size)
+
+
+def open_text_stream(
+    path: Union[str, Path],
+    *,
+    encoding: str = "utf-8",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_chunks: int = DEFAULT_MAX_CHUNKS,
+    transform: Optional[Callable[[Iterable[str]], Iterable[str]]] = None,
+) -> TextStream:
+    """Stream a text file, or standard input when ``path`` is ``"-"``.
+
+    ``transform`` rewrites the decoded chunks on the reader thread.
+    """
+
+    if str(path) == STDIN:
+        source: Iterable[str] = read_text_chunks(
+            sys.stdin.buffer, encoding=encoding, chunk_size=chunk_size
+        )
+        name = "stdin"
+    else:
+        path = Path(path)
+        if not path.is_file():
+            raise FileNotFoundError(f"未找到文本文件: {path}")
+        source, name = _read_path(path, encoding, chunk_size), path.name
+    if transform is not None:
+        source = transform(source)
+    return TextStream(source, max_chunks=max_chunks, name=name)
+
+
+__all__ = [
+    "STDIN",
+    "TextStream",
+    "split_lines",
+    "read_text_chunks",
+    "open_text_stream",
+]
@@ -2,17 +2,78 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 from . import config as cfg
-from .encoding import EncodedFile, linux_reconstruction_script, windows_reconstruction_script
+from .editors import DEFAULT_PROFILE, get_profile
+from .encoding import (
+    SCRIPT_FORMAT_VERSION,
+    encoded_length,
+    iter_block_script,
+    iter_reconstruction_script,
+    reconstruction_script_length,
+)
+from .fec import FecParams, linux_fec_script, windows_fec_script
+from .sparse import MIN_RUN, SparseStats, iter_sparse_file_script
+from .streaming import STDIN, TextStream, open_text_stream
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache import CachedScript, PayloadCache
+    from .history import TransferHistory
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_SIZE = 1 << 20
+
+
+class PlanCancelled(Exception):
+    """Raised by :func:`build_plan` when its cancel event is set."""
+
+
+@dataclass(slots=True, frozen=True)
+class PlanProgress:
+    """Progress of :func:`build_plan` on a file."""
+
+    bytes_done: int
+    bytes_total: int
+    estimated_keystrokes: Optional[int] = None
+    current_file: Optional[str] = None
+
+
+ProgressCallback = Callable[[PlanProgress], None]
 
 
 @dataclass(slots=True)
 class TypingTask:
     description: str
-    payload: str
+    payload: Union[str, TextStream]
+    # Called by the simulator once the whole payload has been typed.
+    on_complete: Optional[Callable[[], None]] = field(default=None, repr=False)
+    # Set when constant byte runs are typed as commands; refined while streaming.
+    sparse: Optional[SparseStats] = None
+
+    @property
+    def length(self) -> Optional[int]:
+        """Number of characters, or ``None`` for a stream of unknown size."""
+
+        if self.sparse is not None:
+            return self.sparse.estimated_characters
+        if isinstance(self.payload, TextStream):
+            return self.payload.length
+        return len(self.payload)
+
+    def lines(self) -> Iterator[str]:
+        """Iterate the payload line by line, keeping line endings."""
+
+        if isinstance(self.payload, TextStream):
+            return self.payload.lines()
+        return iter(self.payload.splitlines(keepends=True))
 
 
 @dataclass(slots=True)
@@ -22,13 +83,54 @@ class SimulationPlan:
     tasks: List[TypingTask]
 
     @property
-    def total_characters(self) -> int:
-        return sum(len(task.payload) for task in self.tasks)
+    def total_characters(self) -> Optional[int]:
+        lengths = [task.length for task in self.tasks]
+        if any(length is None for length in lengths):
+            return None
+        return sum(lengths)  # type: ignore[arg-type]
+
+    @property
+    def streams(self) -> List[TextStream]:
+        return [task.payload for task in self.tasks if isinstance(task.payload, TextStream)]
+
+
+def build_plan(
+    config: cfg.Config,
+    *,
+    on_progress: Optional[ProgressCallback] = None,
+    cancel_event: Optional[threading.Event] = None,
+    cache: Optional["PayloadCache"] = None,
+    history: Optional["TransferHistory"] = None,
+) -> SimulationPlan:
+    """Turn ``config`` into a plan.
+
+    ``on_progress`` receives :class:`PlanProgress` updates while a file is
+    read; setting ``cancel_event`` aborts the build with
+    :class:`PlanCancelled`. With a ``cache``, file scripts are served from
+    it when the file content and pipeline parameters match, and stored in
+    it as they are generated otherwise.
 
+    A file config with a ``delta_target`` is sent as a patch against the
+    version last sent to that target (from ``history``, by default the
+    user's history directory) when that is shorter than a full transfer;
+    either way the sent version is recorded once the plan was typed.
+    """
 
-def build_plan(config: cfg.Config) -> SimulationPlan:
     if isinstance(config, cfg.TextConfig):
-        task = TypingTask(description="文本输入", payload=config.text_to_type)
+        profile = get_profile(config.editor)
+        transform = None if profile.name == DEFAULT_PROFILE else profile.rewrite
+        editor = "" if transform is None else f" [{profile.description}]"
+        if config.text_file is not None:
+            source = "标准输入" if str(config.text_file) == STDIN else config.text_file.name
+            task = TypingTask(
+                description=f"文本输入 (流式: {source}){editor}",
+                payload=open_text_stream(config.text_file, transform=transform),
+            )
+        else:
+            text = config.text_to_type
+            if transform is not None:
+                text = "".join(transform([text]))
+            task = TypingTask(description=f"文本输入{editor}", payload=text)
         return SimulationPlan(
             delay_between_keystrokes=config.delay_between_keystrokes,
             countdown_before_start=config.countdown_before_start,
@@ -36,14 +138,377 @@ def build_plan(config: cfg.Config) -> SimulationPlan:
         )
 
     # FileConfig
-    encoded = EncodedFile.from_path(config.file_path)
+    if config.archive or config.compress:
+        if config.delta_target is not None:
+            raise ValueError("增量传输仅支持未压缩的单个文件")
+        return _build_archive_plan(config, on_progress, cancel_event)
+    if config.delta_target is None:
+        return _build_file_plan(config, on_progress, cancel_event, cache)
+    if history is None:
+        from .history import TransferHistory
+
+        history = TransferHistory()
+    plan = _build_delta_plan(config, history, on_progress, cancel_event)
+    if plan is None:
+        stat = config.file_path.stat()
+        plan = _build_file_plan(config, on_progress, cancel_event, cache)
+        plan.tasks[-1].on_complete = lambda: _record_sent_file(history, config, stat)
+    return plan
+
+
+def _build_file_plan(
+    config: cfg.FileConfig,
+    on_progress: Optional[ProgressCallback],
+    cancel_event: Optional[threading.Event],
+    cache: Optional["PayloadCache"],
+) -> SimulationPlan:
+    cached = _cache_lookup(cache, config)
+    if cached is not None:
+        return _cached_plan(config, cached, on_progress)
+    if config.fec_enabled:
+        return _build_fec_plan(config, on_progress, cancel_event, cache)
+
+    # 编码在后台线程中进行，脚本行经有界队列送入输入循环，
+    # 因此首个按键的时间与文件大小无关。
+    size = config.file_path.stat().st_size
+    length = reconstruction_script_length(
+        encoded_length(size), config.output_filename, config.target_os
+    )
+    system = "Linux" if config.target_os == "linux" else "Windows"
+    description = f"文件传输 - {system}"
+    sparse = SparseStats(estimated_characters=length) if _uses_sparse(config) else None
+    if cache is not None:
+        source: Iterator[str] = _write_through(cache, config, description, sparse)
+    else:
+        source = _plain_script(config, sparse)
+    payload = TextStream(source, length=length, name=config.file_path.name)
+    if on_progress is not None:
+        on_progress(PlanProgress(size, size, length))
+    task = TypingTask(description=description, payload=payload, sparse=sparse)
+    return SimulationPlan(
+        delay_between_keystrokes=config.delay_between_keystrokes,
+        countdown_before_start=config.countdown_before_start,
+        tasks=[task],
+    )
+
+
+def _uses_sparse(config: cfg.FileConfig) -> bool:
+    # cmd 没有无需管理员权限的填充命令，Windows 目标始终输入完整的 Base64
+    return config.sparse and config.target_os == "linux" and not config.fec_enabled
+
+
+def _plain_script(
+    config: cfg.FileConfig,
+    sparse: Optional[SparseStats],
+    on_block: Optional[Callable[[bytes], None]] = None,
+) -> Iterator[str]:
+    if sparse is not None:
+        return iter_sparse_file_script(
+            config.file_path, config.output_filename, stats=sparse, on_block=on_block
+        )
+    return iter_reconstruction_script(
+        config.file_path, config.output_filename, config.target_os, on_block=on_block
+    )
+
+
+def _pipeline_params(config: cfg.FileConfig) -> Dict[str, Any]:
+    """Everything besides the file content that shapes the generated script."""
+
+    return {
+        "script": SCRIPT_FORMAT_VERSION,
+        "target_os": config.target_os,
+        "output_filename": config.output_filename,
+        "fec": [config.fec_group_size, config.fec_parity] if config.fec_enabled else None,
+        "sparse": MIN_RUN if _uses_sparse(config) else None,
+    }
+
+
+def _cache_lookup(
+    cache: Optional["PayloadCache"], config: cfg.FileConfig
+) -> Optional["CachedScript"]:
+    if cache is None:
+        return None
+    # 先用大小/修改时间/inode 记录；不匹配时（其他路径、复制或 touch 过的文件）按内容哈希查找
+    try:
+        content_hash = cache.content_hash(config.file_path)
+    except OSError:
+        return None
+    return cache.get(cache.key(content_hash, _pipeline_params(config)))
+
+
+def _cached_plan(
+    config: cfg.FileConfig, cached: "CachedScript", on_progress: Optional[ProgressCallback]
+) -> SimulationPlan:
+    if on_progress is not None:
+        size = config.file_path.stat().st_size
+        on_progress(PlanProgress(size, size, cached.characters))
+    payload = TextStream(cached.lines(), length=cached.characters, name=config.file_path.name)
+    task = TypingTask(description=f"{cached.description} (缓存)", payload=payload)
+    return SimulationPlan(
+        delay_between_keystrokes=config.delay_between_keystrokes,
+        countdown_before_start=config.countdown_before_start,
+        tasks=[task],
+    )
+
+
+def _write_through(
+    cache: "PayloadCache",
+    config: cfg.FileConfig,
+    description: str,
+    sparse: Optional[SparseStats] = None,
+) -> Iterator[str]:
+    """Generate the plain script, hashing the file and caching the script in the same pass.
+
+    The entry is only published when the script was generated completely.
+    """
+
+    path = config.file_path
+    stat = path.stat()
+    digest = hashlib.sha256()
+    writer = cache.writer(description)
+    try:
+        for line in _plain_script(config, sparse, digest.update):
+            writer.write(line)
+            yield line
+    except BaseException:
+        writer.abort()
+        raise
+    content_hash = digest.hexdigest()
+    cache.remember_hash(path, stat, content_hash)
+    writer.commit(cache.key(content_hash, _pipeline_params(config)))
+
+
+def _build_archive_plan(
+    config: cfg.FileConfig,
+    on_progress: Optional[ProgressCallback],
+    cancel_event: Optional[threading.Event],
+) -> SimulationPlan:
+    """Pack all sources into one tar.gz stream that the target extracts.
+
+    The plain script is generated while typing, so its length is unknown;
+    the stream's sections name the file being packed for per-file progress.
+    A single file with ``compress`` becomes an archive holding just that
+    file under its output name.
+    """
+
+    from .archive import (
+        ArchiveCancelled,
+        archive_tail,
+        collect_entries,
+        describe_entries,
+        extract_command,
+        file_entry,
+        iter_archive,
+    )
+
+    def on_file(name: str, done: int, total: int) -> None:
+        if on_progress is not None:
+            on_progress(PlanProgress(done, total, current_file=name))
+
+    system = "Linux" if config.target_os == "linux" else "Windows"
+    if config.archive:
+        try:
+            entries = collect_entries(config.paths, on_file=on_file, cancel_event=cancel_event)
+        except ArchiveCancelled:
+            raise PlanCancelled() from None
+        archive_name = config.output_filename
+        description = f"目录传输 - {system} ({describe_entries(entries)})"
+    else:
+        entries = [file_entry(config.file_path, config.output_filename)]
+        archive_name = f"{config.output_filename}.tar.gz"
+        description = f"压缩传输 - {system} ({describe_entries(entries)})"
+    files = [entry for entry in entries if not entry.is_dir]
+
+    if config.fec_enabled:
+        # FEC 需要完整的数据，归档在内存中生成
+        if cancel_event is not None and cancel_event.is_set():
+            raise PlanCancelled()
+        data = b"".join(iter_archive(entries))
+        params = FecParams(group_size=config.fec_group_size, parity=config.fec_parity)
+        if config.target_os == "linux":
+            script = linux_fec_script(data, archive_name, params)
+        else:
+            script = windows_fec_script(data, archive_name, params)
+        script += extract_command(archive_name, config.target_os) + "\n"
+        if on_progress is not None:
+            on_progress(PlanProgress(len(data), len(data), len(script)))
+        task = TypingTask(
+            description=f"{description} (FEC {params.group_size}+{params.parity})",
+            payload=script,
+        )
+    else:
+        sections: List[Tuple[int, str]] = []
+        typed = packed = 0
+
+        def mark(index: int, entry: Any) -> None:
+            nonlocal packed
+            if not entry.is_dir:
+                packed += 1
+                sections.append((typed, f"文件 {packed}/{len(files)}: {entry.name}"))
+
+        def script() -> Iterator[str]:
+            nonlocal typed
+            for line in iter_block_script(
+                iter_archive(entries, on_entry=mark),
+                archive_name,
+                config.target_os,
+                tail=archive_tail(archive_name, config.target_os),
+            ):
+                typed += len(line)
+                yield line
+
+        if on_progress is not None:
+            total = sum(entry.size for entry in files)
+            on_progress(PlanProgress(total, total))
+        task = TypingTask(
+            description=description,
+            payload=TextStream(script(), name=config.file_path.name, sections=sections),
+        )
+    return SimulationPlan(
+        delay_between_keystrokes=config.delay_between_keystrokes,
+        countdown_before_start=config.countdown_before_start,
+        tasks=[task],
+    )
+
+
+def _plain_length(config: cfg.FileConfig, size: int) -> int:
+    return reconstruction_script_length(
+        encoded_length(size), config.output_filename, config.target_os
+    )
+
+
+def _build_delta_plan(
+    config: cfg.FileConfig,
+    history: "TransferHistory",
+    on_progress: Optional[ProgressCallback],
+    cancel_event: Optional[threading.Event],
+) -> Optional[SimulationPlan]:
+    """Plan a patch against the last sent version, or ``None`` to send in full."""
+
+    from .delta import patch_script
+
+    target = config.delta_target
+    assert target is not None
+    last = history.last_sent(target, config.target_os, config.output_filename)
+    base = last.read() if last is not None else None
+    if base is None:
+        logger.info("没有发送到 %s 的 %s 的历史版本，完整传输", target, config.output_filename)
+        return None
+    data = _read_file(
+        config.file_path, lambda size: _plain_length(config, size), on_progress, cancel_event
+    )
+    if not data:
+        return None
+    script = patch_script(base, data, config.output_filename, config.target_os)
+    full = _plain_length(config, len(data))
+    if len(script) >= full:
+        logger.info("差异补丁 (%d 字符) 不短于完整传输 (%d 字符)，完整传输", len(script), full)
+        return None
+    if on_progress is not None:
+        on_progress(PlanProgress(len(data), len(data), len(script)))
+    system = "Linux" if config.target_os == "linux" else "Windows"
+    task = TypingTask(
+        description=f"增量传输 - {system} (补丁 {len(script)} 字符，完整传输需 {full} 字符)",
+        payload=script,
+        on_complete=lambda: _record_sent(history, config, data),
+    )
+    return SimulationPlan(
+        delay_between_keystrokes=config.delay_between_keystrokes,
+        countdown_before_start=config.countdown_before_start,
+        tasks=[task],
+    )
+
+
+def _record_sent_file(
+    history: "TransferHistory", config: cfg.FileConfig, stat: os.stat_result
+) -> None:
+    """Record the file as sent, unless it changed since the plan was built."""
+
+    path = config.file_path
+    try:
+        current = path.stat()
+        data = path.read_bytes()
+    except OSError as exc:
+        logger.warning("无法记录发送历史: %s", exc)
+        return
+    if (current.st_size, current.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+        logger.warning("%s 在传输期间被修改，不记录发送历史", path)
+        return
+    _record_sent(history, config, data)
+
+
+def _record_sent(history: "TransferHistory", config: cfg.FileConfig, data: bytes) -> None:
+    assert config.delta_target is not None
+    try:
+        history.record(config.delta_target, config.target_os, config.output_filename, data)
+    except OSError as exc:
+        logger.warning("无法记录发送历史: %s", exc)
+
+
+def _read_file(
+    path: Path,
+    estimate: Callable[[int], int],
+    on_progress: Optional[ProgressCallback],
+    cancel_event: Optional[threading.Event],
+) -> bytes:
+    """Read ``path`` block by block, reporting progress and honouring cancellation."""
+
+    total = path.stat().st_size
+    keystrokes = estimate(total) if total else None
+    blocks: List[bytes] = []
+    done = 0
+    with path.open("rb") as handle:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise PlanCancelled()
+            block = handle.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            blocks.append(block)
+            done += len(block)
+            if on_progress is not None:
+                on_progress(PlanProgress(done, total, keystrokes))
+    return b"".join(blocks)
+
+
+def _build_fec_plan(
+    config: cfg.FileConfig,
+    on_progress: Optional[ProgressCallback] = None,
+    cancel_event: Optional[threading.Event] = None,
+    cache: Optional["PayloadCache"] = None,
+) -> SimulationPlan:
+    params = FecParams(group_size=config.fec_group_size, parity=config.fec_parity)
+    stat = config.file_path.stat()
+
+    def estimate(size: int) -> int:
+        plain = reconstruction_script_length(
+            encoded_length(size), config.output_filename, config.target_os
+        )
+        return int(plain * (1 + params.redundancy))
+
+    data = _read_file(config.file_path, estimate, on_progress, cancel_event)
+    if cancel_event is not None and cancel_event.is_set():
+        raise PlanCancelled()
     if config.target_os == "linux":
-        payload = linux_reconstruction_script(encoded.encoded, config.output_filename)
-        description = "文件传输 - Linux"
+        payload = linux_fec_script(data, config.output_filename, params)
+        system = "Linux"
     else:
-        payload = windows_reconstruction_script(encoded.encoded, config.output_filename)
-        description = "文件传输 - Windows"
+        payload = windows_fec_script(data, config.output_filename, params)
+        system = "Windows"
 
+    plain = reconstruction_script_length(
+        encoded_length(len(data)), config.output_filename, config.target_os
+    )
+    overhead = len(payload) / plain - 1
+    if on_progress is not None:
+        on_progress(PlanProgress(len(data), len(data), len(payload)))
+    description = (
+        f"文件传输 - {system} (FEC {params.group_size}+{params.parity}, 按键开销 {overhead:+.1%})"
+    )
+    if cache is not None:
+        content_hash = hashlib.sha256(data).hexdigest()
+        cache.remember_hash(config.file_path, stat, content_hash)
+        cache.put(cache.key(content_hash, _pipeline_params(config)), payload, description)
     task = TypingTask(description=description, payload=payload)
     return SimulationPlan(
         delay_between_keystrokes=config.delay_between_keystrokes,
@@ -53,6 +518,8 @@ def build_plan(config: cfg.Config) -> SimulationPlan:
 
 
 __all__ = [
+    "PlanCancelled",
+    "PlanProgress",
     "TypingTask",
     "SimulationPlan",
     "build_plan",
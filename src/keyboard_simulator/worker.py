@@ -0,0 +1,480 @@
+"""Run the typing engine in a separate process.
+
+In the GUIs the typing thread shares the GIL with Tk rendering, drag and
+drop and the global hotkey callbacks, so UI activity shows up as keystroke
+jitter. :class:`SimulatorProcess` moves plan building and
+:class:`~keyboard_simulator.simulator.KeyboardSimulator` into a child
+process that only types:
+
+- commands (run a config, pause, resume, stop, shut down) are sent over a
+  one-way pipe and applied by a thread that blocks on it in the child;
+- the child publishes its state and progress in a small shared-memory
+  :class:`ControlBlock`, which the UI reads on its own timer without any
+  message round trip;
+- status changes, countdown ticks, plan-building progress and the final
+  :class:`~keyboard_simulator.simulator.RunStats` come back over a second
+  pipe and are turned into the same :class:`SimulatorHooks` calls as with
+  an in-process simulator.
+
+The backend is created in the child from a picklable factory (usually the
+backend class) and kept started across runs, like a
+:class:`~keyboard_simulator.backends.session.BackendSession`. Log records
+of the child are queued to the parent and handled by its loggers.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import logging
+import math
+import multiprocessing
+import threading
+from logging.handlers import QueueListener
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple
+
+from .progress import DEFAULT_PROGRESS_INTERVAL, ProgressSnapshot
+from .simulator import RunStats, SimulatorHooks
+
+if TYPE_CHECKING:  # pragma: no cover
+    from multiprocessing.connection import Connection
+
+    from . import config as cfg
+    from .backends.session import BackendFactory
+    from .simulator import KeyboardSimulator
+    from .tasks import PlanProgress
+
+logger = logging.getLogger(__name__)
+
+STATES = ("idle", "preparing", "countdown", "running", "paused", "completed", "stopped", "error")
+SECTION_BYTES = 160
+# 子进程在收到关闭命令后退出的最长等待时间
+SHUTDOWN_TIMEOUT = 2.0
+
+PlanProgressCallback = Callable[["PlanProgress"], None]
+
+
+class ControlBlock(ctypes.Structure):
+    """State shared between the UI process and the typing process.
+
+    Only the child writes; every write is bracketed by two increments of
+    ``sequence``, so a reader that sees the same even value before and
+    after copying the fields has a consistent view (a seqlock).
+    """
+
+    _fields_ = [
+        ("sequence", ctypes.c_uint64),
+        ("state", ctypes.c_int32),
+        ("countdown", ctypes.c_int32),
+        ("characters", ctypes.c_int64),
+        # -1 表示总数未知
+        ("total", ctypes.c_int64),
+        ("elapsed", ctypes.c_double),
+        ("rate", ctypes.c_double),
+        # NaN 表示无法估计
+        ("eta", ctypes.c_double),
+        ("section", ctypes.c_char * SECTION_BYTES),
+    ]
+
+
+def _publish(block: ControlBlock, lock: threading.Lock, **fields: Any) -> None:
+    with lock:
+        block.sequence += 1
+        for name, value in fields.items():
+            setattr(block, name, value)
+        block.sequence += 1
+
+
+def _publish_progress(
+    block: ControlBlock, lock: threading.Lock, snapshot: ProgressSnapshot
+) -> None:
+    section = (snapshot.section or "").encode("utf-8")[: SECTION_BYTES - 1]
+    _publish(
+        block,
+        lock,
+        characters=snapshot.characters,
+        total=-1 if snapshot.total is None else snapshot.total,
+        elapsed=snapshot.elapsed,
+        rate=snapshot.rate,
+        eta=math.nan if snapshot.eta is None else snapshot.eta,
+        section=section,
+    )
+
+
+def _read(block: ControlBlock) -> Optional[Tuple[str, int, ProgressSnapshot]]:
+    for _ in range(1000):
+        sequence = block.sequence
+        if sequence & 1:
+            continue
+        state, countdown = block.state, block.countdown
+        characters, total = block.characters, block.total
+        elapsed, rate, eta = block.elapsed, block.rate, block.eta
+        section = block.section
+        if block.sequence == sequence:
+            snapshot = ProgressSnapshot(
+                characters=characters,
+                total=None if total < 0 else total,
+                elapsed=elapsed,
+                rate=rate,
+                eta=None if math.isnan(eta) else eta,
+                section=section.decode("utf-8", "ignore") or None,
+            )
+            return STATES[state], countdown, snapshot
+    return None
+
+
+class _ParentHandler(logging.Handler):
+    """Hand a record from the child to the parent's logger of the same name."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger(record.name).handle(record)
+
+
+class SimulatorProcess:
+    """A :class:`KeyboardSimulator` living in a child process.
+
+    :meth:`run` blocks until the run ends, like
+    :meth:`KeyboardSimulator.run_plan`, and is meant to be called from the
+    UI's worker thread; :meth:`pause`, :meth:`resume`, :meth:`stop` and
+    :attr:`progress` may be used from any thread. Unlike ``run_plan`` it
+    takes a config: the plan, with its streams and cache callbacks, is
+    built in the child.
+    """
+
+    def __init__(
+        self,
+        backend_factory: "BackendFactory",
+        hooks: Optional[SimulatorHooks] = None,
+        *,
+        progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+        use_cache: bool = True,
+    ):
+        self.backend_factory = backend_factory
+        self.hooks = hooks or SimulatorHooks()
+        self.progress_interval = progress_interval
+        self.use_cache = use_cache
+        self._context = multiprocessing.get_context("spawn")
+        self._block = self._context.RawValue(ControlBlock)
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._commands: Optional["Connection"] = None
+        self._events: Optional["Connection"] = None
+        self._log_listener: Optional[QueueListener] = None
+        self._send_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._snapshot = ProgressSnapshot()
+
+    def __enter__(self) -> "SimulatorProcess":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
+
+    @property
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def start(self) -> None:
+        """Spawn the child; runs start it on demand."""
+
+        if self.is_alive:
+            return
+        commands_in, commands_out = self._context.Pipe(duplex=False)
+        events_in, events_out = self._context.Pipe(duplex=False)
+        log_records = self._context.Queue()
+        self._process = self._context.Process(
+            target=_serve,
+            args=(commands_in, events_out, self._block, self.backend_factory),
+            kwargs={
+                "progress_interval": self.progress_interval,
+                "use_cache": self.use_cache,
+                "log_records": log_records,
+                "log_level": logging.getLogger().getEffectiveLevel(),
+            },
+            name="keyboard-simulator",
+            daemon=True,
+        )
+        self._process.start()
+        self._log_listener = QueueListener(log_records, _ParentHandler())
+        self._log_listener.start()
+        commands_in.close()
+        events_out.close()
+        self._commands, self._events = commands_out, events_in
+        logger.info("模拟进程已启动 (pid %s)", self._process.pid)
+
+    def close(self, timeout: float = SHUTDOWN_TIMEOUT) -> None:
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            self._send(("close", None))
+        except (OSError, ValueError):
+            pass
+        process.join(timeout)
+        if process.is_alive():
+            logger.warning("模拟进程未在 %.1f 秒内退出，强制结束", timeout)
+            process.terminate()
+            process.join()
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+        for connection in (self._commands, self._events):
+            if connection is not None:
+                connection.close()
+        self._commands = self._events = None
+
+    @property
+    def state(self) -> str:
+        current = _read(self._block)
+        return "idle" if current is None else current[0]
+
+    @property
+    def progress(self) -> ProgressSnapshot:
+        """Latest snapshot published by the child; reads shared memory only."""
+
+        current = _read(self._block)
+        if current is not None:
+            self._snapshot = current[2]
+        return self._snapshot
+
+    @property
+    def typed_characters(self) -> int:
+        return self.progress.characters
+
+    def pause(self) -> None:
+        if self.is_alive:
+            self._send(("pause", None))
+
+    def resume(self) -> None:
+        if self.is_alive:
+            self._send(("resume", None))
+
+    def stop(self) -> None:
+        """Stop the run, also while its plan is still being built."""
+
+        if self.is_alive:
+            self._send(("stop", None))
+
+    def run(
+        self, config: "cfg.Config", *, on_plan_progress: Optional[PlanProgressCallback] = None
+    ) -> RunStats:
+        """Build and type ``config`` in the child.
+
+        Errors raised there, such as a :class:`ValueError` for an unreadable
+        file or a backend failure, are raised again here.
+        """
+
+        with self._run_lock:
+            self.start()
+            events = self._events
+            assert events is not None
+            self._send(("run", config))
+            hooks = self.hooks
+            published = -1
+            while True:
+                if not events.poll(self.progress_interval):
+                    if self._process is None or not self._process.is_alive():
+                        raise RuntimeError("模拟进程意外退出")
+                    if hooks.on_progress is not None:
+                        snapshot = self.progress
+                        if snapshot.characters != published:
+                            published = snapshot.characters
+                            hooks.on_progress(snapshot)
+                    continue
+                try:
+                    kind, value = events.recv()
+                except EOFError:
+                    raise RuntimeError("模拟进程意外退出") from None
+                if kind == "countdown":
+                    if hooks.on_countdown is not None:
+                        hooks.on_countdown(value)
+                elif kind == "status":
+                    if hooks.on_status is not None:
+                        hooks.on_status(value)
+                elif kind == "plan":
+                    if on_plan_progress is not None:
+                        on_plan_progress(value)
+                elif kind == "done":
+                    if hooks.on_progress is not None:
+                        hooks.on_progress(self.progress)
+                    return value
+                elif kind == "error":
+                    raise value
+
+    def _send(self, message: Tuple[str, Any]) -> None:
+        with self._send_lock:
+            if self._commands is None:
+                raise RuntimeError("模拟进程未启动")
+            self._commands.send(message)
+
+
+class _Server:
+    """Child side: apply commands and run one config at a time."""
+
+    def __init__(
+        self,
+        events: "Connection",
+        block: ControlBlock,
+        backend_factory: "BackendFactory",
+        *,
+        progress_interval: float,
+        use_cache: bool,
+    ):
+        from .backends.session import BackendSession
+
+        self.events = events
+        self.block = block
+        self.progress_interval = progress_interval
+        self.use_cache = use_cache
+        self.session = BackendSession(backend_factory)
+        self.simulator: Optional["KeyboardSimulator"] = None
+        self.cancel = threading.Event()
+        self.paused = False
+        self.thread: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._cache: Any = None
+
+    def handle(self, command: str, value: Any) -> None:
+        if command == "run":
+            if self.thread is not None:
+                # 父进程收到上一次的结果后才会发送新任务，线程此时正在退出
+                self.thread.join()
+            self.cancel.clear()
+            self.paused = False
+            self.thread = threading.Thread(
+                target=self._execute, args=(value,), name="typing", daemon=True
+            )
+            self.thread.start()
+        elif command == "pause":
+            self.paused = True
+            if self.simulator is not None:
+                self.simulator.pause()
+        elif command == "resume":
+            self.paused = False
+            if self.simulator is not None:
+                self.simulator.resume()
+        elif command == "stop":
+            self.cancel.set()
+            if self.simulator is not None:
+                self.simulator.stop()
+
+    def shutdown(self) -> None:
+        self.handle("stop", None)
+        if self.thread is not None:
+            self.thread.join(SHUTDOWN_TIMEOUT)
+        self.session.close()
+
+    def _send(self, kind: str, value: Any) -> None:
+        with self._send_lock:
+            try:
+                self.events.send((kind, value))
+            except (OSError, ValueError):
+                pass
+            except Exception as exc:
+                # 无法序列化的异常以文本形式转发
+                self.events.send((kind, RuntimeError(f"{type(value).__name__}: {value}")))
+                logger.debug("事件无法序列化: %s", exc)
+
+    def _status(self, status: str) -> None:
+        _publish(self.block, self._write_lock, state=STATES.index(status), countdown=0)
+        self._send("status", status)
+        if status == "running":
+            self._apply_pending()
+
+    def _countdown(self, seconds_left: int) -> None:
+        self._apply_pending()
+        _publish(
+            self.block, self._write_lock, state=STATES.index("countdown"), countdown=seconds_left
+        )
+        self._send("countdown", seconds_left)
+
+    def _apply_pending(self) -> None:
+        # run_plan 开始时会重置暂停与停止状态，之前收到的命令在此补上
+        simulator = self.simulator
+        if simulator is None:
+            return
+        if self.cancel.is_set():
+            simulator.stop()
+        elif self.paused and simulator.pause_event.is_set():
+            simulator.pause()
+
+    def _progress(self, snapshot: ProgressSnapshot) -> None:
+        _publish_progress(self.block, self._write_lock, snapshot)
+
+    def _execute(self, config: "cfg.Config") -> None:
+        from .simulator import KeyboardSimulator
+        from .tasks import PlanCancelled, build_plan
+
+        _publish_progress(self.block, self._write_lock, ProgressSnapshot())
+        self._status("preparing")
+        try:
+            if self.use_cache and self._cache is None:
+                from .cache import open_cache
+
+                self._cache = open_cache()
+            try:
+                plan = build_plan(
+                    config,
+                    on_progress=lambda progress: self._send("plan", progress),
+                    cancel_event=self.cancel,
+                    cache=self._cache,
+                )
+            except PlanCancelled:
+                plan = None
+            if plan is None or self.cancel.is_set():
+                self._status("stopped")
+                self._send("done", RunStats(status="stopped"))
+                return
+            simulator = KeyboardSimulator(
+                self.session.acquire(),
+                SimulatorHooks(
+                    on_countdown=self._countdown, on_status=self._status, on_progress=self._progress
+                ),
+                progress_interval=self.progress_interval,
+            )
+            self.simulator = simulator
+            stats = simulator.run_plan(plan)
+        except Exception as exc:
+            logger.error("模拟进程运行失败: %s", exc, exc_info=True)
+            _publish(self.block, self._write_lock, state=STATES.index("error"))
+            self._send("error", exc)
+            return
+        finally:
+            self.simulator = None
+        self._send("done", stats)
+
+
+def _serve(
+    commands: "Connection",
+    events: "Connection",
+    block: ControlBlock,
+    backend_factory: "BackendFactory",
+    *,
+    progress_interval: float,
+    use_cache: bool,
+    log_records: Any,
+    log_level: int,
+) -> None:
+    """Entry point of the child process."""
+
+    from .logging_config import forward_logging
+
+    forward_logging(log_records, log_level)
+    server = _Server(
+        events, block, backend_factory, progress_interval=progress_interval, use_cache=use_cache
+    )
+    try:
+        while True:
+            try:
+                command, value = commands.recv()
+            except EOFError:
+                break
+            if command == "close":
+                break
+            server.handle(command, value)
+    finally:
+        server.shutdown()
+
+
+__all__ = ["ControlBlock", "SimulatorProcess", "STATES"]
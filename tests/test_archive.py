@@ -0,0 +1,214 @@
+"""Directory and multi-file transfers as one tar.gz stream."""
+
+import base64
+import gzip
+import io
+import os
+import shutil
+import subprocess
+import tarfile
+import zlib
+
+import pytest
+
+from keyboard_simulator import archive
+from keyboard_simulator import config as cfg
+from keyboard_simulator.archive import collect_entries, iter_archive
+from keyboard_simulator.backends.null import NullBackend
+from keyboard_simulator.clock import VirtualClock
+from keyboard_simulator.encoding import iter_block_script, linux_reconstruction_script
+from keyboard_simulator.simulator import KeyboardSimulator, SimulatorHooks
+from keyboard_simulator.tasks import build_plan
+
+needs_tar = pytest.mark.skipif(
+    not (shutil.which("bash") and shutil.which("tar")), reason="需要 bash 与 tar"
+)
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "empty").mkdir()
+    (root / "README.md").write_text("# demo\n" * 50, encoding="utf-8")
+    (root / "src" / "pkg" / "__init__.py").write_text("VALUE = 1\n", encoding="utf-8")
+    (root / "src" / "pkg" / "copy.md").write_text("# demo\n" * 50, encoding="utf-8")
+    (root / "src" / "blob.bin").write_bytes(os.urandom(100_000))
+    return root
+
+
+def _tree(root):
+    return {
+        path.relative_to(root).as_posix(): None if path.is_dir() else path.read_bytes()
+        for path in sorted(root.rglob("*"))
+    }
+
+
+def test_archive_stream_is_a_valid_tarball_with_linked_duplicates(project):
+    entries = collect_entries([project])
+    with tarfile.open(fileobj=io.BytesIO(b"".join(iter_archive(entries))), mode="r:gz") as tar:
+        members = {member.name: member for member in tar.getmembers()}
+        assert members["project/empty"].isdir()
+        assert members["project/src/pkg/copy.md"].islnk()
+        assert members["project/src/pkg/copy.md"].linkname == "project/README.md"
+        assert tar.extractfile("project/src/blob.bin").read() == (
+            project / "src" / "blob.bin"
+        ).read_bytes()
+
+
+@needs_tar
+def test_parallel_members_hold_the_same_tar_in_order(project, tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "MEMBER_SIZE", 16 << 10)
+    monkeypatch.setattr(archive, "READ_BLOCK_SIZE", 8 << 10)
+    entries = collect_entries([project])
+    single = b"".join(iter_archive(entries, workers=1))
+    started = []
+    parallel = b"".join(
+        iter_archive(entries, workers=3, on_entry=lambda index, entry: started.append(index))
+    )
+    assert gzip.decompress(parallel) == gzip.decompress(single)
+    assert started == list(range(len(entries)))
+
+    members, data = 0, parallel
+    while data:
+        decompressor = zlib.decompressobj(31)
+        decompressor.decompress(data)
+        data, members = decompressor.unused_data, members + 1
+    assert members > 3
+
+    subprocess.run(["tar", "-xzf", "-"], input=parallel, cwd=tmp_path, check=True)
+    assert _tree(tmp_path / "project") == _tree(project)
+
+
+def test_block_script_matches_whole_file_script():
+    data = os.urandom(100_000)
+    pieces = [data[i : i + 7777] for i in range(0, len(data), 7777)]
+    expected = linux_reconstruction_script(base64.b64encode(data).decode("ascii"), "out")
+    assert "".join(iter_block_script(pieces, "out", "linux")) == expected
+
+
+@needs_tar
+def test_directory_and_glob_are_extracted_on_the_target(project, tmp_path):
+    extra = tmp_path / "notes"
+    extra.mkdir()
+    for name in ("a.txt", "b.txt", "skip.log"):
+        (extra / name).write_text(name, encoding="utf-8")
+    paths = cfg.expand_paths([str(project), str(extra / "*.txt")])
+    config = cfg.FileConfig(
+        file_path=paths[0], extra_paths=tuple(paths[1:]), output_filename="bundle.tar.gz"
+    )
+    assert config.archive
+
+    task = build_plan(config).tasks[0]
+    assert task.description.startswith("目录传输")
+    assert "1 个重复文件" in task.description
+    script = "".join(task.payload)
+
+    target = tmp_path / "target"
+    target.mkdir()
+    subprocess.run(["bash"], input=script, text=True, cwd=target, check=True)
+    assert sorted(p.name for p in target.iterdir()) == ["a.txt", "b.txt", "project"]
+    assert _tree(target / "project") == _tree(project)
+
+
+@needs_tar
+@pytest.mark.skipif(not shutil.which("python3"), reason="需要 python3")
+def test_fec_archive_is_decoded_then_extracted(project, tmp_path):
+    config = cfg.FileConfig(file_path=project, output_filename="p.tar.gz", fec_group_size=4)
+    script = build_plan(config).tasks[0].payload
+    target = tmp_path / "target"
+    target.mkdir()
+    subprocess.run(["bash"], input=script, text=True, cwd=target, check=True)
+    assert _tree(target / "project") == _tree(project)
+    assert sorted(p.name for p in target.iterdir()) == ["project"]
+
+
+@needs_tar
+def test_compressed_single_file_uses_parallel_members(tmp_path, monkeypatch):
+    source = tmp_path / "disk.img"
+    source.write_bytes(b"\0" * (3 * archive.MEMBER_SIZE) + os.urandom(4096))
+    monkeypatch.setattr(archive, "default_workers", lambda: 4)
+    config = cfg.FileConfig(file_path=source, output_filename="vm.img", compress=True)
+    task = build_plan(config).tasks[0]
+    assert task.description.startswith("压缩传输")
+    script = "".join(task.payload)
+    assert len(script) < source.stat().st_size // 100
+
+    target = tmp_path / "target"
+    target.mkdir()
+    subprocess.run(["bash"], input=script, text=True, cwd=target, check=True)
+    assert sorted(p.name for p in target.iterdir()) == ["vm.img"]
+    assert (target / "vm.img").read_bytes() == source.read_bytes()
+
+
+def test_compress_is_rejected_with_delta(tmp_path):
+    source = tmp_path / "a.bin"
+    source.write_bytes(b"x")
+    with pytest.raises(cfg.ConfigError):
+        cfg.from_dict(
+            {
+                "mode": "file",
+                "file_path": str(source),
+                "output_filename": "a.bin",
+                "compress": True,
+                "delta_target": "vm1",
+            }
+        )
+
+
+def test_windows_fec_archive_is_extracted_from_cmd(project):
+    config = cfg.FileConfig(
+        file_path=project, output_filename="p.tar.gz", fec_group_size=4, target_os="windows"
+    )
+    script = build_plan(config).tasks[0].payload
+    assert script.splitlines()[-1] == "tar -xzf p.tar.gz && del p.tar.gz"
+
+
+def test_progress_names_the_file_being_typed(tmp_path):
+    root = tmp_path / "data"
+    root.mkdir()
+    for name in ("one.bin", "two.bin", "three.bin"):
+        (root / name).write_bytes(os.urandom(150_000))
+    plan = build_plan(cfg.FileConfig(file_path=root, output_filename="d.tar.gz"))
+    plan.delay_between_keystrokes = 0.001
+    plan.countdown_before_start = 0
+    snapshots = []
+    simulator = KeyboardSimulator(
+        NullBackend(),
+        SimulatorHooks(on_progress=snapshots.append),
+        clock=VirtualClock(),
+        progress_interval=1.0,
+    )
+
+    assert simulator.run_plan(plan).status == "completed"
+    sections = [s.section for s in snapshots if s.section]
+    assert sections[0] == "文件 1/3: data/one.bin"
+    assert sections[-1] == "文件 3/3: data/two.bin"
+    assert "文件 2/3: data/three.bin" in sections
+
+
+def test_config_accepts_lists_and_globs(project):
+    loaded = cfg.from_dict(
+        {"mode": "file", "file_path": ["project/src", "project/*.md"], "output_filename": "x"},
+        base_path=project.parent,
+    )
+    assert loaded.paths == (project / "src", project / "README.md")
+    assert loaded.archive
+
+    with pytest.raises(cfg.ConfigError):
+        cfg.from_dict(
+            {"mode": "file", "file_path": "project/*.none", "output_filename": "x"},
+            base_path=project.parent,
+        )
+    with pytest.raises(cfg.ConfigError):
+        cfg.from_dict(
+            {"mode": "file", "file_path": "project", "output_filename": "x", "delta_target": "vm"},
+            base_path=project.parent,
+        )
+
+
+def test_duplicate_member_names_are_rejected(project, tmp_path):
+    other = tmp_path / "other" / "project"
+    other.mkdir(parents=True)
+    with pytest.raises(ValueError):
+        collect_entries([project, other])
@@ -0,0 +1,201 @@
+import importlib
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+base = importlib.import_module("keyboard_simulator.backends.base")
+session = importlib.import_module("keyboard_simulator.backends.session")
+interception = importlib.import_module("keyboard_simulator.backends.interception")
+
+
+class CountingBackend(base.AbstractKeyboardBackend):
+    def __init__(self):
+        self.starts = 0
+        self.stops = 0
+        self.revalidations = 0
+
+    def start(self):
+        self.starts += 1
+
+    def stop(self):
+        self.stops += 1
+
+    def revalidate(self):
+        self.revalidations += 1
+
+    def type_character(self, char, delay):
+        pass
+
+    def press_return(self, delay):
+        pass
+
+
+class FakeContext:
+    """Mimics the subset of interception.Interception used for discovery."""
+
+    def __init__(self, keyboards, hardware_ids):
+        self.keyboards = set(keyboards)
+        self.hardware_ids = hardware_ids
+        self.probes = 0
+
+    def is_keyboard(self, device):
+        self.probes += 1
+        return device in self.keyboards
+
+    def get_hardware_id(self, device):
+        return self.hardware_ids.get(device)
+
+
+def test_session_starts_backend_once():
+    created = []
+
+    def factory():
+        created.append(CountingBackend())
+        return created[-1]
+
+    with session.BackendSession(factory) as shared:
+        backend = shared.acquire()
+        with backend:  # nested run_plan style usage must not restart it
+            pass
+        assert shared.acquire() is backend
+
+    assert len(created) == 1
+    assert backend.starts == 1 and backend.stops == 1
+    assert backend.revalidations == 1
+
+
+def test_discovery_uses_cache_and_detects_replug(tmp_path: Path):
+    cache_path = tmp_path / "device.json"
+    context = FakeContext(keyboards={3, 5}, hardware_ids={3: "HID\\A", 5: "HID\\B"})
+
+    cache = interception.KeyboardDeviceCache.load(cache_path)
+    assert interception.discover_keyboard(context, cache) == 3
+
+    context.probes = 0
+    cache.remember(context, 5)
+    reloaded = interception.KeyboardDeviceCache.load(cache_path)
+    assert interception.discover_keyboard(context, reloaded) == 5
+    assert context.probes == 1  # revalidated without a scan
+
+    context.hardware_ids[5] = "HID\\C"  # a different keyboard took the slot
+    assert interception.discover_keyboard(context, reloaded) == 3
+
+
+def test_discovery_without_keyboards_raises():
+    with pytest.raises(base.BackendError):
+        interception.discover_keyboard(FakeContext(keyboards=(), hardware_ids={}))
+
+
+def test_sendinput_types_control_characters_as_virtual_keys():
+    sendinput = importlib.import_module("keyboard_simulator.backends.sendinput")
+    sent = []
+
+    def send_input(count, inputs, size):
+        sent.extend((inputs[i].union.ki.wVk, inputs[i].union.ki.wScan) for i in range(count))
+        return count
+
+    backend = sendinput.SendInputBackend(user32=SimpleNamespace(SendInput=send_input))
+    for char in "a\b\x1b":
+        backend.type_character(char, 0.0)
+    assert sent[::2] == [(0, ord("a")), (sendinput.VK_BACK, 0), (sendinput.VK_ESCAPE, 0)]
+
+
+class FakeKeyStroke:
+    def __init__(self, code, flags):
+        self.code = code
+        self.flags = flags
+
+
+def _fake_interception(monkeypatch):
+    """Install stand-ins for the interception module and its key table."""
+
+    lookups = []
+    scan_codes = {"a": 30, "A": 30, "enter": 28, "shift": 42, "backspace": 14, "esc": 1}
+
+    def get_key_information(key):
+        lookups.append(key)
+        if key not in scan_codes:
+            raise KeyError(key)
+        return SimpleNamespace(
+            scan_code=scan_codes[key], is_extended=False, shift=key == "A", ctrl=False, alt=False
+        )
+
+    module = SimpleNamespace(
+        KeyStroke=FakeKeyStroke,
+        KeyFlag=SimpleNamespace(KEY_DOWN=0, KEY_UP=1, KEY_E0=2),
+        FilterKeyFlag=SimpleNamespace(FILTER_KEY_ALL=0xFFFF, FILTER_KEY_DOWN=1, FILTER_KEY_UP=2),
+    )
+    keycodes = SimpleNamespace(get_key_information=get_key_information, UnknownKeyError=KeyError)
+    monkeypatch.setattr(interception, "interception", module)
+    monkeypatch.setattr(interception, "keycodes", keycodes)
+    return lookups
+
+
+def test_interception_backend_types_on_a_shared_context(monkeypatch):
+    lookups = _fake_interception(monkeypatch)
+    sent = []
+    context = SimpleNamespace(
+        send=lambda device, stroke: sent.append((device, stroke.code, stroke.flags)),
+        is_keyboard=lambda device: device == 4,
+        destroy=lambda: sent.append("destroyed"),
+    )
+    backend = interception.InterceptionBackend(context, 4)
+    with backend:
+        for char in "aA\n":
+            backend.type_character(char, 0.0)
+        backend.type_character("a", 0.0)
+
+    assert sent == [
+        (4, 30, 0), (4, 30, 1),
+        (4, 42, 0), (4, 30, 0), (4, 30, 1), (4, 42, 1),
+        (4, 28, 0), (4, 28, 1),
+        (4, 30, 0), (4, 30, 1),
+    ]  # fmt: skip
+    # 每个按键的键码只查询一次，共享的上下文不会被销毁
+    assert sorted(lookups) == ["A", "a", "enter", "shift"]
+    with pytest.raises(base.BackendError):
+        backend.type_character("€", 0.0)
+
+
+def test_hotkey_listener_forwards_keys_and_swallows_hotkeys(monkeypatch, tmp_path):
+    _fake_interception(monkeypatch)
+    strokes = [(2, 30, 0), (2, 67, 0), (2, 30, 1), (2, 67, 1), (3, 68, 0), (3, 67, 2)]
+    pending = iter(strokes)
+    sent, fired = [], []
+
+    class Context:
+        devices = [SimpleNamespace(receive=lambda: pending_stroke.pop()) for _ in range(20)]
+
+        def set_filter(self, predicate, flags):
+            sent.append(("filter", flags))
+
+        def is_keyboard(self, device):
+            return True
+
+        def await_input(self, timeout):
+            try:
+                device, code, flags = next(pending)
+            except StopIteration:
+                listener.stop()
+                return None
+            pending_stroke.append(FakeKeyStroke(code, flags))
+            return device
+
+        def send(self, device, stroke):
+            sent.append((device, stroke.code, stroke.flags))
+
+    pending_stroke = []
+    cache = interception.KeyboardDeviceCache(index=2, path=tmp_path / "device.json")
+    listener = interception.HotkeyListener(
+        Context(), {67: lambda: fired.append("F9")}, device_cache=cache
+    )
+    listener.install_filter()
+    listener.run()
+
+    # 只捕获按下与抬起；热键的按下与抬起都不转发，扩展键照常转发
+    assert sent == [("filter", 3), (2, 30, 0), (2, 30, 1), (3, 68, 0), (3, 67, 2)]
+    assert fired == ["F9"]
+    assert cache.index == 3
+    assert listener.latency.count == 4
+    assert "转发 4 次按键" in listener.summary()
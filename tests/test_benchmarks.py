@@ -0,0 +1,74 @@
+"""Smoke test of the benchmark runner and its regression check."""
+
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _benchmarks(*args):
+    return subprocess.run(
+        [sys.executable, "-m", "benchmarks", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+
+def test_run_writes_baseline_and_compare_flags_regressions(tmp_path):
+    current = tmp_path / "current.json"
+    result = _benchmarks(
+        "run",
+        "--sizes", "1K",
+        "--only", "plan*.linux.*",
+        "--only", "simulator.null",
+        "--only", "sendinput.inputs",
+        "--characters", "2000",
+        "--keys", "500",
+        "--repeat", "1",
+        "--output", str(current),
+    )
+    assert result.returncode == 0, result.stderr
+
+    document = json.loads(current.read_text(encoding="utf-8"))
+    assert set(document["results"]) == {
+        "plan.linux.1K",
+        "plan-fec.linux.1K",
+        "simulator.null",
+        "sendinput.inputs",
+    }
+    assert document["results"]["simulator.null"]["work"] == 2000
+    assert document["results"]["sendinput.inputs"]["unit"] == "key"
+
+    assert _benchmarks("compare", str(current), str(current)).returncode == 0
+
+    # 基线快十倍时，当前结果必然被判定为回退
+    for entry in document["results"].values():
+        entry["seconds"] /= 10
+    faster = tmp_path / "baseline.json"
+    faster.write_text(json.dumps(document), encoding="utf-8")
+    regression = _benchmarks("compare", str(faster), str(current), "--threshold", "0.5")
+    assert regression.returncode == 1
+    assert "回退" in regression.stdout
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32" or shutil.which("bash") is None, reason="需要 bash 与 POSIX 伪终端"
+)
+def test_transfer_round_trips_through_bash(tmp_path):
+    report = tmp_path / "transfer.json"
+    result = _benchmarks("transfer", "--sizes", "1K", "--output", str(report))
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    entries = json.loads(report.read_text(encoding="utf-8"))
+    assert {entry["pipeline"] for entry in entries} == {"plain", "fec-8+1"}
+    assert len(entries) == 6
+    assert all(entry["ok"] for entry in entries)
+    plain = next(entry for entry in entries if entry["pipeline"] == "plain")
+    assert 1.3 < plain["keystrokes_per_byte"] < 1.6
@@ -0,0 +1,120 @@
+"""Content-addressed script cache."""
+
+import os
+import threading
+
+import pytest
+
+from keyboard_simulator.cache import HEADER_SIZE, PayloadCache
+from keyboard_simulator.config import FileConfig
+from keyboard_simulator.tasks import build_plan
+
+
+def _script(plan):
+    return "".join("".join(task.payload) for task in plan.tasks)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "installer.bin"
+    path.write_bytes(bytes(range(256)) * 40)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PayloadCache(tmp_path / "cache")
+
+
+@pytest.mark.parametrize("fec", [0, 4])
+def test_second_build_is_served_from_cache(source, cache, fec):
+    config = FileConfig(file_path=source, output_filename="setup.bin", fec_group_size=fec)
+    expected = _script(build_plan(config))
+
+    first = build_plan(config, cache=cache)
+    assert _script(first) == expected
+    assert cache.hits == 0
+
+    second = build_plan(config, cache=cache)
+    assert "(缓存)" in second.tasks[0].description
+    assert second.total_characters == len(expected)
+    assert _script(second) == expected
+    assert cache.hits == 1
+
+
+def test_same_content_hits_at_another_path_and_after_touch(source, cache, tmp_path):
+    _script(build_plan(FileConfig(file_path=source, output_filename="setup.bin"), cache=cache))
+    copy = tmp_path / "copy.bin"
+    copy.write_bytes(source.read_bytes())
+    os.utime(source, (1, 1))
+
+    for path in (copy, source):
+        plan = build_plan(FileConfig(file_path=path, output_filename="setup.bin"), cache=cache)
+        assert "(缓存)" in plan.tasks[0].description
+    assert cache.hits == 2
+    assert cache.known_hash(copy) == cache.known_hash(source)
+
+
+def test_pipeline_parameters_and_content_are_part_of_the_key(source, cache):
+    linux = FileConfig(file_path=source, output_filename="a.bin")
+    build = lambda config: _script(build_plan(config, cache=cache))  # noqa: E731
+    build(linux)
+
+    windows = FileConfig(file_path=source, output_filename="a.bin", target_os="windows")
+    assert "certutil" in build(windows)
+    renamed = FileConfig(file_path=source, output_filename="b.bin")
+    assert "b.bin.b64" in build(renamed)
+    assert cache.hits == 0
+
+    source.write_bytes(b"changed content")
+    os.utime(source, ns=(0, 10**9))  # 修改时间变化，预检查失效
+    assert build(linux) == _script(build_plan(linux))
+    assert cache.hits == 0
+
+
+def test_abandoned_stream_is_not_cached(source, cache):
+    config = FileConfig(file_path=source, output_filename="setup.bin")
+    plan = build_plan(config, cache=cache)
+    stream = plan.tasks[0].payload
+    next(iter(stream.chunks()))
+    stream.close()
+
+    assert cache.size() == 0
+    assert list((cache.directory / "tmp").iterdir()) == []
+    assert "(缓存)" not in build_plan(config, cache=cache).tasks[0].description
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry_size = HEADER_SIZE + 1 + 1000
+    cache = PayloadCache(tmp_path / "cache", max_bytes=3 * entry_size + 100)
+    for index, key in enumerate("abc"):
+        cache.put(key * 64, "x" * 1000, f"entry {key}")
+        os.utime(cache._entry_path(key * 64), ns=(index * 10**9, index * 10**9))
+    assert cache.get("a" * 64) is not None  # 刷新 a 的使用时间
+
+    cache.put("d" * 64, "y" * 1000, "entry d")
+
+    assert cache.get("b" * 64) is None
+    assert {key for key in "acd" if cache.get(key * 64) is not None} == set("acd")
+
+
+def test_concurrent_writers_share_one_entry(source, tmp_path):
+    config = FileConfig(file_path=source, output_filename="setup.bin", fec_group_size=4)
+    expected = _script(build_plan(config))
+    results = []
+
+    def worker():
+        # 每个线程使用独立的实例，模拟多个进程共享同一目录
+        results.append(_script(build_plan(config, cache=PayloadCache(tmp_path / "shared"))))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [expected] * 8
+    shared = PayloadCache(tmp_path / "shared")
+    assert len(shared._entries()) == 1
+    assert _script(build_plan(config, cache=shared)) == expected
+    assert shared.hits == 1
@@ -0,0 +1,118 @@
+"""Virtual clock and deterministic simulation."""
+
+import threading
+
+import pytest
+
+from keyboard_simulator.backends.null import NullBackend
+from keyboard_simulator.backends.base import AbstractKeyboardBackend
+from keyboard_simulator.clock import VirtualClock
+from keyboard_simulator.feedback import AIMDRateController, EchoVerifier, FeedbackChannel
+from keyboard_simulator.metrics import KeystrokeMetrics
+from keyboard_simulator.simulator import KeyboardSimulator, SimulatorHooks
+from keyboard_simulator.tasks import SimulationPlan, TypingTask
+
+
+def _plan(text, delay, countdown=0):
+    return SimulationPlan(
+        delay_between_keystrokes=delay,
+        countdown_before_start=countdown,
+        tasks=[TypingTask(description="test", payload=text)],
+    )
+
+
+def test_callbacks_run_in_order_and_wake_waits():
+    clock = VirtualClock(start=10.0)
+    event = threading.Event()
+    fired = []
+    clock.call_at(12.0, lambda: fired.append(("b", clock.now())))
+    clock.call_at(11.0, lambda: fired.append(("a", clock.now())))
+    clock.call_later(2.5, event.set)
+
+    assert clock.wait(event, 60) is True
+    assert clock.now() == 12.5
+    assert fired == [("a", 11.0), ("b", 12.0)]
+
+    clock.sleep(0.5)
+    assert clock.now_ns() == 13_000_000_000
+
+
+def test_three_hour_transfer_runs_instantly_with_exact_pacing():
+    characters = 108_000  # 10 字符/秒，共 3 小时
+    snapshots = []
+    backend = NullBackend(record=True)
+    clock = VirtualClock()
+    simulator = KeyboardSimulator(
+        backend,
+        SimulatorHooks(on_progress=snapshots.append),
+        clock=clock,
+        progress_interval=60.0,
+    )
+
+    stats = simulator.run_plan(_plan("x" * characters, delay=0.1, countdown=5))
+
+    assert stats.status == "completed"
+    assert stats.elapsed == pytest.approx(3 * 3600)
+    assert backend.events[0][0] == pytest.approx(5.1)
+    assert backend.events[-1][0] == pytest.approx(5 + 3 * 3600)
+    gaps = {round(b[0] - a[0], 9) for a, b in zip(backend.events, backend.events[1:])}
+    assert gaps == {0.1}
+
+    halfway = next(s for s in snapshots if s.characters >= characters // 2)
+    assert halfway.rate == pytest.approx(10.0)
+    assert halfway.eta == pytest.approx((characters - halfway.characters) / 10.0)
+
+
+def test_metrics_use_the_simulator_clock():
+    metrics = KeystrokeMetrics()
+    clock = VirtualClock()
+    KeyboardSimulator(NullBackend(), metrics=metrics, clock=clock).run_plan(
+        _plan("abcd", delay=0.5)
+    )
+
+    assert metrics.elapsed == 2.0
+    assert metrics.keys_per_second == 2.0
+    assert metrics.overshoot.max_ns == 0
+    assert metrics.keystroke.max_ns == 0
+
+
+class EchoingTarget(AbstractKeyboardBackend, FeedbackChannel):
+    """A console that echoes keys after one virtual millisecond, dropping the first 'x'."""
+
+    def __init__(self, clock):
+        self.clock_source = clock
+        self.echoed = []
+        self.dropped = False
+
+    def type_character(self, char, delay):
+        if char == "x" and not self.dropped:
+            self.dropped = True
+            return
+        self.clock_source.call_later(0.001, lambda: self.echoed.append(char))
+
+    def press_return(self, delay):
+        self.type_character("\n", delay)
+
+    def press_backspace(self, delay):
+        self.clock_source.call_later(0.001, lambda: self.echoed.append("\b \b"))
+
+    def read(self):
+        text, self.echoed[:] = "".join(self.echoed), []
+        return text
+
+
+def test_echo_verification_waits_on_the_virtual_clock():
+    clock = VirtualClock()
+    target = EchoingTarget(clock)
+    verifier = EchoVerifier(target, stall_timeout=30.0, echo_timeout=60.0)
+    controller = AIMDRateController(delay=0.0)
+    simulator = KeyboardSimulator(
+        target, verifier=verifier, rate_controller=controller, clock=clock
+    )
+    stats = simulator.run_plan(_plan("wxyz\nok\n", 0.0))
+
+    # 丢失的按键在虚拟时间里等满 30 秒的停滞超时后重输，测试本身不会真的等待
+    assert stats.status == "completed"
+    assert controller.mismatches == 1 and controller.successes == 2
+    assert stats.elapsed >= 30.0
+    assert verifier.clock is not clock
@@ -27,3 +27,26 @@ def test_load_text_config(tmp_path: Path) -> None:
 def test_invalid_mode_raises() -> None:
     with pytest.raises(cfg.ConfigError):
         cfg.from_dict({"mode": "invalid"})
+
+
+def test_text_file_is_resolved_relative_to_config(tmp_path: Path) -> None:
+    (tmp_path / "input.txt").write_text("hi", encoding="utf-8")
+    loaded = cfg.from_dict({"mode": "text", "text_file": "input.txt"}, base_path=tmp_path)
+    assert loaded.text_file == (tmp_path / "input.txt").resolve()
+
+    stdin = cfg.from_dict({"mode": "text", "text_file": "-"})
+    assert str(stdin.text_file) == "-"
+
+    with pytest.raises(cfg.ConfigError):
+        cfg.from_dict({"mode": "text", "text_to_type": "x", "text_file": "-"})
+
+
+def test_delta_target_is_parsed(tmp_path: Path) -> None:
+    (tmp_path / "app.conf").write_text("x", encoding="utf-8")
+    data = {"mode": "file", "file_path": "app.conf", "output_filename": "app.conf"}
+    assert cfg.from_dict(data, base_path=tmp_path).delta_target is None
+    loaded = cfg.from_dict(dict(data, delta_target="vm1"), base_path=tmp_path)
+    assert loaded.delta_target == "vm1"
+
+    with pytest.raises(cfg.ConfigError):
+        cfg.from_dict(dict(data, delta_target=""), base_path=tmp_path)
@@ -0,0 +1,186 @@
+"""Delta transfers against the last sent version."""
+
+import base64
+import os
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from keyboard_simulator.backends.null import NullBackend
+from keyboard_simulator.clock import VirtualClock
+from keyboard_simulator.config import FileConfig
+from keyboard_simulator.delta import (
+    PATCH_FAILED_MESSAGE,
+    Copy,
+    Literal,
+    apply_delta,
+    compute_delta,
+    windows_patch_script,
+)
+from keyboard_simulator.history import TransferHistory
+from keyboard_simulator.simulator import KeyboardSimulator
+from keyboard_simulator.tasks import build_plan
+
+_rng = random.Random(42)
+BASE = b"".join(f"option_{i} = {_rng.random()}\n".encode() for i in range(3000))
+
+needs_shell = pytest.mark.skipif(
+    not (shutil.which("bash") and shutil.which("sha256sum")), reason="需要 bash 与 sha256sum"
+)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        BASE,
+        BASE[:20000] + b"option_x = 1\n" + BASE[20000:],
+        BASE[:5000] + BASE[9000:],
+        b"header\n" + BASE.replace(b"option_17 ", b"option_seventeen "),
+        BASE[30000:] + BASE[:30000],
+        os.urandom(5000),
+        b"",
+    ],
+    ids=["same", "insert", "delete", "edits", "rotate", "unrelated", "empty"],
+)
+def test_delta_round_trips(data):
+    ops = compute_delta(BASE, data)
+    assert apply_delta(BASE, ops) == data
+
+
+def test_small_edit_is_mostly_copies():
+    data = BASE[:40000] + b"changed\n" + BASE[40050:]
+    ops = compute_delta(BASE, data)
+    assert sum(len(op.data) for op in ops if isinstance(op, Literal)) < 100
+    assert ops[0] == Copy(0, 40000)
+
+
+def _run(plan, *, stop_after=None):
+    clock = VirtualClock()
+    simulator = KeyboardSimulator(NullBackend(), clock=clock)
+    if stop_after is not None:
+        clock.call_at(stop_after, simulator.stop)
+    return simulator.run_plan(plan)
+
+
+@pytest.fixture
+def history(tmp_path):
+    return TransferHistory(tmp_path / "history")
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "app.conf"
+    path.write_bytes(BASE)
+    return path
+
+
+def _config(source, **kwargs):
+    options = dict(
+        file_path=source,
+        output_filename="app.conf",
+        delta_target="vm1",
+        delay_between_keystrokes=0.01,
+        countdown_before_start=0,
+    )
+    options.update(kwargs)
+    return FileConfig(**options)
+
+
+@needs_shell
+def test_second_transfer_types_a_patch_that_rebuilds_the_file(source, history, tmp_path):
+    first = build_plan(_config(source), history=history)
+    assert first.tasks[0].description.startswith("文件传输")
+    assert _run(first).status == "completed"
+    assert history.last_sent("vm1", "linux", "app.conf").read() == BASE
+
+    updated = BASE.replace(b"option_100 ", b"option_hundred ")
+    source.write_bytes(updated)
+    second = build_plan(_config(source), history=history)
+    task = second.tasks[0]
+    assert task.description.startswith("增量传输")
+    assert second.total_characters < len(updated) // 20
+
+    target = tmp_path / "target"
+    target.mkdir()
+    (target / "app.conf").write_bytes(BASE)
+    subprocess.run(["bash"], input=task.payload, text=True, cwd=target, check=True)
+    assert (target / "app.conf").read_bytes() == updated
+    assert sorted(p.name for p in target.iterdir()) == ["app.conf"]
+
+    assert _run(second).status == "completed"
+    assert history.last_sent("vm1", "linux", "app.conf").read() == updated
+
+
+@needs_shell
+def test_patch_leaves_an_unexpected_base_untouched(source, history, tmp_path):
+    history.record("vm1", "linux", "app.conf", BASE)
+    source.write_bytes(BASE + b"extra = 1\n")
+    script = build_plan(_config(source), history=history).tasks[0].payload
+
+    target = tmp_path / "target"
+    target.mkdir()
+    (target / "app.conf").write_bytes(b"something else\n")
+    result = subprocess.run(["bash"], input=script, text=True, cwd=target, capture_output=True)
+    assert PATCH_FAILED_MESSAGE in result.stderr
+    assert (target / "app.conf").read_bytes() == b"something else\n"
+
+
+def test_stopped_run_is_not_recorded(source, history):
+    plan = build_plan(_config(source, delay_between_keystrokes=0.1), history=history)
+    assert _run(plan, stop_after=1.0).status == "stopped"
+    assert history.last_sent("vm1", "linux", "app.conf") is None
+
+
+def test_falls_back_to_full_transfer_when_patch_is_not_shorter(source, history):
+    history.record("vm1", "linux", "app.conf", BASE)
+    source.write_bytes(os.urandom(20000))
+    plan = build_plan(_config(source), history=history)
+    assert plan.tasks[0].description.startswith("文件传输")
+    assert _run(plan).status == "completed"
+    assert history.last_sent("vm1", "linux", "app.conf").read() == source.read_bytes()
+
+
+def test_history_is_kept_per_target_and_output(source, history):
+    history.record("vm1", "linux", "app.conf", BASE)
+    source.write_bytes(BASE + b"x = 1\n")
+    assert build_plan(_config(source), history=history).tasks[0].description.startswith("增量")
+    for other in (
+        _config(source, delta_target="vm2"),
+        _config(source, output_filename="other.conf"),
+        _config(source, target_os="windows"),
+    ):
+        assert build_plan(other, history=history).tasks[0].description.startswith("文件传输")
+
+
+def _replay_windows_patch(script, base):
+    """Follow the cmd lines of a Windows patch and rebuild the file in Python."""
+
+    b64, ranges = "", []
+    lines = script.splitlines()
+    for line in lines:
+        if line.startswith("echo ") and "tmp.b64" in line:
+            b64 += line[len("echo ") :].partition(">")[0]
+        elif line.startswith("echo "):
+            ranges.extend(line[len("echo ") :].partition(">")[0].split())
+    literal = base64.b64decode(b64)
+    out = b""
+    for token in ranges:
+        source, offset, length = token.split(":")
+        chunk = base if source == "b" else literal
+        out += chunk[int(offset) : int(offset) + int(length)]
+    return out
+
+
+def test_windows_patch_runs_in_cmd():
+    data = BASE[:5000] + b"x = 1\n" + BASE[5000:] + b"y = 2\n"
+    script = windows_patch_script(BASE, data, compute_delta(BASE, data), "app.conf")
+    assert _replay_windows_patch(script, BASE) == data
+    assert "certutil -decode tmp.b64 app.conf.delta" in script
+    (command,) = [line for line in script.splitlines() if line.startswith("powershell")]
+    assert command.startswith('powershell -NoProfile -Command "') and command.endswith('"')
+    # cmd 会展开 % 并在引号处结束参数
+    assert "%" not in script and command.count('"') == 2
+    assert "WriteAllBytes" in command and PATCH_FAILED_MESSAGE in command
+    assert script.splitlines()[-1] == "del app.conf.delta app.conf.ranges"
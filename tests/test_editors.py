@@ -0,0 +1,132 @@
+"""Editor profiles for text mode."""
+
+import os
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from keyboard_simulator import config as cfg
+from keyboard_simulator.backends.pty import PtyBackend
+from keyboard_simulator.editors import PROFILES, get_profile
+from keyboard_simulator.simulator import KeyboardSimulator
+from keyboard_simulator.tasks import SimulationPlan, TypingTask, build_plan
+
+SOURCE = (
+    "def load(path):\n"
+    "    with open(path) as handle:\n"
+    "        data = json.load(handle)\n"
+    "\n"
+    "        return {\n"
+    "          'items': [x for x in data],\n"
+    "        }\n"
+    "  \n"
+    "items:\n"
+    "\t- name: a\n"
+    "\t  value: 1\n"
+    "done = True"
+)
+
+
+def _auto_indent_editor(keys, tab_stop=0):
+    """Type ``keys`` into a model of an editor that copies indentation on Enter.
+
+    A line holding nothing but its untouched automatic indentation is
+    emptied on Enter, and the next line gets that indentation again.
+    """
+
+    lines, untouched = [""], False
+    for key in keys:
+        line = lines[-1]
+        if key == "\n":
+            indent = line[: len(line) - len(line.lstrip(" \t"))]
+            if untouched:
+                lines[-1] = ""
+            lines.append(indent)
+            untouched = bool(indent)
+        elif key == "\b":
+            if tab_stop and line and not line.strip(" "):
+                lines[-1] = line[: (len(line) - 1) // tab_stop * tab_stop]
+            else:
+                lines[-1] = line[:-1]
+        else:
+            lines[-1] = line + key
+            untouched = False
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("name, tab_stop", [("nano", 0), ("vscode", 4)])
+def test_auto_indent_profiles_rebuild_the_source_with_fewer_keys(name, tab_stop):
+    keys = "".join(get_profile(name).rewrite([SOURCE[i : i + 7] for i in range(0, len(SOURCE), 7)]))
+    assert _auto_indent_editor(keys, tab_stop) == SOURCE
+    assert len(keys) < len(SOURCE)
+
+
+def test_plain_profile_and_plan_leave_text_unchanged(tmp_path):
+    assert "".join(PROFILES["plain"].rewrite([SOURCE])) == SOURCE
+    plan = build_plan(cfg.TextConfig(text_to_type=SOURCE))
+    assert plan.tasks[0].payload == SOURCE
+
+
+def test_streamed_text_file_is_rewritten(tmp_path):
+    path = tmp_path / "load.py"
+    path.write_text(SOURCE, encoding="utf-8")
+    plan = build_plan(cfg.TextConfig(text_file=path, editor="nano"))
+    assert "".join(plan.tasks[0].payload.chunks()) == "".join(get_profile("nano").rewrite([SOURCE]))
+    assert plan.tasks[0].description.endswith("[nano (set autoindent)]")
+
+
+def test_unknown_editor_is_rejected():
+    with pytest.raises(cfg.ConfigError):
+        cfg.from_dict({"mode": "text", "text_to_type": "x", "editor": "emacs"})
+    with pytest.raises(ValueError):
+        get_profile("emacs")
+
+
+@pytest.mark.skipif(not shutil.which("vim"), reason="需要 vim")
+def test_vim_profile_survives_auto_indent_and_auto_pairs(tmp_path):
+    (tmp_path / "vimrc").write_text(
+        "set nocompatible autoindent smartindent backspace=indent,eol,start\n"
+        "inoremap ( ()<Left>\ninoremap [ []<Left>\ninoremap { {}<Left>\n",
+        encoding="utf-8",
+    )
+    text = SOURCE.replace("\t", "    ") + "\n"
+    keys = build_plan(cfg.TextConfig(text_to_type=text, editor="vim")).tasks[0].payload
+    plan = SimulationPlan(0.0, 0, [TypingTask("vim", "i" + keys + "\x1b:wq\n")])
+
+    master, slave = os.openpty()
+    process = subprocess.Popen(
+        ["vim", "-u", "vimrc", "-n", "-i", "NONE", "out.py"],
+        stdin=slave,
+        stdout=slave,
+        stderr=slave,
+        cwd=tmp_path,
+        env={
+            "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+            "TERM": "dumb",
+            "HOME": str(tmp_path),
+        },
+        start_new_session=True,
+    )
+    os.close(slave)
+    drain = threading.Thread(target=_drain, args=(master,), daemon=True)
+    drain.start()
+    try:
+        KeyboardSimulator(PtyBackend(master)).run_plan(plan)
+        process.wait(timeout=10)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        os.close(master)
+    # vim 在文件末尾补一个换行
+    assert (tmp_path / "out.py").read_text(encoding="utf-8") == text + "\n"
+
+
+def _drain(fd):
+    try:
+        while os.read(fd, 65536):
+            pass
+    except OSError:
+        pass
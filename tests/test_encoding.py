@@ -16,3 +16,27 @@ def test_linux_script_trailing_newline(tmp_path):
     script = encoding.linux_reconstruction_script(encoded, "out.txt")
     assert script.endswith("\n")
     assert "base64 -d" in script
+
+
+def test_script_length_matches_generated_script():
+    encoded = "A" * 1500
+    for target, build in (
+        ("linux", encoding.linux_reconstruction_script),
+        ("windows", encoding.windows_reconstruction_script),
+    ):
+        expected = len(build(encoded, "out.bin"))
+        assert encoding.reconstruction_script_length(len(encoded), "out.bin", target) == expected
+
+
+def test_streamed_script_matches_full_script(tmp_path):
+    path = tmp_path / "data.bin"
+    for size in (1, 383, 384 * 64 + 1, 57 * 64 * 3 + 2):
+        data = bytes(index % 251 for index in range(size))
+        path.write_bytes(data)
+        encoded = base64.b64encode(data).decode()
+        for target, build in (
+            ("linux", encoding.linux_reconstruction_script),
+            ("windows", encoding.windows_reconstruction_script),
+        ):
+            streamed = "".join(encoding.iter_reconstruction_script(path, "out.bin", target))
+            assert streamed == build(encoded, "out.bin")
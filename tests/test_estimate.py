@@ -0,0 +1,96 @@
+"""Pre-run keystroke and wall time estimates."""
+
+import pytest
+
+from keyboard_simulator.config import FileConfig, TextConfig
+from keyboard_simulator.estimate import (
+    Calibration,
+    PayloadProfile,
+    encoding_variants,
+    estimate_config,
+    estimate_profile,
+    profile_config,
+    record_run,
+)
+from keyboard_simulator.backends.null import NullBackend
+from keyboard_simulator.simulator import KeyboardSimulator, RunStats
+from keyboard_simulator.tasks import build_plan
+
+
+def test_profile_counts_shifted_characters():
+    profile = PayloadProfile.from_chunks(["Hello, World!\n", "中文"])
+    assert profile.characters == 16
+    assert profile.shifted == 3
+    assert profile.newlines == 1
+
+
+def test_interception_pays_for_hold_and_shift():
+    profile = PayloadProfile(characters=100, shifted=20)
+    calibration = Calibration(overheads={"sendinput": 0.0, "interception": 0.0})
+
+    sendinput = estimate_profile(profile, "sendinput", 0.01, calibration=calibration)
+    interception = estimate_profile(profile, "interception", 0.01, calibration=calibration)
+
+    assert sendinput.seconds == pytest.approx(1.0)
+    assert sendinput.modifier_strokes == 0
+    assert interception.seconds == pytest.approx(1.0 + 1.0 + 0.2)
+    assert interception.modifier_strokes == 20
+    assert interception.key_events == 240
+
+
+def test_file_estimate_matches_plan(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(range(256)) * 40)
+    config = FileConfig(file_path=path, output_filename="data.bin", delay_between_keystrokes=0.0)
+
+    estimates = estimate_config(
+        config, delays=[0.0, 0.01], variants=encoding_variants(config), calibration=Calibration()
+    )
+
+    assert len(estimates) == 2 * 2 * 2
+    plain = [item for item in estimates if item.encoding == "Linux"]
+    assert plain[0].keystrokes == build_plan(config).total_characters
+    assert any(item.encoding == "Linux FEC 8+1" for item in estimates)
+
+
+def test_calibration_learns_overhead(tmp_path):
+    calibration = Calibration(path=tmp_path / "calibration.json")
+    config = TextConfig(text_to_type="a" * 100, delay_between_keystrokes=0.01)
+    profile = PayloadProfile.from_chunks(["a" * 100])
+    record_run(calibration, config, "sendinput", RunStats("completed", 100, 1.5, profile))
+    assert calibration.overhead("sendinput") == pytest.approx(0.005)
+
+    reloaded = Calibration.load(tmp_path / "calibration.json")
+    assert reloaded.overhead("sendinput") == pytest.approx(0.005)
+    assert profile_config(config).characters == 100
+
+
+def test_run_profile_is_collected_while_typing(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Hello\nWORLD\n" * 50, encoding="utf-8")
+    config = TextConfig(text_file=path, countdown_before_start=0, delay_between_keystrokes=0)
+    stats = KeyboardSimulator(NullBackend()).run_plan(build_plan(config))
+
+    assert stats.profile == profile_config(config)
+    # 校准只使用运行中统计的结果，不会重新读取或编码输入
+    path.unlink()
+    calibration = Calibration()
+    record_run(calibration, config, "sendinput", stats)
+    assert "sendinput" in calibration.overheads
+
+
+@pytest.mark.parametrize("extra", [[], ["--no-calibrate"]])
+def test_cli_calibrates_only_when_enabled(tmp_path, monkeypatch, extra):
+    from keyboard_simulator import cli, logging_config
+
+    monkeypatch.setattr(cli, "_create_backend", lambda name: NullBackend())
+    # main 会关闭全部日志，测试中保留 pytest 的日志配置
+    monkeypatch.setattr(logging_config, "disable_logging", lambda: None)
+    path = tmp_path / "calibration.json"
+    cli.main(
+        ["--text", "hello", "--delay", "0", "--countdown", "0", "--calibration", str(path)]
+        + extra
+    )
+    assert path.exists() == (not extra)
+    if not extra:
+        assert "sendinput" in Calibration.load(path).overheads
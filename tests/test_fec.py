@@ -0,0 +1,124 @@
+import base64
+import importlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+fec = importlib.import_module("keyboard_simulator.fec")
+
+DATA = bytes(range(256)) * 7 + b"tail"
+
+
+def _run_decoder(tmp_path, lines):
+    params = fec.FecParams(group_size=4, parity=2, block_size=30)
+    (tmp_path / "out.fec").write_text("\n".join(lines) + "\n", encoding="ascii")
+    (tmp_path / "dec.py").write_text(fec.python_decoder(len(DATA), params), encoding="ascii")
+    return subprocess.run(
+        [sys.executable, "dec.py", "out.fec", "out"], cwd=tmp_path, capture_output=True
+    )
+
+
+def test_decoder_repairs_damaged_lines(tmp_path):
+    params = fec.FecParams(group_size=4, parity=2, block_size=30)
+    lines = fec.fec_lines(DATA, params)
+    # One dropped character, one corrupted character (different residue
+    # classes of the first group), a lost line and two merged lines.
+    lines[0] = lines[0][:10] + lines[0][11:]
+    lines[1] = lines[1][:-3] + ("A" if lines[1][-3] != "A" else "B") + lines[1][-2:]
+    del lines[8]
+    lines[12:14] = [lines[12] + lines[13]]
+
+    result = _run_decoder(tmp_path, lines)
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / "out").read_bytes() == DATA
+
+
+def test_decoder_reports_unrecoverable_group(tmp_path):
+    params = fec.FecParams(group_size=4, parity=2, block_size=30)
+    lines = fec.fec_lines(DATA, params)
+    del lines[0:3:2]  # two losses in the same residue class
+
+    result = _run_decoder(tmp_path, lines)
+    assert result.returncode != 0
+    assert b"unrecoverable" in result.stderr
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="需要 bash")
+def test_linux_script_round_trip(tmp_path):
+    params = fec.FecParams(group_size=8, parity=1)
+    script = fec.linux_fec_script(DATA, "blob.bin", params)
+    env = dict(os.environ, PATH=os.path.dirname(sys.executable) + os.pathsep + os.environ["PATH"])
+    subprocess.run(["bash"], input=script.encode(), cwd=tmp_path, check=True, env=env)
+    assert (tmp_path / "blob.bin").read_bytes() == DATA
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["blob.bin"]
+
+
+def _replay_cmd(script):
+    """Follow the cmd lines of a Windows script; return its files and the commands it runs."""
+
+    files, commands = {}, []
+    for line in script.splitlines():
+        echo = re.fullmatch(r"echo ([0-9A-Za-z+/=]+)(>>?)(\S+)", line)
+        if echo:
+            text, redirect, name = echo.groups()
+            files[name] = (files.get(name, "") if redirect == ">>" else "") + text + "\n"
+        elif line.startswith("if exist "):
+            assert line == f"if exist {line.split()[2]} del {line.split()[2]}"
+            files.pop(line.split()[2], None)
+        elif line.startswith("certutil -decode "):
+            source, target = line.split()[2:]
+            assert target not in files
+            files[target] = base64.b64decode(files[source].replace("\n", "")).decode("ascii")
+        elif line.startswith("del "):
+            for name in line.split()[1:]:
+                del files[name]
+        else:
+            commands.append(line)
+    return files, commands
+
+
+def test_windows_script_is_typed_into_cmd():
+    params = fec.FecParams(group_size=4, parity=2, block_size=30)
+    files, commands = _replay_cmd(fec.windows_fec_script(DATA, "blob.bin", params))
+
+    assert files["blob.bin.fec"].splitlines() == fec.fec_lines(DATA, params)
+    assert files["blob.bin.fecdec.ps1"] == fec.powershell_decoder(len(DATA), params)
+    assert commands == [
+        "powershell -NoProfile -ExecutionPolicy Bypass -File blob.bin.fecdec.ps1 "
+        "blob.bin.fec blob.bin && del blob.bin.fec blob.bin.fecdec.ps1"
+    ]
+
+
+def test_powershell_decoder_structure():
+    decoder = fec.powershell_decoder(len(DATA), fec.FecParams(group_size=4, parity=2))
+    # PowerShell 变量名不区分大小写，同名不同写法的变量会互相覆盖
+    spellings = {}
+    for name in re.findall(r"\$(\w+)", decoder):
+        spellings.setdefault(name.lower(), set()).add(name)
+    assert all(len(names) == 1 for names in spellings.values()), spellings
+    assert decoder.count("{") == decoder.count("}")
+    assert decoder.count("(") == decoder.count(")")
+    assert "$K,$R,$B,$N,$S,$W=4,2,57," in decoder
+
+
+@pytest.mark.skipif(shutil.which("pwsh") is None, reason="需要 PowerShell")
+def test_powershell_decoder_repairs_damaged_lines(tmp_path):
+    params = fec.FecParams(group_size=4, parity=2, block_size=30)
+    lines = fec.fec_lines(DATA, params)
+    lines[0] = lines[0][:10] + lines[0][11:]
+    del lines[8]
+    (tmp_path / "out.fec").write_text("\n".join(lines) + "\n", encoding="ascii")
+    (tmp_path / "dec.ps1").write_text(fec.powershell_decoder(len(DATA), params), encoding="ascii")
+    subprocess.run(
+        ["pwsh", "-NoProfile", "-File", "dec.ps1", "out.fec", "out"], cwd=tmp_path, check=True
+    )
+    assert (tmp_path / "out").read_bytes() == DATA
+
+
+def test_params_validation():
+    with pytest.raises(ValueError):
+        fec.FecParams(group_size=2, parity=3)
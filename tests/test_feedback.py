@@ -0,0 +1,168 @@
+"""Closed-loop typing against a local pseudo-terminal."""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from keyboard_simulator.backends.pty import PtyBackend
+from keyboard_simulator.feedback import (
+    AIMDRateController,
+    EchoTracker,
+    EchoVerifier,
+    FdFeedbackChannel,
+)
+from keyboard_simulator.metrics import KeystrokeMetrics
+from keyboard_simulator.simulator import KeyboardSimulator
+from keyboard_simulator.tasks import SimulationPlan, TypingTask
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="需要 POSIX 伪终端")
+
+
+class LossyPtyBackend(PtyBackend):
+    """Drops selected keystrokes, like a congested VM console."""
+
+    def __init__(self, master_fd, drop_at):
+        super().__init__(master_fd)
+        self.drop_at = set(drop_at)
+        self.sent = 0
+
+    def type_character(self, char, delay):
+        self.sent += 1
+        if self.sent in self.drop_at:
+            return
+        super().type_character(char, delay)
+
+
+@pytest.fixture
+def pty_pair():
+    master, slave = os.openpty()
+    received = []
+
+    def drain():
+        while True:
+            try:
+                data = os.read(slave, 4096)
+            except OSError:
+                return
+            if not data:
+                return
+            received.append(data)
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    yield master, received
+    os.close(master)
+    os.close(slave)
+
+
+@pytest.fixture
+def shell_pty():
+    """A pty whose far side prints a prompt a moment after every line, like a shell."""
+
+    master, slave = os.openpty()
+    os.write(slave, b"$ ")
+
+    def respond():
+        while True:
+            try:
+                data = os.read(slave, 4096)
+            except OSError:
+                return
+            if not data:
+                return
+            for _ in range(data.count(b"\n")):
+                time.sleep(0.02)
+                os.write(slave, b"output\r\n$ ")
+
+    reader = threading.Thread(target=respond, daemon=True)
+    reader.start()
+    yield master
+    os.close(master)
+    os.close(slave)
+
+
+def _plan(text):
+    return SimulationPlan(
+        delay_between_keystrokes=0.0,
+        countdown_before_start=0,
+        tasks=[TypingTask(description="test", payload=text)],
+    )
+
+
+def _verifier(master):
+    return EchoVerifier(FdFeedbackChannel(master), echo_timeout=1.0, stall_timeout=0.2)
+
+
+def test_echo_tracker_handles_erase_sequences():
+    tracker = EchoTracker()
+    tracker.feed("$ echo abx\b \bc")
+    assert tracker.text == "$ echo abc"
+    tracker.feed("\r\n$ ")
+    assert tracker.text == "$ "
+
+
+def test_aimd_controller_speeds_up_and_backs_off():
+    controller = AIMDRateController(delay=0.01, min_delay=0.0, max_delay=0.1, additive_step=0.004)
+    controller.on_success()
+    controller.on_success()
+    assert controller.delay == pytest.approx(0.002)
+    controller.on_mismatch()
+    assert controller.delay == pytest.approx(0.01)
+    for _ in range(10):
+        controller.on_mismatch()
+    assert controller.delay == 0.1
+
+
+def test_verified_typing_over_pty(pty_pair):
+    master, received = pty_pair
+    controller = AIMDRateController(delay=0.002, additive_step=0.001)
+    simulator = KeyboardSimulator(
+        PtyBackend(master), verifier=_verifier(master), rate_controller=controller
+    )
+    simulator.run_plan(_plan("echo hello\nls -la\n"))
+
+    assert controller.mismatches == 0
+    assert controller.successes == 2
+    assert controller.delay == 0.0
+
+
+def test_next_line_waits_for_the_prompt(shell_pty):
+    controller = AIMDRateController(delay=0.0)
+    metrics = KeystrokeMetrics()
+    simulator = KeyboardSimulator(
+        PtyBackend(shell_pty),
+        verifier=_verifier(shell_pty),
+        rate_controller=controller,
+        metrics=metrics,
+    )
+    stats = simulator.run_plan(_plan("echo one\necho two\necho three\n"))
+
+    assert stats.status == "completed"
+    assert controller.mismatches == 0
+    assert controller.successes == 3
+    assert metrics.keys == stats.characters == 29
+
+
+def test_dropped_keystroke_is_retyped(pty_pair):
+    master, received = pty_pair
+    controller = AIMDRateController(delay=0.0, additive_step=0.001, backoff_floor=0.002)
+    backend = LossyPtyBackend(master, drop_at={3})
+    metrics = KeystrokeMetrics()
+    simulator = KeyboardSimulator(
+        backend, verifier=_verifier(master), rate_controller=controller, metrics=metrics
+    )
+    stats = simulator.run_plan(_plan("abcdef\n"))
+
+    assert controller.mismatches == 1
+    # 第一次输入的 6 个字符和 6 次退格不计入进度
+    assert stats.characters == metrics.keys == simulator.progress.characters == 7
+    assert metrics.retyped == 12
+    assert controller.delay > 0
+    for _ in range(50):
+        if b"\n" in b"".join(received):
+            break
+        time.sleep(0.01)
+    assert b"".join(received) == b"abcdef\n"
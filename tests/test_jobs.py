@@ -0,0 +1,157 @@
+import importlib
+import json
+from pathlib import Path
+
+import pytest
+
+jobs = importlib.import_module("keyboard_simulator.jobs")
+config = importlib.import_module("keyboard_simulator.config")
+base = importlib.import_module("keyboard_simulator.backends.base")
+simulator = importlib.import_module("keyboard_simulator.simulator")
+
+
+class RecordingBackend(base.AbstractKeyboardBackend):
+    def __init__(self):
+        self.starts = 0
+        self.stops = 0
+        self.typed = []
+
+    def start(self):
+        self.starts += 1
+
+    def stop(self):
+        self.stops += 1
+
+    def type_character(self, char, delay):
+        self.typed.append(char)
+
+    def press_return(self, delay):
+        self.typed.append("\n")
+
+
+def test_manifest_defaults_and_names(tmp_path: Path):
+    (tmp_path / "a.txt").write_text("hi", encoding="utf-8")
+    manifest = {
+        "defaults": {"countdown_before_start": 0, "delay_between_keystrokes": 0},
+        "jobs": [
+            {"name": "greeting", "mode": "text", "text_to_type": "hello"},
+            {
+                "mode": "file",
+                "file_path": "a.txt",
+                "output_filename": "a.txt",
+                "target_os": "windows",
+            },
+        ],
+    }
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps(manifest), encoding="utf-8")
+
+    loaded = jobs.load_manifest(path)
+    assert [job.name for job in loaded] == ["greeting", "job-2"]
+    assert loaded[1].config.file_path == (tmp_path / "a.txt").resolve()
+    assert loaded[1].config.target_os == "windows"
+    assert loaded[0].config.countdown_before_start == 0
+
+
+def test_manifest_rejects_empty_job_list():
+    with pytest.raises(config.ConfigError):
+        jobs.parse_manifest({"jobs": []})
+
+
+def test_runner_uses_single_backend_session(tmp_path: Path):
+    missing = tmp_path / "gone.txt"
+    missing.write_text("x", encoding="utf-8")
+    immediate = {"countdown_before_start": 0, "delay_between_keystrokes": 0}
+    manifest = [
+        {"mode": "text", "text_to_type": "abc", **immediate},
+        {"mode": "file", "file_path": str(missing), "output_filename": "gone.txt", **immediate},
+        {"mode": "text", "text_to_type": "de", **immediate},
+    ]
+    parsed = jobs.parse_manifest(manifest)
+    missing.unlink()
+
+    backend = RecordingBackend()
+    finished = []
+    runner = jobs.JobRunner(
+        simulator.KeyboardSimulator(backend),
+        on_finished=lambda job, stats: finished.append((job.name, stats.profile.characters)),
+    )
+    report = runner.run(parsed)
+
+    assert finished == [("job-1", 3), ("job-3", 2)]
+    assert backend.starts == 1 and backend.stops == 1
+    assert "".join(backend.typed) == "abcde"
+    assert [r.status for r in report.results] == ["completed", "failed", "completed"]
+    assert report.total_characters == 5
+    assert not report.succeeded
+    assert report.to_dict()["jobs"][0]["characters"] == 3
+    assert "job-2" in report.format()
+
+
+def test_stop_between_jobs_skips_the_rest():
+    immediate = {"countdown_before_start": 0, "delay_between_keystrokes": 0}
+    parsed = jobs.parse_manifest(
+        [{"mode": "text", "text_to_type": text, **immediate} for text in ("ab", "cd", "ef")]
+    )
+    backend = RecordingBackend()
+    # 第一个任务结束后、下一个任务开始前请求停止
+    hooks = simulator.SimulatorHooks(
+        on_status=lambda status: status == "completed" and runner.stop()
+    )
+    runner = jobs.JobRunner(simulator.KeyboardSimulator(backend, hooks))
+    report = runner.run(parsed)
+
+    assert "".join(backend.typed) == "ab"
+    assert [r.status for r in report.results] == ["completed", "skipped", "skipped"]
+
+
+def test_unexpected_build_error_fails_only_that_job(monkeypatch):
+    build_plan = jobs.build_plan
+
+    def flaky_build(config, **kwargs):
+        if config.text_to_type == "boom":
+            raise RuntimeError("意外错误")
+        return build_plan(config, **kwargs)
+
+    monkeypatch.setattr(jobs, "build_plan", flaky_build)
+    immediate = {"countdown_before_start": 0, "delay_between_keystrokes": 0}
+    parsed = jobs.parse_manifest(
+        [{"mode": "text", "text_to_type": text, **immediate} for text in ("ab", "boom", "cd")]
+    )
+    backend = RecordingBackend()
+    report = jobs.JobRunner(simulator.KeyboardSimulator(backend)).run(parsed)
+
+    assert "".join(backend.typed) == "abcd"
+    assert [r.status for r in report.results] == ["completed", "failed", "completed"]
+    assert report.results[1].error == "意外错误"
+
+
+def test_stopped_batch_closes_plans_built_ahead(tmp_path: Path, monkeypatch):
+    build_plan = jobs.build_plan
+    built = []
+
+    def recording_build(config, **kwargs):
+        plan = build_plan(config, **kwargs)
+        built.append(plan)
+        return plan
+
+    monkeypatch.setattr(jobs, "build_plan", recording_build)
+    (tmp_path / "next.txt").write_text("streamed", encoding="utf-8")
+    immediate = {"countdown_before_start": 0, "delay_between_keystrokes": 0}
+    parsed = jobs.parse_manifest(
+        [
+            # 输入第一个任务期间，下一个任务的计划已经构建完毕
+            {"mode": "text", "text_to_type": "ab", **immediate, "delay_between_keystrokes": 0.1},
+            {"mode": "text", "text_file": str(tmp_path / "next.txt"), **immediate},
+        ]
+    )
+    backend = RecordingBackend()
+    hooks = simulator.SimulatorHooks(
+        on_status=lambda status: status == "completed" and runner.stop()
+    )
+    runner = jobs.JobRunner(simulator.KeyboardSimulator(backend, hooks))
+    report = runner.run(parsed)
+
+    assert [r.status for r in report.results] == ["completed", "skipped"]
+    streams = [stream for plan in built for stream in plan.streams]
+    assert streams and all(stream.closed for stream in streams)
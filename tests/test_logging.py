@@ -0,0 +1,98 @@
+"""Queue-based logging with rotation, level gates and a JSON Lines run log."""
+
+import json
+import logging
+import queue
+import threading
+
+import pytest
+
+from keyboard_simulator import logging_config
+from keyboard_simulator.logging_config import (
+    DroppingQueueHandler,
+    disable_logging,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+@pytest.fixture(autouse=True)
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    disable_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_records_are_written_by_the_listener_and_rotated(tmp_path):
+    run_log = tmp_path / "run.jsonl"
+    setup_logging(
+        "DEBUG", tmp_path / "logs", max_bytes=2000, backup_count=2, run_log=run_log, console=False
+    )
+    logger = logging.getLogger("keyboard_simulator.tests")
+    writer = threading.Thread(
+        target=lambda: [logger.info("第 %d 条", index) for index in range(200)], name="typing"
+    )
+    writer.start()
+    writer.join()
+    logger.info("运行结束", extra={"event": "run_finished", "characters": 42})
+    shutdown_logging()
+
+    logs = tmp_path / "logs"
+    assert sorted(path.name for path in logs.iterdir()) == [
+        "keyboard_simulator.log",
+        "keyboard_simulator.log.1",
+        "keyboard_simulator.log.2",
+    ]
+    assert all(path.stat().st_size <= 2000 for path in logs.iterdir())
+    assert "运行结束" in (logs / "keyboard_simulator.log").read_text(encoding="utf-8")
+
+    entries = [json.loads(line) for line in run_log.read_text(encoding="utf-8").splitlines()]
+    assert entries[-1]["event"] == "run_finished"
+    assert entries[-1]["characters"] == 42
+    assert entries[-1]["message"] == "运行结束"
+    assert any(entry["thread"] == "typing" for entry in entries)
+
+
+def test_hot_path_modules_are_gated(tmp_path):
+    setup_logging("DEBUG", tmp_path, console=False)
+    assert not _enabled("keyboard_simulator.simulator", logging.DEBUG)
+    assert not _enabled("keyboard_simulator.backends.sendinput", logging.DEBUG)
+    assert _enabled("keyboard_simulator.tasks", logging.DEBUG)
+
+    setup_logging(
+        "WARNING", tmp_path, console=False, levels={"keyboard_simulator.backends": "DEBUG"}
+    )
+    assert not _enabled("keyboard_simulator.simulator", logging.INFO)
+    assert _enabled("keyboard_simulator.backends.pty", logging.DEBUG)
+
+    disable_logging()
+    assert not _enabled("keyboard_simulator.backends", logging.CRITICAL)
+
+
+def _enabled(name, level):
+    return logging.getLogger(name).isEnabledFor(level)
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path, monkeypatch):
+    handler = DroppingQueueHandler(queue.Queue(1))
+    record = logging.makeLogRecord({"msg": "%s", "args": ({"a": 1},)})
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().msg == "{'a': 1}"
+
+    monkeypatch.setattr(logging_config, "QUEUE_SIZE", 4)
+    setup_logging("INFO", tmp_path, console=False)
+    gate = threading.Event()
+    # 阻塞监听线程，使队列填满
+    logging_config._listener.handlers[0].emit = lambda record: gate.wait()
+    logger = logging.getLogger("keyboard_simulator.tests")
+    for index in range(50):
+        logger.info("%d", index)
+    dropped = logging_config._queue_handler.dropped
+    gate.set()
+    shutdown_logging()
+    assert dropped >= 40
@@ -0,0 +1,82 @@
+"""Keystroke latency histograms and their export."""
+
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from keyboard_simulator.metrics import Histogram, KeystrokeMetrics, MetricsExporter
+from keyboard_simulator.simulator import KeyboardSimulator
+from keyboard_simulator.tasks import SimulationPlan, TypingTask
+
+
+def _plan(text, delay=0.0):
+    return SimulationPlan(
+        delay_between_keystrokes=delay,
+        countdown_before_start=0,
+        tasks=[TypingTask(description="test", payload=text)],
+    )
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    histogram = Histogram()
+    for _ in range(98):
+        histogram.observe(1_500)  # 1.5 µs -> 2 µs 桶
+    histogram.observe(3_000_000)
+    histogram.observe(4_000_000)
+
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == 2_000
+    assert histogram.quantile(0.99) == 4_000_000
+    assert histogram.max_ns == 4_000_000
+
+
+def test_sampling_times_every_nth_key():
+    metrics = KeystrokeMetrics(sample_every=4)
+    KeyboardSimulator(MagicMock(), metrics=metrics).run_plan(_plan("x" * 20, delay=0.001))
+
+    assert metrics.keys == 20
+    assert metrics.keystroke.count == 5
+    assert metrics.overshoot.count == 5
+    assert metrics.keys_per_second > 0
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="需要 POSIX 伪终端")
+def test_backend_send_latency_is_recorded():
+    from keyboard_simulator.backends.pty import PtyBackend
+
+    master, slave = os.openpty()
+    try:
+        metrics = KeystrokeMetrics()
+        backend = PtyBackend(master)
+        KeyboardSimulator(backend, metrics=metrics).run_plan(_plan("abc"))
+    finally:
+        os.close(master)
+        os.close(slave)
+
+    assert metrics.send.count == 3
+    assert backend.metrics is None
+
+
+def test_exporter_writes_json_and_prometheus(tmp_path):
+    metrics = KeystrokeMetrics()
+    metrics.keys = 12_345_678
+    metrics.pause_ns = 1_234_567_891
+    metrics.send.observe(50_000)
+    json_path = tmp_path / "metrics.json"
+    prom_path = tmp_path / "metrics.prom"
+    with MetricsExporter(metrics, json_path=json_path, prometheus_path=prom_path, interval=None):
+        pass
+
+    data = json.loads(json_path.read_text(encoding="utf-8"))
+    assert data["keys"] == 12_345_678
+    assert data["histograms"]["send"]["p50_seconds"] == pytest.approx(5e-5)
+    prom = prom_path.read_text(encoding="utf-8")
+    assert "# TYPE keyboard_simulator_send_seconds histogram" in prom
+    assert 'keyboard_simulator_send_seconds_bucket{le="+Inf"} 1' in prom
+    # 计数保持完整精度，不使用 1.23457e+07 之类的科学计数法
+    assert "keyboard_simulator_keys_total 12345678\n" in prom
+    assert "keyboard_simulator_pause_seconds_total 1.234567891\n" in prom
+    assert 'keyboard_simulator_send_seconds_bucket{le="5e-05"} 1' in prom
@@ -0,0 +1,66 @@
+"""Background plan building used by the GUIs."""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from keyboard_simulator.config import FileConfig, TextConfig
+from keyboard_simulator.planner import PlanWorker
+from keyboard_simulator.tasks import PlanCancelled, build_plan
+
+
+def _wait_for_result(worker, timeout=5.0):
+    events = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        events.extend(worker.poll())
+        if events and events[-1][0] != "progress":
+            return events
+        time.sleep(0.01)
+    raise AssertionError("plan worker did not finish")
+
+
+def test_worker_reports_progress_then_plan(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"x" * 3000)
+    worker = PlanWorker(FileConfig(file_path=path, output_filename="data.bin", fec_group_size=4))
+    worker.start()
+    events = _wait_for_result(worker)
+
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "done"
+    progress = [value for kind, value in events if kind == "progress"]
+    assert progress[-1].bytes_done == 3000
+    assert progress[-1].estimated_keystrokes == events[-1][1].total_characters
+
+
+def test_worker_reports_errors():
+    worker = PlanWorker(FileConfig(file_path=Path("missing.bin")))
+    worker.start()
+    kind, error = _wait_for_result(worker)[-1]
+    assert kind == "error"
+    assert isinstance(error, OSError)
+
+
+def test_cancelled_build_raises(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"x" * 10)
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(PlanCancelled):
+        build_plan(FileConfig(file_path=path, fec_group_size=4), cancel_event=cancel)
+
+    worker = PlanWorker(FileConfig(file_path=path, fec_group_size=4))
+    worker.cancel()
+    worker.start()
+    assert _wait_for_result(worker)[-1] == ("cancelled", None)
+
+
+def test_text_plan_via_worker():
+    worker = PlanWorker(TextConfig(text_to_type="abc"))
+    worker.start()
+    kind, plan = _wait_for_result(worker)[-1]
+    assert kind == "done"
+    assert plan.total_characters == 3
@@ -0,0 +1,52 @@
+"""Coalesced progress snapshots."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from keyboard_simulator.progress import ProgressMeter, ProgressSnapshot, format_progress
+from keyboard_simulator.simulator import KeyboardSimulator, SimulatorHooks
+from keyboard_simulator.tasks import SimulationPlan, TypingTask
+
+
+def test_meter_coalesces_updates():
+    published = []
+    meter = ProgressMeter(total=100_000, interval=60.0, callback=published.append)
+    for _ in range(100_000):
+        meter.advance()
+    assert published == []
+    assert meter.snapshot.characters == 0
+
+    final = meter.finish()
+    assert published == [final]
+    assert final.characters == 100_000
+    assert final.fraction == 1.0
+    assert final.eta == 0
+
+
+def test_snapshot_formatting():
+    snapshot = ProgressSnapshot(characters=1200, total=5000, rate=80.0, eta=47.5)
+    assert format_progress(snapshot) == "1,200/5,000 字符 · 80.0 字符/秒 · 剩余 48 秒"
+    assert ProgressSnapshot(characters=3).fraction is None
+
+
+def test_simulator_throttles_progress_hook():
+    published = []
+    simulator = KeyboardSimulator(
+        MagicMock(),
+        SimulatorHooks(on_progress=published.append),
+        progress_interval=0.05,
+    )
+    plan = SimulationPlan(
+        delay_between_keystrokes=0.001,
+        countdown_before_start=0,
+        tasks=[TypingTask(description="test", payload="x" * 200)],
+    )
+    stats = simulator.run_plan(plan)
+
+    # 每个字符至少等待 1 ms，按 20 Hz 合并后回调次数远少于字符数
+    assert len(published) <= stats.elapsed / 0.05 + 2
+    assert published[-1] is simulator.progress
+    assert simulator.progress.characters == 200
+    assert simulator.progress.total == 200
+    assert published[-1].rate == pytest.approx(200 / stats.elapsed, rel=0.5)
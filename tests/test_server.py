@@ -0,0 +1,223 @@
+import importlib
+import json
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+server = importlib.import_module("keyboard_simulator.server")
+base = importlib.import_module("keyboard_simulator.backends.base")
+simulator_module = importlib.import_module("keyboard_simulator.simulator")
+
+TOKEN = "secret-token"
+
+
+class RecordingBackend(base.AbstractKeyboardBackend):
+    instances = []
+
+    def __init__(self):
+        self.typed = []
+        self.starts = 0
+        RecordingBackend.instances.append(self)
+
+    def start(self):
+        self.starts += 1
+
+    def type_character(self, char, delay):
+        self.typed.append(char)
+
+    def press_return(self, delay):
+        self.typed.append("\n")
+
+
+def _text_job(text, delay=0.0):
+    return {
+        "mode": "text",
+        "text_to_type": text,
+        "countdown_before_start": 0,
+        "delay_between_keystrokes": delay,
+    }
+
+
+def _backend_factory(name):
+    if name == "broken":
+        raise base.BackendError("驱动未安装")
+    return RecordingBackend()
+
+
+@pytest.fixture
+def service():
+    RecordingBackend.instances.clear()
+    svc = server.SimulatorService(
+        _backend_factory, progress_interval=0.02, backends=("sendinput", "broken")
+    )
+    yield svc
+    svc.shutdown()
+
+
+@pytest.fixture
+def endpoint(service):
+    srv = server.create_server(service, port=0, token=TOKEN)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    service.start()
+    yield srv.server_address
+    srv.shutdown()
+    srv.server_close()
+
+
+def _request(address, message, token=TOKEN):
+    if token is not None:
+        message = {**message, "token": token}
+    conn = socket.create_connection(address, timeout=5)
+    conn.sendall(json.dumps(message).encode() + b"\n")
+    return conn, conn.makefile("r", encoding="utf-8")
+
+
+def test_priorities_and_warm_backend(service):
+    low = service.submit(_text_job("low"), priority=0)
+    service.submit(_text_job("high"), priority=5)
+    held = service.submit(_text_job("held"), priority=9)
+    service.pause(held.job_id)
+    cancelled = service.submit(_text_job("never"))
+    service.stop(cancelled.job_id)
+
+    events = service.subscribe(low.job_id)
+    service.start()
+    while events.get(timeout=5)["event"] != "finished":
+        pass
+
+    backend = RecordingBackend.instances[0]
+    assert "".join(backend.typed) == "highlow"
+    assert len(RecordingBackend.instances) == 1 and backend.starts == 1
+    assert cancelled.state == "cancelled"
+    assert held.state == "queued" and held.held
+
+    events = service.subscribe(held.job_id)
+    service.resume(held.job_id)
+    while events.get(timeout=5)["event"] != "finished":
+        pass
+    assert "".join(backend.typed) == "highlowheld"
+
+
+def test_submit_streams_ndjson_progress(endpoint):
+    conn, reader = _request(
+        endpoint, {"op": "submit", "job": _text_job("x" * 20, 0.005), "follow": True}
+    )
+    events = []
+    with conn:
+        for line in reader:
+            events.append(json.loads(line))
+            if events[-1]["event"] == "finished":
+                break
+
+    kinds = [event["event"] for event in events]
+    assert kinds[0] == "accepted"
+    assert "progress" in kinds
+    metrics = next(event for event in events if event["event"] == "metrics")
+    assert metrics["characters"] == 20
+    assert events[-1]["state"] == "completed"
+
+
+def test_control_unknown_job_reports_error(endpoint):
+    conn, reader = _request(endpoint, {"op": "pause", "job_id": "job-404"})
+    with conn:
+        reply = json.loads(reader.readline())
+    assert reply == {"event": "error", "error": "未知的任务: job-404"}
+
+
+def test_backend_errors_fail_the_job_and_the_worker_continues(service):
+    with pytest.raises(ValueError):
+        service.submit(_text_job("x"), backend="bogus")
+    broken = service.submit(_text_job("lost"), backend="broken")
+    after = service.submit(_text_job("next"))
+    events = service.subscribe(after.job_id)
+    service.start()
+    while events.get(timeout=5)["event"] != "finished":
+        pass
+
+    assert broken.state == "failed" and broken.error == "驱动未安装"
+    assert after.state == "completed"
+    assert "".join(RecordingBackend.instances[0].typed) == "next"
+
+
+@pytest.mark.parametrize("priority", [[1], {"a": 1}, "5", True])
+def test_submit_rejects_non_integer_priority(endpoint, priority):
+    conn, reader = _request(endpoint, {"op": "submit", "job": _text_job("x"), "priority": priority})
+    with conn:
+        reply = json.loads(reader.readline())
+    assert reply == {"event": "error", "error": "'priority' 必须是整数"}
+
+
+def test_http_requests_are_rejected_before_the_body(endpoint, service):
+    body = json.dumps({"op": "submit", "job": _text_job("pwned"), "token": TOKEN})
+    request = (
+        "POST / HTTP/1.1\r\nHost: 127.0.0.1:8765\r\nContent-Type: text/plain\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n{body}\n"
+    )
+    conn = socket.create_connection(endpoint, timeout=5)
+    conn.sendall(request.encode())
+    with conn, conn.makefile("r", encoding="utf-8") as reader:
+        assert json.loads(reader.readline()) == {"event": "error", "error": "不接受 HTTP 请求"}
+        assert reader.readline() == ""
+    assert service.jobs() == []
+
+
+@pytest.mark.parametrize("token", [None, "wrong"])
+def test_requests_without_the_token_are_rejected(endpoint, service, token):
+    conn, reader = _request(endpoint, {"op": "submit", "job": _text_job("x")}, token=token)
+    with conn:
+        assert json.loads(reader.readline()) == {"event": "error", "error": "令牌无效"}
+        assert reader.readline() == ""
+    assert service.jobs() == []
+
+
+def test_malformed_line_closes_the_connection(endpoint, service):
+    conn = socket.create_connection(endpoint, timeout=5)
+    line = json.dumps({"op": "submit", "job": _text_job("x"), "token": TOKEN})
+    conn.sendall(b"not json\n" + line.encode() + b"\n")
+    with conn, conn.makefile("r", encoding="utf-8") as reader:
+        assert json.loads(reader.readline())["event"] == "error"
+        assert reader.readline() == ""
+    assert service.jobs() == []
+
+
+@pytest.mark.skipif(server.UnixServiceServer is None, reason="Unix sockets only")
+def test_unix_socket_is_private(service, tmp_path):
+    path = tmp_path / "ksim.sock"
+    srv = server.create_server(service, socket_path=path)
+    try:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    finally:
+        srv.server_close()
+
+
+def test_write_token_is_private(tmp_path):
+    path = tmp_path / "state" / "serve.token"
+    token = server.write_token(path)
+    assert path.read_text().strip() == token and len(token) == 32
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_stop_before_the_run_starts_is_not_lost(service, monkeypatch):
+    published, proceed = threading.Event(), threading.Event()
+
+    class SlowStart(simulator_module.KeyboardSimulator):
+        def run_plan(self, plan):
+            published.set()
+            assert proceed.wait(5)
+            return super().run_plan(plan)
+
+    monkeypatch.setattr(server, "KeyboardSimulator", SlowStart)
+    job = service.submit(_text_job("never typed"))
+    events = service.subscribe(job.job_id)
+    service.start()
+    assert published.wait(5)
+    service.stop(job.job_id)
+    proceed.set()
+    while events.get(timeout=5)["event"] != "finished":
+        pass
+    assert job.state == "stopped"
+    assert RecordingBackend.instances[0].typed == []
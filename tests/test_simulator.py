@@ -7,6 +7,8 @@ from unittest.mock import MagicMock, call
 import pytest
 
 # Since we are in tests/, we need to adjust the path to import from src/
+from keyboard_simulator.backends.null import NullBackend
+from keyboard_simulator.clock import VirtualClock
 from keyboard_simulator.simulator import KeyboardSimulator, SimulatorHooks
 from keyboard_simulator.tasks import SimulationPlan, TypingTask
 
@@ -50,52 +52,48 @@ def test_stop_event_terminates_execution(mock_backend):
     # A long payload to ensure we can stop it mid-execution
     task = TypingTask(description="long task", payload="abcdefghijklmnopqrstuvwxyz")
     plan = SimulationPlan(delay_between_keystrokes=0.1, countdown_before_start=0, tasks=[task])
-    simulator = KeyboardSimulator(backend=mock_backend)
+    clock = VirtualClock()
+    simulator = KeyboardSimulator(backend=mock_backend, clock=clock)
 
-    def stop_later():
-        # Let a few characters be typed, then stop
-        time.sleep(0.25)
-        simulator.stop()
+    # Let two characters be typed (t=0.1, t=0.2), then stop while waiting
+    clock.call_at(0.25, simulator.stop)
+    stats = simulator.run_plan(plan)
 
-    # Run simulation in a separate thread
-    simulation_thread = threading.Thread(target=simulator.run_plan, args=(plan,))
-    stopper_thread = threading.Thread(target=stop_later)
+    assert stats.status == "stopped"
+    assert mock_backend.type_character.call_count == 2
+    assert clock.now() == 0.25
 
-    simulation_thread.start()
-    stopper_thread.start()
 
+def test_stop_from_another_thread(mock_backend):
+    """A real-time stop request interrupts the pacing wait."""
+    task = TypingTask(description="long task", payload="abcdefghijklmnopqrstuvwxyz")
+    plan = SimulationPlan(delay_between_keystrokes=0.1, countdown_before_start=0, tasks=[task])
+    simulator = KeyboardSimulator(backend=mock_backend)
+
+    simulation_thread = threading.Thread(target=simulator.run_plan, args=(plan,))
+    simulation_thread.start()
+    time.sleep(0.25)
+    simulator.stop()
     simulation_thread.join(timeout=2)
-    stopper_thread.join()
 
-    # The simulation should have stopped after a few characters, not completed the whole alphabet
     assert mock_backend.type_character.call_count < 10
     assert not simulation_thread.is_alive()
 
 
-def test_pause_and_resume(mock_backend, simple_plan):
+def test_pause_and_resume(simple_plan):
     """Test that pause and resume control the flow of execution."""
-    simulator = KeyboardSimulator(backend=mock_backend)
-    
-    # Use a thread to run the plan
-    simulation_thread = threading.Thread(target=simulator.run_plan, args=(simple_plan,))
-    
-    # Start the simulation
-    simulation_thread.start()
-    
-    # Immediately pause
-    simulator.pause()
-    time.sleep(0.2) # Give it time to process the pause
-    
-    # At this point, no characters should have been typed
-    assert mock_backend.type_character.call_count == 0
-    
-    # Resume the simulation
-    simulator.resume()
-    time.sleep(0.2) # Give it time to complete
-    
-    # Now all characters should have been typed
-    assert mock_backend.type_character.call_count == 3
-    simulation_thread.join()
+    backend = NullBackend(record=True)
+    clock = VirtualClock()
+    simulator = KeyboardSimulator(backend=backend, clock=clock)
+
+    # Pause after the first character and resume five seconds later
+    clock.call_at(0.015, simulator.pause)
+    clock.call_at(5.0, simulator.resume)
+    stats = simulator.run_plan(simple_plan)
+
+    assert stats.status == "completed"
+    assert backend.events == [(0.01, "a"), (5.0, "b"), (5.01, "c")]
+    assert stats.elapsed == pytest.approx(5.01)
 
 
 def test_hooks_are_called(mock_backend):
@@ -107,8 +105,10 @@ def test_hooks_are_called(mock_backend):
     task = TypingTask(description="test", payload="a")
     plan = SimulationPlan(delay_between_keystrokes=0.01, countdown_before_start=2, tasks=[task])
     
-    simulator = KeyboardSimulator(backend=mock_backend, hooks=hooks)
+    clock = VirtualClock()
+    simulator = KeyboardSimulator(backend=mock_backend, hooks=hooks, clock=clock)
     simulator.run_plan(plan)
+    assert clock.now() == pytest.approx(2.01)
     
     # Check countdown hooks
     countdown_calls = [call(2), call(1)]
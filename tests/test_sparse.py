@@ -0,0 +1,101 @@
+"""Constant byte runs typed as shell commands on Linux targets."""
+
+import base64
+import os
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from keyboard_simulator import config as cfg
+from keyboard_simulator.backends.null import NullBackend
+from keyboard_simulator.clock import VirtualClock
+from keyboard_simulator.encoding import linux_reconstruction_script
+from keyboard_simulator.simulator import KeyboardSimulator, SimulatorHooks
+from keyboard_simulator.sparse import SparseStats, iter_segments, iter_sparse_script
+from keyboard_simulator.tasks import build_plan
+
+needs_bash = pytest.mark.skipif(not shutil.which("bash"), reason="需要 bash")
+
+_rng = random.Random(7)
+IMAGE = (
+    bytes(4096)
+    + _rng.randbytes(3000)
+    + b"\xff" * 70_000
+    + _rng.randbytes(500)
+    + bytes(200)
+    + _rng.randbytes(100)
+    + bytes(300_000)
+)
+
+
+def _join(segments):
+    return b"".join(
+        segment[1] if segment[0] == "data" else bytes((segment[1],)) * segment[2]
+        for segment in segments
+    )
+
+
+@pytest.mark.parametrize("block_size", [1, 100, 4096, 24576, 1 << 20])
+def test_segments_round_trip_and_find_runs_across_blocks(block_size):
+    blocks = [IMAGE[i : i + block_size] for i in range(0, len(IMAGE), block_size)]
+    segments = list(iter_segments(blocks))
+    assert _join(segments) == IMAGE
+    runs = [(segment[1], segment[2]) for segment in segments if segment[0] == "run"]
+    assert runs == [(0, 4096), (0xFF, 70_000), (0, 300_000)]
+
+
+@needs_bash
+def test_script_rebuilds_the_file_with_far_fewer_keystrokes(tmp_path):
+    stats = SparseStats()
+    script = "".join(iter_sparse_script([IMAGE], "disk.img", size=len(IMAGE), stats=stats))
+    subprocess.run(["bash"], input=script, text=True, cwd=tmp_path, check=True)
+    assert (tmp_path / "disk.img").read_bytes() == IMAGE
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["disk.img"]
+
+    classic = linux_reconstruction_script(base64.b64encode(IMAGE).decode("ascii"), "disk.img")
+    assert stats.runs == 3
+    assert stats.estimated_characters == len(script)
+    assert stats.saved_characters == len(classic) - len(script) > 400_000
+
+
+def test_data_without_runs_gives_the_plain_script():
+    data = os.urandom(50_000)
+    script = "".join(iter_sparse_script([data], "out", size=len(data)))
+    assert script == linux_reconstruction_script(base64.b64encode(data).decode("ascii"), "out")
+
+
+def test_plan_length_and_progress_follow_the_stream(tmp_path):
+    source = tmp_path / "disk.img"
+    source.write_bytes(IMAGE)
+    plan = build_plan(cfg.FileConfig(file_path=source, output_filename="disk.img"))
+    classic = plan.total_characters
+    plan.delay_between_keystrokes = 0.0001
+    plan.countdown_before_start = 0
+    snapshots = []
+    simulator = KeyboardSimulator(
+        NullBackend(), SimulatorHooks(on_progress=snapshots.append), clock=VirtualClock()
+    )
+
+    stats = simulator.run_plan(plan)
+    assert stats.status == "completed"
+    assert stats.characters == plan.total_characters < classic // 10
+    assert snapshots[-1].total == stats.characters
+    assert plan.tasks[0].sparse.saved_characters == classic - stats.characters
+
+
+def test_sparse_is_linux_only_and_can_be_disabled(tmp_path):
+    source = tmp_path / "disk.img"
+    source.write_bytes(IMAGE)
+    for config in (
+        cfg.FileConfig(file_path=source, output_filename="d", sparse=False),
+        cfg.FileConfig(file_path=source, output_filename="d", target_os="windows"),
+        cfg.FileConfig(file_path=source, output_filename="d", fec_group_size=8),
+    ):
+        assert build_plan(config).tasks[0].sparse is None
+
+    with pytest.raises(cfg.ConfigError):
+        cfg.from_dict(
+            {"mode": "file", "file_path": str(source), "output_filename": "d", "sparse": "no"}
+        )
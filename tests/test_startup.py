@@ -0,0 +1,66 @@
+"""Cold-start import budget of the CLI, measured with ``-X importtime``."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+# 冷启动 (含标准库 argparse/logging/pathlib) 的累计导入耗时上限，单位微秒。
+CLI_IMPORT_BUDGET_US = 80_000
+
+# 这些模块只应在真正执行任务时导入。
+DEFERRED_MODULES = {
+    "importlib.metadata",
+    "ctypes",
+    "socketserver",
+    "keyboard_simulator.backends.sendinput",
+    "keyboard_simulator.backends.interception",
+    "keyboard_simulator.simulator",
+    "keyboard_simulator.tasks",
+    "keyboard_simulator.encoding",
+    "keyboard_simulator.jobs",
+    "keyboard_simulator.server",
+}
+
+
+def _import_times(code):
+    env = dict(os.environ, PYTHONPATH=str(SRC), PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return result.returncode, times
+
+
+def test_cli_help_does_not_import_heavy_modules():
+    code = "from keyboard_simulator import cli; cli.main(['--help'])"
+    returncode, times = _import_times(code)
+
+    assert returncode == 0
+    assert "keyboard_simulator.cli" in times
+    assert DEFERRED_MODULES.isdisjoint(times)
+
+
+def test_cli_cold_import_within_budget():
+    # 取多次测量中的最小值，降低机器负载带来的抖动。
+    samples = [_import_times("import keyboard_simulator.cli")[1] for _ in range(3)]
+    best = min(sample["keyboard_simulator.cli"] for sample in samples)
+    assert best < CLI_IMPORT_BUDGET_US
+
+
+def test_lazy_names_are_exported():
+    import keyboard_simulator
+
+    assert set(keyboard_simulator.__all__) == {"__version__", *keyboard_simulator._LAZY_ATTRIBUTES}
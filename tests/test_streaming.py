@@ -0,0 +1,96 @@
+"""Streaming text payloads with a bounded buffer."""
+
+import io
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+from keyboard_simulator.config import TextConfig
+from keyboard_simulator.simulator import KeyboardSimulator
+from keyboard_simulator.streaming import TextStream, read_text_chunks, split_lines
+from keyboard_simulator.tasks import SimulationPlan, TypingTask, build_plan
+
+
+def test_read_text_chunks_decodes_split_characters_and_newlines():
+    raw = io.BytesIO("中文\r\nok\r\n".encode("utf-8"))
+    assert "".join(read_text_chunks(raw, chunk_size=1)) == "中文\nok\n"
+
+
+def test_split_lines_regroups_chunks():
+    text = "a\nbc\n\nd\x0ce\u2028f\ntail"
+    for size in (1, 2, 3, len(text)):
+        chunks = [text[i : i + size] for i in range(0, len(text), size)]
+        assert list(split_lines(chunks)) == ["a\n", "bc\n", "\n", "d\x0ce\u2028f\n", "tail"]
+    assert list(split_lines(["", "x\n", ""])) == ["x\n"]
+
+
+def test_split_lines_scans_each_chunk_once():
+    scanned = []
+
+    class Chunk(str):
+        def rfind(self, *args):
+            scanned.append(len(self))
+            return super().rfind(*args)
+
+    chunks = [Chunk("x" * 10) for _ in range(1000)] + [Chunk("\n")]
+    assert list(split_lines(chunks)) == ["x" * 10000 + "\n"]
+    assert sum(scanned) == 10001
+
+
+def test_producer_blocks_when_buffer_is_full():
+    produced = []
+
+    def source():
+        for index in range(100):
+            produced.append(index)
+            yield "x" * 10
+
+    stream = TextStream(source(), max_chunks=2)
+    stream.start()
+    time.sleep(0.2)
+    # 两个排队的块加上一个阻塞在 put 上的块
+    assert len(produced) <= 3
+    stream.close()
+
+
+def test_pipe_is_typed_as_it_arrives():
+    read_fd, write_fd = os.pipe()
+    first_key = threading.Event()
+    typed = []
+
+    backend = MagicMock()
+
+    def type_character(char, delay):
+        typed.append(char)
+        first_key.set()
+
+    backend.type_character.side_effect = type_character
+    with os.fdopen(read_fd, "rb") as reader:
+        stream = TextStream(read_text_chunks(reader), name="pipe")
+        plan = SimulationPlan(
+            delay_between_keystrokes=0.0,
+            countdown_before_start=0,
+            tasks=[TypingTask(description="stream", payload=stream)],
+        )
+        assert plan.total_characters is None
+        runner = threading.Thread(target=KeyboardSimulator(backend).run_plan, args=(plan,))
+        runner.start()
+
+        os.write(write_fd, b"hello ")
+        assert first_key.wait(2), "输入尚未结束时就应开始按键"
+        os.write(write_fd, b"world\n")
+        os.close(write_fd)
+        runner.join(timeout=5)
+
+    assert "".join(typed) == "hello world\n"
+
+
+def test_build_plan_streams_text_file(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("line1\nline2\n", encoding="utf-8")
+    plan = build_plan(TextConfig(text_file=path, countdown_before_start=0))
+
+    task = plan.tasks[0]
+    assert "input.txt" in task.description
+    assert list(task.lines()) == ["line1\n", "line2\n"]
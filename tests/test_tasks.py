@@ -26,4 +26,22 @@ def test_build_plan_file(tmp_path: Path):
     )
     plan = tasks.build_plan(cfg)
     assert plan.tasks[0].description.startswith("文件传输")
-    assert "base64 -d" in plan.tasks[0].payload
+    script = "".join(plan.tasks[0].payload)
+    assert "base64 -d" in script
+    assert plan.total_characters == len(script)
+
+
+def test_build_plan_fec_reports_overhead(tmp_path: Path):
+    file_path = tmp_path / "data.bin"
+    file_path.write_bytes(bytes(range(256)) * 4)
+    cfg = config.FileConfig(
+        file_path=file_path,
+        target_os="windows",
+        output_filename="data.bin",
+        fec_group_size=4,
+        fec_parity=1,
+    )
+    plan = tasks.build_plan(cfg)
+    assert "FEC 4+1" in plan.tasks[0].description
+    assert "按键开销 +" in plan.tasks[0].description
+    assert "certutil -decode" in plan.tasks[0].payload
@@ -0,0 +1,110 @@
+"""Typing in a separate process controlled through shared memory."""
+
+import functools
+import threading
+import time
+
+import pytest
+
+from keyboard_simulator import config as cfg
+from keyboard_simulator.backends.base import AbstractKeyboardBackend
+from keyboard_simulator.simulator import SimulatorHooks
+from keyboard_simulator.worker import SimulatorProcess
+
+
+class FileBackend(AbstractKeyboardBackend):
+    """Append every key to a file, so the parent can see what the child typed."""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def start(self):
+        self.handle = open(self.path, "a", encoding="utf-8")
+
+    def stop(self):
+        self.handle.close()
+
+    def type_character(self, char, delay):
+        self.handle.write(char)
+        self.handle.flush()
+
+    def press_return(self, delay):
+        self.type_character("\n", delay)
+
+
+@pytest.fixture
+def output(tmp_path):
+    return tmp_path / "typed.txt"
+
+
+@pytest.fixture
+def process(output):
+    statuses = []
+    hooks = SimulatorHooks(on_status=statuses.append)
+    with SimulatorProcess(
+        functools.partial(FileBackend, output), hooks, progress_interval=0.02, use_cache=False
+    ) as worker:
+        worker.statuses = statuses
+        yield worker
+
+
+def test_text_is_typed_in_the_child_and_reported_back(process, output, tmp_path, caplog):
+    text = "print('hello')\nprint('world')\n"
+    stats = process.run(
+        cfg.TextConfig(text_to_type=text, delay_between_keystrokes=0, countdown_before_start=0)
+    )
+    assert stats.status == "completed"
+    assert stats.characters == len(text)
+    assert output.read_text(encoding="utf-8") == text
+    assert process.progress.characters == len(text)
+    assert process.state == "completed"
+    assert process.statuses == ["preparing", "running", "completed"]
+
+    # 子进程在多次运行之间保持存活，错误在父进程中重新抛出
+    with pytest.raises(FileNotFoundError):
+        process.run(cfg.FileConfig(file_path=tmp_path / "missing.bin", output_filename="m"))
+    # 子进程的日志记录经队列交给父进程的 logger
+    _wait_for(lambda: any(r.name == "keyboard_simulator.worker" for r in caplog.records))
+    source = tmp_path / "data.bin"
+    source.write_bytes(b"\x00\x01" * 100)
+    stats = process.run(
+        cfg.FileConfig(
+            file_path=source,
+            output_filename="data.bin",
+            delay_between_keystrokes=0,
+            countdown_before_start=0,
+        )
+    )
+    assert stats.status == "completed"
+
+
+def test_pause_and_stop_through_the_control_block(process, output):
+    config = cfg.TextConfig(
+        text_to_type="x" * 5000, delay_between_keystrokes=0.002, countdown_before_start=0
+    )
+    result = {}
+    runner = threading.Thread(target=lambda: result.update(stats=process.run(config)))
+    runner.start()
+    try:
+        _wait_for(lambda: process.progress.characters > 50)
+        process.pause()
+        _wait_for(lambda: process.state == "paused")
+        paused_at = process.progress.characters
+        time.sleep(0.2)
+        assert process.progress.characters == paused_at
+        process.resume()
+        _wait_for(lambda: process.progress.characters > paused_at)
+    finally:
+        process.stop()
+        runner.join(10)
+    assert result["stats"].status == "stopped"
+    assert 0 < result["stats"].characters < 5000
+    assert len(output.read_text(encoding="utf-8")) == result["stats"].characters
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.01)